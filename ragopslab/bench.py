@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import itertools
+import json
+import os
+from pathlib import Path
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Iterable
+
+import chromadb
+from chromadb.errors import NotFoundError
+from langchain_core.documents import Document
+import numpy as np
+
+from ragopslab.chunking import STRATEGIES, make_splitter
+from ragopslab.index import hnsw_configuration
+from ragopslab.manifest import resolve_collection
+from ragopslab.metrics import percentile
+
+
+@dataclass
+class ChunkerBenchResult:
+    strategy: str
+    chars: int
+    chunks: int
+    seconds: float
+    peak_mb: float
+
+    @property
+    def chars_per_second(self) -> float:
+        return self.chars / self.seconds if self.seconds else 0.0
+
+
+def synthetic_text(chars: int, seed: int = 7) -> str:
+    """Deterministic prose-like text: words, sentences and paragraphs."""
+    rng = random.Random(seed)
+    words = [
+        "retrieval", "vector", "chunk", "index", "query", "latency", "embedding",
+        "document", "source", "model", "answer", "context", "page", "token", "cache",
+    ]
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 18))).capitalize() + "."
+        separator = "\n\n" if rng.random() < 0.15 else " "
+        parts.append(sentence + separator)
+        size += len(sentence) + len(separator)
+    return "".join(parts)[:chars]
+
+
+def bench_chunker(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    strategies: tuple[str, ...] = STRATEGIES,
+    repeat: int = 3,
+) -> list[ChunkerBenchResult]:
+    """Best-of-``repeat`` wall time and peak traced memory of each splitter on ``text``."""
+    results: list[ChunkerBenchResult] = []
+    for strategy in strategies:
+        splitter = make_splitter(strategy, chunk_size, chunk_overlap)
+        best = float("inf")
+        chunks = 0
+        for _ in range(max(1, repeat)):
+            doc = Document(page_content=text, metadata={"source": "bench"})
+            started = time.perf_counter()
+            chunks = len(splitter.split_documents([doc]))
+            best = min(best, time.perf_counter() - started)
+        tracemalloc.start()
+        splitter.split_documents([Document(page_content=text, metadata={"source": "bench"})])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(
+            ChunkerBenchResult(
+                strategy=strategy,
+                chars=len(text),
+                chunks=chunks,
+                seconds=best,
+                peak_mb=peak / (1024 * 1024),
+            )
+        )
+    return results
+
+
+def load_bench_text(path: Path | None, chars: int) -> str:
+    if path is None:
+        return synthetic_text(chars)
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+@dataclass
+class IndexBenchResult:
+    space: str
+    M: int
+    construction_ef: int
+    search_ef: int
+    k: int
+    vectors: int
+    queries: int
+    recall: float
+    p50_ms: float
+    p95_ms: float
+    build_seconds: float
+    index_mb: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def synthetic_vectors(count: int, dimension: int, seed: int = 7, clusters: int = 32) -> np.ndarray:
+    """Deterministic clustered vectors (real embeddings are far from uniform)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    labels = rng.integers(clusters, size=count)
+    return (centers[labels] + 0.3 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+def collection_vectors(persist_dir: Path, collection_name: str, limit: int) -> np.ndarray:
+    """Up to ``limit`` stored embeddings of an existing collection (0 = all)."""
+    persist_dir = persist_dir.resolve()
+    if not persist_dir.exists():
+        raise FileNotFoundError(f"Persist directory not found: {persist_dir}")
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    try:
+        collection = client.get_collection(resolve_collection(persist_dir, collection_name))
+    except NotFoundError:
+        raise ValueError(f"Collection '{collection_name}' not found in {persist_dir}.") from None
+    total = collection.count() if limit <= 0 else min(limit, collection.count())
+    page = client.get_max_batch_size()
+    rows: list[np.ndarray] = []
+    for offset in range(0, total, page):
+        batch = collection.get(include=["embeddings"], limit=min(page, total - offset), offset=offset)
+        rows.append(np.asarray(batch["embeddings"], dtype=np.float32))
+    if not rows:
+        raise ValueError(f"Collection '{collection_name}' has no vectors.")
+    return np.concatenate(rows)
+
+
+def perturbed_queries(vectors: np.ndarray, count: int, noise: float = 0.05, seed: int = 11) -> np.ndarray:
+    """Queries near stored vectors: random rows plus noise scaled to each dimension's spread."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    spread = vectors.std(axis=0) * noise
+    return (vectors[rows] + rng.normal(size=(len(rows), vectors.shape[1])) * spread).astype(np.float32)
+
+
+def load_query_texts(path: Path) -> list[str]:
+    """Questions from an eval file (JSON array of ``{"question": ...}``) or one query per line."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        payload = json.loads(text)
+        if not isinstance(payload, list):
+            raise ValueError("Query file must be a JSON array.")
+        return [str(item["question"]) if isinstance(item, dict) else str(item) for item in payload]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int, space: str) -> list[set[int]]:
+    """Brute-force top-``k`` row numbers per query, in the same distance space as the index."""
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    squared_norms = (vectors * vectors).sum(axis=1)
+    neighbors: list[set[int]] = []
+    # Blocks of queries keep the distance matrix small on large collections.
+    for start in range(0, len(queries), 256):
+        block = queries[start : start + 256]
+        scores = block @ vectors.T
+        if space == "l2":
+            # ||q - v||^2 minus the per-query constant ||q||^2.
+            distances = squared_norms - 2 * scores
+        else:
+            distances = -scores
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        neighbors.extend(set(row.tolist()) for row in top)
+    return neighbors
+
+
+def _dir_mb(paths: Iterable[Path]) -> float:
+    size = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return size / (1024 * 1024)
+
+
+def bench_index(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    spaces: Iterable[str] = ("l2",),
+    m_values: Iterable[int] = (16,),
+    construction_efs: Iterable[int] = (100,),
+    search_efs: Iterable[int] = (100,),
+    batch_size: int = 100,
+) -> list[IndexBenchResult]:
+    """Sweep HNSW settings and compare each index with exact search.
+
+    A throwaway collection is built for every combination: Chroma only picks up
+    a changed ``search_ef`` when the index is next loaded, so it can't be
+    varied on a live collection. Recall@k is the share of the true top-``k``
+    rows the index returns; latency is per single query after a warm-up query.
+    ``index_mb`` is the HNSW segment on disk: the sync threshold is set to the
+    vector count, so the whole graph is flushed once, at the end of the build.
+    """
+    k = min(k, len(vectors))
+    ids = [str(row) for row in range(len(vectors))]
+    results: list[IndexBenchResult] = []
+    with tempfile.TemporaryDirectory(prefix="ragopslab-bench-") as tmp:
+        root = Path(tmp)
+        client = chromadb.PersistentClient(path=tmp)
+        page = client.get_max_batch_size()
+        for space in spaces:
+            exact = exact_neighbors(vectors, queries, k, space)
+            for m, construction_ef, search_ef in itertools.product(m_values, construction_efs, search_efs):
+                hnsw = hnsw_configuration(
+                    {
+                        "space": space,
+                        "M": m,
+                        "construction_ef": construction_ef,
+                        "search_ef": search_ef,
+                        "batch_size": min(batch_size, len(vectors)),
+                        "sync_threshold": max(len(vectors), 2),
+                    }
+                )
+                before = set(root.iterdir())
+                collection = client.create_collection(
+                    f"bench-{space}-{m}-{construction_ef}-{search_ef}",
+                    embedding_function=None,
+                    configuration={"hnsw": hnsw},
+                )
+                started = time.perf_counter()
+                for offset in range(0, len(vectors), page):
+                    collection.add(
+                        ids=ids[offset : offset + page],
+                        embeddings=vectors[offset : offset + page],
+                    )
+                build_seconds = time.perf_counter() - started
+                index_mb = _dir_mb(path for path in root.iterdir() if path.is_dir() and path not in before)
+
+                collection.query(query_embeddings=queries[:1], n_results=k, include=[])
+                latencies: list[float] = []
+                hits = 0
+                for row, query in enumerate(queries):
+                    started = time.perf_counter()
+                    found = collection.query(query_embeddings=[query], n_results=k, include=[])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len({int(hit) for hit in found["ids"][0]} & exact[row])
+                client.delete_collection(collection.name)
+                results.append(
+                    IndexBenchResult(
+                        space=space,
+                        M=hnsw["max_neighbors"],
+                        construction_ef=hnsw["ef_construction"],
+                        search_ef=hnsw["ef_search"],
+                        k=k,
+                        vectors=len(vectors),
+                        queries=len(queries),
+                        recall=hits / (k * len(queries)) if len(queries) else 0.0,
+                        p50_ms=percentile(latencies, 50),
+                        p95_ms=percentile(latencies, 95),
+                        build_seconds=build_seconds,
+                        index_mb=index_mb,
+                    )
+                )
+    return results
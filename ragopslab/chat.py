@@ -2,11 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
-from langchain_chroma import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+from ragopslab.manifest import rehydrate_metadata
+from ragopslab.query_cache import CacheStats
+from ragopslab.session import RagSession
 
 
 @dataclass
@@ -15,38 +15,77 @@ class ChatResult:
     citations: list[dict[str, Any]]
     response_metadata: dict[str, Any] | None = None
     context: str | None = None
+    # Query cache hits/misses for this call (None when the session has no cache).
+    cache: dict[str, Any] | None = None
+    # True when the answer came from the answer cache instead of the chat model.
+    cached: bool = False
+    # Time to first token, total generation time and decode rate (see RagSession.generate).
+    timing: dict[str, Any] | None = None
 
 
 def answer_question(
     query: str,
-    persist_dir: Path,
-    collection_name: str,
-    embedding_model: str,
-    chat_model: str,
-    k: int,
+    persist_dir: Path | None = None,
+    collection_name: str | None = None,
+    embedding_model: str | None = None,
+    chat_model: str | None = None,
+    k: int = 4,
     filters: dict[str, Any] | None = None,
     search_type: str = "similarity",
     mmr_fetch_k: int | None = None,
+    embedding_cache_dir: Path | None = None,
+    embedding_cache_max_mb: float = 512,
+    embedding_cache_dtype: str = "float32",
+    session: RagSession | None = None,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
 ) -> ChatResult:
-    embeddings = OllamaEmbeddings(model=embedding_model)
-    vectorstore = Chroma(
-        collection_name=collection_name,
-        persist_directory=str(persist_dir),
-        embedding_function=embeddings,
-    )
-    search_kwargs: dict[str, Any] = {"k": k}
-    if filters:
-        search_kwargs["filter"] = filters
-    if search_type == "mmr":
-        if mmr_fetch_k:
-            search_kwargs["fetch_k"] = mmr_fetch_k
-        retriever = vectorstore.as_retriever(search_type="mmr", search_kwargs=search_kwargs)
-    else:
-        retriever = vectorstore.as_retriever(search_kwargs=search_kwargs)
-    docs = retriever.invoke(query)
+    """Retrieve ``k`` chunks and answer from them.
+
+    With ``session``, its warm clients are used and the connection arguments
+    are ignored; otherwise a session is built for this one call. With
+    ``on_event``, the answer is streamed to it as ``{"event": "token",
+    "text": ...}`` events while it is generated.
+    """
+    if session is None:
+        with RagSession(
+            persist_dir=persist_dir,
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            chat_model=chat_model,
+            embedding_cache_dir=embedding_cache_dir,
+            embedding_cache_max_mb=embedding_cache_max_mb,
+            embedding_cache_dtype=embedding_cache_dtype,
+        ) as owned:
+            return answer_question(
+                query,
+                k=k,
+                filters=filters,
+                search_type=search_type,
+                mmr_fetch_k=mmr_fetch_k,
+                session=owned,
+                on_event=on_event,
+            )
+
+    # Compact collections store a source id per chunk; filters and citations go
+    # through the source catalog.
+    stats = CacheStats()
+    catalog = session.open_catalog()
+    try:
+        docs = session.retrieve(query, k, filters, search_type, mmr_fetch_k, catalog=catalog, stats=stats)
+        if catalog is not None:
+            rehydrate_metadata(catalog, [doc.metadata for doc in docs])
+    finally:
+        if catalog is not None:
+            catalog.close()
 
     if not docs:
-        return ChatResult(answer="No relevant documents found.", citations=[])
+        if on_event is not None:
+            on_event({"event": "token", "text": "No relevant documents found."})
+        return ChatResult(
+            answer="No relevant documents found.",
+            citations=[],
+            cache=stats.to_dict() if session.query_cache is not None else None,
+        )
 
     context_lines: list[str] = []
     citations: list[dict[str, Any]] = []
@@ -62,26 +101,21 @@ def answer_question(
             }
         )
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a helpful assistant. Use only the provided context. "
-                "If the answer is not in the context, say you don't know. "
-                "Cite sources with [#] matching the context numbers.",
-            ),
-            ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer:"),
-        ]
-    )
-    llm = ChatOllama(model=chat_model)
-    chain = prompt | llm
     context = "\n\n".join(context_lines)
-    response = chain.invoke({"context": context, "question": query})
-    metadata = getattr(response, "response_metadata", {}) or {}
+
+    def _emit_token(text: str) -> None:
+        on_event({"event": "token", "text": text})
+
+    # Citations follow the retrieved chunks, which an answer cache hit requires to be identical.
+    on_token = _emit_token if on_event is not None else None
+    generation = session.generate(query, docs, context, stats=stats, on_token=on_token)
 
     return ChatResult(
-        answer=response.content,
+        answer=generation.answer,
         citations=citations,
-        response_metadata=metadata,
+        response_metadata=generation.response_metadata,
         context=context,
+        cache=stats.to_dict() if session.query_cache is not None else None,
+        cached=generation.cached,
+        timing=generation.timing(),
     )
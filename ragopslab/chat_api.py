@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any
+
+from ragopslab.chat import ChatResult
+from ragopslab.graph_chat import GraphChatResult
+from ragopslab.usage import UsageSummary, build_usage_summary
+
+
+def chat_filters(
+    config: dict[str, Any],
+    source_type: str | None = None,
+    file_name: str | None = None,
+    page: int | None = None,
+) -> dict[str, Any] | None:
+    filters = dict(config["retrieval"].get("filters", {}) or {})
+    if source_type:
+        filters["source_type"] = source_type
+    if file_name:
+        filters["file_name"] = file_name
+    if page is not None:
+        filters["page"] = page
+    return filters or None
+
+
+def chat_usage(
+    config: dict[str, Any],
+    result: ChatResult | GraphChatResult,
+    query: str,
+    chat_model: str,
+) -> UsageSummary | None:
+    cost_cfg = config.get("cost", {})
+    if result.cached and cost_cfg.get("enabled", False):
+        # Served from the answer cache: the model was not called.
+        return UsageSummary(prompt_tokens=0, completion_tokens=0, total_tokens=0, estimated_cost=0.0)
+    return build_usage_summary(
+        response_metadata=result.response_metadata,
+        estimator=cost_cfg.get("estimator", "ollama"),
+        prompt_text=(result.context or "") + "\n\nQuestion: " + query,
+        completion_text=result.answer,
+        model=chat_model,
+        pricing=config.get("pricing", {}),
+        default_prompt_per_1k=cost_cfg.get("default_prompt_per_1k", 0.0),
+        default_completion_per_1k=cost_cfg.get("default_completion_per_1k", 0.0),
+        enabled=cost_cfg.get("enabled", False),
+    )
+
+
+def chat_payload(
+    query: str,
+    result: ChatResult | GraphChatResult,
+    usage: UsageSummary | None = None,
+    trace_output: str | None = None,
+) -> dict[str, Any]:
+    """The ``chat --output-format json`` document."""
+    payload: dict[str, Any] = {
+        "question": query,
+        "answer": result.answer,
+        "citations": result.citations,
+        "cached": result.cached,
+    }
+    if isinstance(result, GraphChatResult):
+        payload["retrieval"] = {"used_k": result.used_k, "attempts": result.attempts}
+        if trace_output:
+            payload["trace_output"] = trace_output
+    if usage:
+        payload["usage"] = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "estimated_cost": usage.estimated_cost,
+        }
+        if result.cache is not None:
+            payload["usage"]["cache"] = result.cache
+        if result.timing is not None:
+            payload["usage"]["timing"] = result.timing
+    return payload
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+STRATEGIES = ("recursive", "offsets")
+
+# Preferred break points, best first (same order as the recursive splitter).
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+class OffsetTextSplitter:
+    """Single-pass text splitter that keeps character offsets.
+
+    Walks each text once: from the current start it looks back from
+    ``start + chunk_size`` for the best separator (``str.rfind`` on the original
+    string, so no intermediate pieces are built) and cuts there, or hard-cuts
+    at ``chunk_size`` when there is none. The next chunk starts ``chunk_overlap``
+    characters earlier, moved forward to a word boundary. Every chunk records
+    ``start_index`` and ``end_index`` into the source document, so neighbouring
+    text can be read back from the source instead of being stored as overlap.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int = 0,
+        separators: Iterable[str] = DEFAULT_SEPARATORS,
+    ) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive.")
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = max(0, chunk_overlap)
+        self.separators = tuple(separators)
+        # Ignore separators in the first quarter of a window, so a break near the
+        # start doesn't produce a sliver of a chunk.
+        self._min_chunk = max(1, chunk_size // 4)
+
+    def split_offsets(self, text: str) -> Iterator[tuple[int, int]]:
+        """Yield ``(start, end)`` spans of non-blank chunks of ``text``."""
+        length = len(text)
+        start = _skip_space(text, 0, length)
+        while start < length:
+            limit = start + self.chunk_size
+            if limit >= length:
+                cut = length
+            else:
+                cut = limit
+                for separator in self.separators:
+                    found = text.rfind(separator, start + self._min_chunk, limit)
+                    if found != -1:
+                        # Keep sentence punctuation with its sentence.
+                        cut = found + len(separator.rstrip())
+                        break
+            end = cut
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if end > start:
+                yield start, end
+            if cut >= length:
+                return
+            start = self._next_start(text, start, cut, length)
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        chunks: list[Document] = []
+        for doc in documents:
+            text = doc.page_content
+            for start, end in self.split_offsets(text):
+                metadata = dict(doc.metadata)
+                metadata["start_index"] = start
+                metadata["end_index"] = end
+                chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
+
+    def _next_start(self, text: str, start: int, cut: int, length: int) -> int:
+        if not self.chunk_overlap:
+            return _skip_space(text, cut, length)
+        position = max(cut - self.chunk_overlap, start + 1)
+        # Don't start the overlap in the middle of a word.
+        if not text[position - 1].isspace():
+            boundary = _find_space(text, position, cut)
+            position = boundary if boundary != -1 else cut
+        return _skip_space(text, position, length)
+
+
+def _skip_space(text: str, position: int, length: int) -> int:
+    while position < length and text[position].isspace():
+        position += 1
+    return position
+
+
+def _find_space(text: str, start: int, end: int) -> int:
+    for position in range(start, end):
+        if text[position].isspace():
+            return position
+    return -1
+
+
+def make_splitter(strategy: str, chunk_size: int, chunk_overlap: int):
+    """Splitter for ``chunking.strategy``; both expose ``split_documents``."""
+    if strategy == "offsets":
+        return OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    if strategy == "recursive":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+        )
+    raise ValueError(f"Unknown chunking strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
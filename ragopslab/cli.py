@@ -5,13 +5,60 @@ import sys
 import textwrap
 from pathlib import Path
 
+import chromadb
+from langchain_ollama import OllamaEmbeddings
+import numpy as np
+
+from ragopslab.bench import (
+    bench_chunker,
+    bench_index,
+    collection_vectors,
+    load_bench_text,
+    load_query_texts,
+    perturbed_queries,
+    synthetic_vectors,
+)
 from ragopslab.chat import answer_question
+from ragopslab.chat_api import chat_filters, chat_payload, chat_usage
 from ragopslab.config import load_config
+from ragopslab.embedding_cache import with_embedding_cache
 from ragopslab.graph_chat import answer_question_graph
-from ragopslab.ingest import ingest_directory
+from ragopslab.ingest import (
+    LoaderOptions,
+    ingest_directory,
+    make_ingest_embeddings,
+    rebuild_collection,
+)
 from ragopslab.inspect import list_sources, summarize_collection
 from ragopslab.eval import run_eval
-from ragopslab.usage import build_usage_summary
+from ragopslab.plan import plan_ingest
+from ragopslab.serve import QueryServer, QueryService
+from ragopslab.session import RagSession
+from ragopslab.watch import watch_directory
+
+
+def _embedding_cache_kwargs(config: dict) -> dict:
+    cache_cfg = config.get("embedding_cache", {}) or {}
+    if not cache_cfg.get("enabled", False):
+        return {"embedding_cache_dir": None}
+    return {
+        "embedding_cache_dir": Path(cache_cfg.get("dir", "storage/embedding_cache")),
+        "embedding_cache_max_mb": cache_cfg.get("max_mb", 512),
+        "embedding_cache_dtype": cache_cfg.get("dtype", "float32"),
+    }
+
+
+def _loader_options(config: dict) -> LoaderOptions:
+    files_cfg = config.get("files", {}) or {}
+    return LoaderOptions(
+        csv_rows_per_doc=int(files_cfg.get("csv_rows_per_doc", 1)),
+        csv_max_chars=int(files_cfg.get("csv_max_chars", 0)),
+        json_fields=tuple(files_cfg.get("json_fields", []) or []),
+        json_flatten=bool(files_cfg.get("json_flatten", False)),
+        pdf_workers=int(files_cfg.get("pdf_workers", 1)),
+        pdf_cache_dir=files_cfg.get("pdf_cache_dir") or None,
+        pdf_cache_max_mb=float(files_cfg.get("pdf_cache_max_mb", 256)),
+    )
 
 
 def _cmd_ingest(args: argparse.Namespace) -> int:
@@ -21,17 +68,46 @@ def _cmd_ingest(args: argparse.Namespace) -> int:
         extensions = config["files"]["extensions"]
     if isinstance(extensions, str):
         extensions = [ext.strip() for ext in extensions.split(",") if ext.strip()]
+    sync = args.sync or args.watch
+    ingest_kwargs = dict(
+        data_dir=Path(args.data_dir or config["paths"]["data_dir"]),
+        persist_dir=Path(args.persist_dir or config["paths"]["persist_dir"]),
+        collection_name=args.collection or config["chroma"]["collection"],
+        embedding_model=args.embedding_model or config["models"]["embedding_model"],
+        chunk_size=args.chunk_size or config["chunking"]["chunk_size"],
+        chunk_overlap=args.chunk_overlap or config["chunking"]["chunk_overlap"],
+        extensions=extensions,
+        sync=sync,
+        workers=args.workers or config["ingest"]["workers"],
+        batch_size=args.batch_size or config["ingest"]["batch_size"],
+        queue_size=config["ingest"]["queue_size"],
+        embedding_batch_size=config["models"]["embedding_batch_size"],
+        embedding_concurrency=config["models"]["embedding_concurrency"],
+        embedding_max_retries=config["models"]["embedding_max_retries"],
+        embedding_retry_backoff=config["models"]["embedding_retry_backoff"],
+        **_embedding_cache_kwargs(config),
+        dedup=args.dedup or config["ingest"]["dedup"],
+        loader_options=_loader_options(config),
+        compact_metadata=config["chroma"]["compact_metadata"],
+        index=config["chroma"]["index"],
+        ignore=config["files"]["ignore"],
+        chunking_strategy=config["chunking"]["strategy"],
+        trace_memory=args.trace_memory,
+    )
+    if args.plan:
+        return _plan_ingest(config, ingest_kwargs, args.stats_json)
+    if args.rebuild and args.reset:
+        print("Error: --rebuild and --reset cannot be combined.")
+        return 1
+    rebuilt = None
     try:
-        stats = ingest_directory(
-            data_dir=Path(args.data_dir or config["paths"]["data_dir"]),
-            persist_dir=Path(args.persist_dir or config["paths"]["persist_dir"]),
-            collection_name=args.collection or config["chroma"]["collection"],
-            embedding_model=args.embedding_model or config["models"]["embedding_model"],
-            chunk_size=args.chunk_size or config["chunking"]["chunk_size"],
-            chunk_overlap=args.chunk_overlap or config["chunking"]["chunk_overlap"],
-            extensions=extensions,
-            reset=args.reset,
-        )
+        if args.rebuild:
+            # A fresh shadow collection: nothing to sync against.
+            rebuild_kwargs = {key: value for key, value in ingest_kwargs.items() if key != "sync"}
+            rebuilt = rebuild_collection(**rebuild_kwargs)
+            stats = rebuilt.stats
+        else:
+            stats = ingest_directory(reset=args.reset, **ingest_kwargs)
     except (FileNotFoundError, ValueError) as exc:
         print(f"Error: {exc}")
         return 1
@@ -41,8 +117,171 @@ def _cmd_ingest(args: argparse.Namespace) -> int:
     print(f"- files_loaded: {stats.files_loaded}")
     print(f"- docs_loaded: {stats.docs_loaded}")
     print(f"- chunks_created: {stats.chunks_created}")
+    print(f"- chunks_skipped: {stats.chunks_skipped}")
+    print(f"- chunks_deduplicated: {stats.chunks_deduplicated}")
     print(f"- skipped: {stats.skipped}")
     print(f"- duplicates: {stats.duplicates}")
+    print(f"- failed: {stats.failed}")
+    print(f"- rolled_back: {stats.rolled_back}")
+    if rebuilt is not None:
+        print(f"- collection: {rebuilt.collection} (replaced {rebuilt.previous})")
+        if rebuilt.dropped:
+            print(f"- dropped: {', '.join(rebuilt.dropped)}")
+    if sync:
+        print(f"- added: {stats.added}")
+        print(f"- updated: {stats.updated}")
+        print(f"- removed: {stats.removed}")
+        print(f"- unchanged: {stats.unchanged}")
+    print("Performance:")
+    print(f"- total_seconds: {stats.total_seconds:.2f}")
+    print(f"- discover_seconds: {stats.discover_seconds:.2f}")
+    print(f"- load_seconds: {stats.load_seconds:.2f}")
+    print(f"- split_seconds: {stats.split_seconds:.2f}")
+    print(f"- embed_seconds: {stats.embed_seconds:.2f}")
+    print(f"- write_seconds: {stats.write_seconds:.2f}")
+    print(f"- files_per_second: {stats.files_per_second:.1f}")
+    print(f"- chunks_per_second: {stats.chunks_per_second:.1f}")
+    print(
+        f"- embed_latency_ms: p50={stats.embed_latency_p50_ms:.0f} "
+        f"p95={stats.embed_latency_p95_ms:.0f} p99={stats.embed_latency_p99_ms:.0f}"
+    )
+    print(f"- bytes_read: {stats.bytes_read}")
+    print(f"- peak_rss_mb: {stats.peak_rss_mb:.1f} (workers: {stats.peak_worker_rss_mb:.1f})")
+    if args.trace_memory:
+        print(f"- tracemalloc_peak_mb: {stats.tracemalloc_peak_mb:.1f}")
+    if args.stats_json:
+        payload = stats.to_dict()
+        if rebuilt is not None:
+            payload["collection"] = rebuilt.collection
+        output = Path(args.stats_json)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(payload, indent=2))
+        print(f"Saved stats to {output}")
+    if args.watch:
+        return _watch_ingest(config, ingest_kwargs)
+    return 0
+
+
+def _plan_ingest(config: dict, ingest_kwargs: dict, stats_json: str | None) -> int:
+    embed_sample = int(config["ingest"]["plan_embed_sample"])
+    embeddings = None
+    if embed_sample > 0:
+        # No embedding cache: the point is to measure the model's throughput.
+        embeddings = make_ingest_embeddings(
+            ingest_kwargs["embedding_model"],
+            embedding_batch_size=ingest_kwargs["embedding_batch_size"],
+            embedding_concurrency=ingest_kwargs["embedding_concurrency"],
+            embedding_max_retries=0,
+        )
+    try:
+        plan = plan_ingest(
+            data_dir=ingest_kwargs["data_dir"],
+            extensions=ingest_kwargs["extensions"],
+            chunk_size=ingest_kwargs["chunk_size"],
+            chunk_overlap=ingest_kwargs["chunk_overlap"],
+            ignore=ingest_kwargs["ignore"],
+            loader_options=ingest_kwargs["loader_options"],
+            chunking_strategy=ingest_kwargs["chunking_strategy"],
+            workers=ingest_kwargs["workers"],
+            sample_per_type=int(config["ingest"]["plan_sample_per_type"]),
+            embeddings=embeddings,
+            embed_sample=embed_sample,
+        )
+    except (FileNotFoundError, ValueError) as exc:
+        print(f"Error: {exc}")
+        return 1
+    finally:
+        close = getattr(embeddings, "close", None)
+        if close is not None:
+            close()
+
+    rows = [
+        [
+            t.source_type,
+            str(t.files),
+            f"{t.bytes / (1024 * 1024):.1f}",
+            f"{t.sampled_files}",
+            str(t.est_chunks),
+            str(t.est_tokens),
+        ]
+        for t in plan.types
+    ]
+    _render_table(headers=["type", "files", "MB", "sampled", "est_chunks", "est_tokens"], rows=rows)
+    print("Ingest plan (estimates, nothing was written):")
+    print(f"- files: {plan.files}")
+    print(f"- est_chunks: {plan.est_chunks}")
+    print(f"- est_embedding_tokens: {plan.est_tokens}")
+    print(f"- est_index_mb: {plan.est_index_mb:.1f} (dimension {plan.dimension})")
+    print(f"- est_load_seconds: {plan.est_load_seconds:.1f}")
+    if plan.embed_chunks_per_second:
+        print(f"- embed_chunks_per_second: {plan.embed_chunks_per_second:.1f}")
+        print(f"- est_embed_seconds: {plan.est_embed_seconds:.1f}")
+        print(f"- est_wall_seconds: {plan.est_wall_seconds:.1f}")
+    else:
+        print("- est_wall_seconds: unknown (embedding throughput not measured)")
+    if plan.failed_samples:
+        print(f"- failed_samples: {plan.failed_samples}")
+    if stats_json:
+        output = Path(stats_json)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(plan.to_dict(), indent=2))
+        print(f"Saved plan to {output}")
+    return 0
+
+
+def _watch_ingest(config: dict, ingest_kwargs: dict) -> int:
+    watch_cfg = config["ingest"]
+    # One client and one embedder for the whole session: no per-change startup cost.
+    client = chromadb.PersistentClient(path=str(ingest_kwargs["persist_dir"].resolve()))
+    embeddings = make_ingest_embeddings(
+        ingest_kwargs["embedding_model"],
+        embedding_batch_size=ingest_kwargs["embedding_batch_size"],
+        embedding_concurrency=ingest_kwargs["embedding_concurrency"],
+        embedding_max_retries=ingest_kwargs["embedding_max_retries"],
+        embedding_retry_backoff=ingest_kwargs["embedding_retry_backoff"],
+        embedding_cache_dir=ingest_kwargs["embedding_cache_dir"],
+        embedding_cache_max_mb=ingest_kwargs.get("embedding_cache_max_mb", 512),
+        embedding_cache_dtype=ingest_kwargs.get("embedding_cache_dtype", "float32"),
+    )
+
+    def _apply(paths: list[Path]) -> bool:
+        try:
+            stats = ingest_directory(
+                paths=paths, client=client, embeddings=embeddings, **ingest_kwargs
+            )
+        except Exception as exc:
+            # Keep watching (Ollama may be restarting); the batch is retried.
+            print(f"Error: {type(exc).__name__}: {exc} (retrying {len(paths)} changed)")
+            return False
+        print(
+            f"[watch] {len(paths)} changed: added={stats.added} updated={stats.updated} "
+            f"removed={stats.removed} unchanged={stats.unchanged} failed={stats.failed} "
+            f"chunks={stats.chunks_created}"
+        )
+        return True
+
+    def _known() -> list[str]:
+        # Lets a renamed or deleted directory be expanded to the sources under it.
+        sources = list_sources(ingest_kwargs["persist_dir"], ingest_kwargs["collection_name"])
+        return [summary.source for summary in sources]
+
+    print(f"Watching {ingest_kwargs['data_dir']} (Ctrl-C to stop)...")
+    try:
+        watch_directory(
+            ingest_kwargs["data_dir"],
+            ingest_kwargs["extensions"],
+            _apply,
+            ignore=ingest_kwargs["ignore"],
+            interval=watch_cfg["watch_interval"],
+            debounce=watch_cfg["watch_debounce"],
+            known=_known,
+        )
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        close = getattr(embeddings, "close", None)
+        if close is not None:
+            close()
     return 0
 
 
@@ -62,75 +301,80 @@ def _cmd_chat(args: argparse.Namespace) -> int:
     search_type = args.search_type or config["retrieval"].get("search_type", "similarity")
     mmr_fetch_k = args.mmr_fetch_k or config["retrieval"].get("mmr_fetch_k", None)
 
-    filters = dict(config["retrieval"].get("filters", {}) or {})
-    if args.source_type:
-        filters["source_type"] = args.source_type
-    if args.file_name:
-        filters["file_name"] = args.file_name
-    if args.page is not None:
-        filters["page"] = args.page
-    if not filters:
-        filters = None
+    filters = chat_filters(config, args.source_type, args.file_name, args.page)
 
     use_graph = bool(args.graph)
-    if use_graph:
-        result = answer_question_graph(
-            query=query,
-            persist_dir=Path(args.persist_dir or config["paths"]["persist_dir"]),
-            collection_name=args.collection or config["chroma"]["collection"],
-            embedding_model=embedding_model,
-            chat_model=chat_model,
-            k_default=k_default,
-            k_max=k_max,
-            retry_on_no_answer=retry_on_no_answer,
-            trace=bool(args.trace),
-            trace_preview_width=args.trace_preview_width,
-            trace_output=Path(args.trace_output) if args.trace_output else None,
-            filters=filters,
-            search_type=search_type,
-            mmr_fetch_k=mmr_fetch_k,
-        )
-        response_metadata = result.response_metadata
-        context = result.context or ""
-        used_k = result.used_k
-        attempts = result.attempts
-    else:
-        result = answer_question(
-            query=query,
-            persist_dir=Path(args.persist_dir or config["paths"]["persist_dir"]),
-            collection_name=args.collection or config["chroma"]["collection"],
-            embedding_model=embedding_model,
-            chat_model=chat_model,
-            k=k,
-            filters=filters,
-            search_type=search_type,
-            mmr_fetch_k=mmr_fetch_k,
-        )
-        response_metadata = result.response_metadata
-        context = result.context or ""
-        used_k = k
-        attempts = 0
-
-    cost_cfg = config.get("cost", {})
-    pricing = config.get("pricing", {})
-    show_usage = bool(args.show_usage or cost_cfg.get("show_usage", False))
-    usage = build_usage_summary(
-        response_metadata=response_metadata,
-        estimator=cost_cfg.get("estimator", "ollama"),
-        prompt_text=context + "\n\nQuestion: " + query,
-        completion_text=result.answer,
-        model=chat_model,
-        pricing=pricing,
-        default_prompt_per_1k=cost_cfg.get("default_prompt_per_1k", 0.0),
-        default_completion_per_1k=cost_cfg.get("default_completion_per_1k", 0.0),
-        enabled=cost_cfg.get("enabled", False),
-    )
+    stream = bool(args.stream)
+    on_event = None
+    if stream and args.output_format == "json":
+        # NDJSON: one event per line, then the usual payload as a "done" event.
+        def on_event(event: dict) -> None:
+            print(json.dumps(event, ensure_ascii=True), flush=True)
+
+    elif stream:
+        if args.output_format == "markdown":
+            print("\nAnswer:")
+            print("```")
+        else:
+            print("Answer:")
+
+        def on_event(event: dict) -> None:
+            if event["event"] == "token":
+                print(event["text"], end="", flush=True)
+            elif event["event"] == "retry":
+                print(f"\n[no answer; retrying with k={event['k']}]", flush=True)
+
+    with RagSession.from_config(
+        config,
+        persist_dir=Path(args.persist_dir) if args.persist_dir else None,
+        collection_name=args.collection,
+        embedding_model=embedding_model,
+        chat_model=chat_model,
+    ) as session:
+        if use_graph:
+            result = answer_question_graph(
+                query=query,
+                k_default=k_default,
+                k_max=k_max,
+                retry_on_no_answer=retry_on_no_answer,
+                trace=bool(args.trace),
+                trace_preview_width=args.trace_preview_width,
+                trace_output=Path(args.trace_output) if args.trace_output else None,
+                filters=filters,
+                search_type=search_type,
+                mmr_fetch_k=mmr_fetch_k,
+                session=session,
+                on_event=on_event,
+            )
+            used_k = result.used_k
+            attempts = result.attempts
+        else:
+            result = answer_question(
+                query=query,
+                k=k,
+                filters=filters,
+                search_type=search_type,
+                mmr_fetch_k=mmr_fetch_k,
+                session=session,
+                on_event=on_event,
+            )
+            used_k = k
+            attempts = 0
+
+    show_usage = bool(args.show_usage or config.get("cost", {}).get("show_usage", False))
+    usage = chat_usage(config, result, query, chat_model)
 
+    cached_note = " (cached)" if result.cached else ""
     if args.output_format == "markdown":
-        print("\nAnswer:")
-        print("```")
-        print(result.answer)
-        print("```")
+        if stream:
+            print("\n```")
+            if result.cached:
+                print("(cached answer)")
+        else:
+            print(f"\nAnswer{cached_note}:")
+            print("```")
+            print(result.answer)
+            print("```")
         print("\nCitations:")
         if not result.citations:
             print("1. None")
@@ -153,30 +397,29 @@ def _cmd_chat(args: argparse.Namespace) -> int:
             print(f"- total_tokens: {usage.total_tokens}")
             if usage.estimated_cost is not None:
                 print(f"- estimated_cost: ${usage.estimated_cost:.4f}")
+            if result.cache:
+                print(
+                    f"- cache: hit_rate={result.cache['hit_rate']:.0%} "
+                    f"saved_ms={result.cache['saved_ms']}"
+                )
+            if result.timing:
+                print(f"- ttft_ms: {result.timing['ttft_ms']}")
+                print(f"- decode_tokens_per_s: {result.timing['decode_tokens_per_s']}")
         return 0
 
     if args.output_format == "json":
-        payload = {
-            "question": query,
-            "answer": result.answer,
-            "citations": result.citations,
-        }
-        if use_graph:
-            payload["retrieval"] = {"used_k": used_k, "attempts": attempts}
-            if args.trace_output:
-                payload["trace_output"] = args.trace_output
-        if show_usage and usage:
-            payload["usage"] = {
-                "prompt_tokens": usage.prompt_tokens,
-                "completion_tokens": usage.completion_tokens,
-                "total_tokens": usage.total_tokens,
-                "estimated_cost": usage.estimated_cost,
-            }
-        print(json.dumps(payload, ensure_ascii=True, indent=2))
+        payload = chat_payload(query, result, usage if show_usage else None, args.trace_output)
+        if stream:
+            print(json.dumps({"event": "done", **payload}, ensure_ascii=True))
+        else:
+            print(json.dumps(payload, ensure_ascii=True, indent=2))
         return 0
 
-    print("Answer:")
-    print(result.answer)
+    if stream:
+        print("\n(cached answer)" if result.cached else "")
+    else:
+        print(f"Answer{cached_note}:")
+        print(result.answer)
     print("\nCitations:")
     if not result.citations:
         print("1) None")
@@ -195,6 +438,41 @@ def _cmd_chat(args: argparse.Namespace) -> int:
             f"\nUsage: prompt={usage.prompt_tokens} completion={usage.completion_tokens} "
             f"total={usage.total_tokens} cost=${usage.estimated_cost:.4f}"
         )
+        if result.cache:
+            print(f"Cache: hit_rate={result.cache['hit_rate']:.0%} saved_ms={result.cache['saved_ms']}")
+        if result.timing:
+            print(
+                f"Timing: ttft_ms={result.timing['ttft_ms']} "
+                f"decode_tokens_per_s={result.timing['decode_tokens_per_s']}"
+            )
+    return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    config = load_config(Path(args.config) if args.config else None)
+    serve_cfg = config.get("serve", {}) or {}
+    service = QueryService(
+        config,
+        persist_dir=Path(args.persist_dir) if args.persist_dir else None,
+        collection_name=args.collection,
+    )
+    host = args.host or serve_cfg.get("host", "127.0.0.1")
+    port = args.port if args.port is not None else int(serve_cfg.get("port", 8765))
+    try:
+        service.warm()
+        server = QueryServer((host, port), service, verbose=args.verbose)
+    except (OSError, ValueError) as exc:
+        service.close()
+        print(f"Error: {exc}")
+        return 1
+    print(f"Serving {service.collection_name} on http://{host}:{server.server_port} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
+        service.close()
     return 0
 
 
@@ -366,6 +644,112 @@ def _cmd_sources(args: argparse.Namespace) -> int:
     return 0
 
 
+def _cmd_bench_chunker(args: argparse.Namespace) -> int:
+    config = load_config(Path(args.config) if args.config else None)
+    try:
+        text = load_bench_text(Path(args.file) if args.file else None, args.chars)
+    except OSError as exc:
+        print(f"Error: {exc}")
+        return 1
+    results = bench_chunker(
+        text,
+        chunk_size=args.chunk_size or config["chunking"]["chunk_size"],
+        chunk_overlap=args.chunk_overlap or config["chunking"]["chunk_overlap"],
+        repeat=args.repeat,
+    )
+    rows = [
+        [
+            r.strategy,
+            str(r.chars),
+            str(r.chunks),
+            f"{r.seconds:.3f}",
+            f"{r.chars_per_second / 1_000_000:.1f}",
+            f"{r.peak_mb:.1f}",
+        ]
+        for r in results
+    ]
+    _render_table(headers=["strategy", "chars", "chunks", "seconds", "Mchars/s", "peak_mb"], rows=rows)
+    return 0
+
+
+def _sweep(value: str | None, default: object, cast=int) -> list:
+    if value is None:
+        return [cast(default)]
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def _cmd_bench_index(args: argparse.Namespace) -> int:
+    config = load_config(Path(args.config) if args.config else None)
+    index_cfg = config["chroma"].get("index", {}) or {}
+    try:
+        if args.synthetic:
+            vectors = synthetic_vectors(args.synthetic, args.dim)
+        else:
+            vectors = collection_vectors(
+                Path(args.persist_dir or config["paths"]["persist_dir"]),
+                args.collection or config["chroma"]["collection"],
+                args.limit,
+            )
+        if args.queries:
+            embedding_model = config["models"]["embedding_model"]
+            embeddings = with_embedding_cache(
+                OllamaEmbeddings(model=embedding_model),
+                model=embedding_model,
+                cache_dir=_embedding_cache_kwargs(config)["embedding_cache_dir"],
+            )
+            queries = np.asarray(
+                embeddings.embed_documents(load_query_texts(Path(args.queries))), dtype=np.float32
+            )
+            if queries.size and queries.shape[1] != vectors.shape[1]:
+                raise ValueError(
+                    f"Query vectors have {queries.shape[1]} dimensions, the index has {vectors.shape[1]}."
+                )
+        else:
+            queries = perturbed_queries(vectors, args.num_queries)
+        if not len(queries):
+            raise ValueError("No queries to run.")
+        results = bench_index(
+            vectors,
+            queries,
+            k=args.k,
+            spaces=_sweep(args.space, index_cfg.get("space", "l2"), str),
+            m_values=_sweep(args.m, index_cfg.get("M", 16)),
+            construction_efs=_sweep(args.construction_ef, index_cfg.get("construction_ef", 100)),
+            search_efs=_sweep(args.search_ef, index_cfg.get("search_ef", 100)),
+            batch_size=int(index_cfg.get("batch_size", 100)),
+        )
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"Error: {exc}")
+        return 1
+
+    rows = [
+        [
+            r.space,
+            str(r.M),
+            str(r.construction_ef),
+            str(r.search_ef),
+            f"{r.recall:.3f}",
+            f"{r.p50_ms:.2f}",
+            f"{r.p95_ms:.2f}",
+            f"{r.build_seconds:.2f}",
+            f"{r.index_mb:.1f}",
+        ]
+        for r in results
+    ]
+    k = results[0].k if results else args.k
+    _render_table(
+        headers=["space", "M", "construction_ef", "search_ef", f"recall@{k}", "p50_ms", "p95_ms", "build_s", "index_mb"],
+        rows=rows,
+    )
+    print(f"{len(vectors)} vectors, {len(queries)} queries, dimension {vectors.shape[1]}.")
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps([r.to_dict() for r in results], indent=2))
+        print(f"Saved results to {output}")
+    return 0
+
+
 def _cmd_eval(args: argparse.Namespace) -> int:
     config = load_config(Path(args.config) if args.config else None)
     filters = dict(config["retrieval"].get("filters", {}) or {})
@@ -382,17 +766,23 @@ def _cmd_eval(args: argparse.Namespace) -> int:
     mmr_fetch_k = args.mmr_fetch_k or config["retrieval"].get("mmr_fetch_k", None)
     k = args.k if args.k is not None else config["retrieval"]["k"]
 
-    result = run_eval(
-        eval_file=Path(args.eval_file),
-        persist_dir=Path(args.persist_dir or config["paths"]["persist_dir"]),
-        collection_name=args.collection or config["chroma"]["collection"],
-        embedding_model=args.embedding_model or config["models"]["embedding_model"],
-        chat_model=args.chat_model or config["models"]["chat_model"],
-        k=k,
-        filters=filters,
-        search_type=search_type,
-        mmr_fetch_k=mmr_fetch_k,
-    )
+    with RagSession.from_config(
+        config,
+        persist_dir=Path(args.persist_dir) if args.persist_dir else None,
+        collection_name=args.collection,
+        embedding_model=args.embedding_model,
+        chat_model=args.chat_model,
+        # Eval measures the model; don't answer from earlier runs.
+        answer_cache_threshold=None,
+    ) as session:
+        result = run_eval(
+            eval_file=Path(args.eval_file),
+            k=k,
+            filters=filters,
+            search_type=search_type,
+            mmr_fetch_k=mmr_fetch_k,
+            session=session,
+        )
 
     if args.output:
         Path(args.output).parent.mkdir(parents=True, exist_ok=True)
@@ -422,6 +812,47 @@ def main() -> int:
         action="store_true",
         help="Delete the existing Chroma index before re-ingesting (full re-index).",
     )
+    ingest.add_argument(
+        "--sync",
+        action="store_true",
+        help="Re-index only new/changed files and drop chunks of removed files.",
+    )
+    ingest.add_argument(
+        "--workers",
+        type=int,
+        help="Load and split files in a process pool with N workers.",
+    )
+    ingest.add_argument(
+        "--batch-size",
+        type=int,
+        help="Number of chunks embedded and written per batch.",
+    )
+    ingest.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Embed and store identical chunks once across all files.",
+    )
+    ingest.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate chunks, tokens, index size and run time from a sample; writes nothing.",
+    )
+    ingest.add_argument("--stats-json", help="Write counts, stage timings and memory stats to a JSON file.")
+    ingest.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also report the tracemalloc peak (slows ingest down).",
+    )
+    ingest.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Re-index into a new collection and switch to it when done (no query downtime).",
+    )
+    ingest.add_argument(
+        "--watch",
+        action="store_true",
+        help="After syncing, keep running and apply changes under data_dir as they happen.",
+    )
     ingest.set_defaults(func=_cmd_ingest)
 
     chat = subparsers.add_parser("chat", help="Chat over the indexed data")
@@ -435,6 +866,11 @@ def main() -> int:
     chat.add_argument("--output-format", choices=["markdown", "json", "plain"], default="markdown")
     chat.add_argument("--graph", action="store_true", help="Use LangGraph adaptive flow.")
     chat.add_argument("--show-usage", action="store_true", help="Print token/cost usage.")
+    chat.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the answer as it is generated (NDJSON events with --output-format json).",
+    )
     chat.add_argument("--trace", action="store_true", help="Print step-by-step graph logs.")
     chat.add_argument("--trace-preview-width", type=int, default=120)
     chat.add_argument("--trace-output", help="Write LangGraph trace output to a JSON file.")
@@ -445,6 +881,15 @@ def main() -> int:
     chat.add_argument("--page", type=int, help="Filter retrieval to a specific page number.")
     chat.set_defaults(func=_cmd_chat)
 
+    serve_cmd = subparsers.add_parser("serve", help="Answer chat requests over HTTP with warm clients")
+    serve_cmd.add_argument("--config", default="config.yaml")
+    serve_cmd.add_argument("--persist-dir")
+    serve_cmd.add_argument("--collection")
+    serve_cmd.add_argument("--host")
+    serve_cmd.add_argument("--port", type=int)
+    serve_cmd.add_argument("--verbose", action="store_true", help="Log every request.")
+    serve_cmd.set_defaults(func=_cmd_serve)
+
     list_cmd = subparsers.add_parser("list", help="List documents in Chroma")
     list_cmd.add_argument("--config", default="config.yaml")
     list_cmd.add_argument("--persist-dir")
@@ -486,6 +931,40 @@ def main() -> int:
     eval_cmd.add_argument("--page", type=int, help="Filter retrieval to a specific page number.")
     eval_cmd.set_defaults(func=_cmd_eval)
 
+    bench_chunker_cmd = subparsers.add_parser(
+        "bench-chunker", help="Compare chunking strategies on a large text"
+    )
+    bench_chunker_cmd.add_argument("--config", default="config.yaml")
+    bench_chunker_cmd.add_argument("--file", help="Text file to split (default: synthetic text).")
+    bench_chunker_cmd.add_argument("--chars", type=int, default=5_000_000, help="Synthetic text size.")
+    bench_chunker_cmd.add_argument("--chunk-size", type=int)
+    bench_chunker_cmd.add_argument("--chunk-overlap", type=int)
+    bench_chunker_cmd.add_argument("--repeat", type=int, default=3, help="Runs per strategy (best is kept).")
+    bench_chunker_cmd.set_defaults(func=_cmd_bench_chunker)
+
+    bench_index_cmd = subparsers.add_parser(
+        "bench-index", help="Sweep HNSW settings: recall@k vs exact search, latency, index size"
+    )
+    bench_index_cmd.add_argument("--config", default="config.yaml")
+    bench_index_cmd.add_argument("--persist-dir")
+    bench_index_cmd.add_argument("--collection")
+    bench_index_cmd.add_argument("--limit", type=int, default=20000, help="Vectors read from the collection (0 = all).")
+    bench_index_cmd.add_argument("--synthetic", type=int, help="Use N synthetic vectors instead of the collection.")
+    bench_index_cmd.add_argument("--dim", type=int, default=768, help="Dimension of synthetic vectors.")
+    bench_index_cmd.add_argument(
+        "--queries", help="Eval JSON or text file (one query per line) embedded with the configured model."
+    )
+    bench_index_cmd.add_argument(
+        "--num-queries", type=int, default=200, help="Queries sampled from the vectors when --queries is not set."
+    )
+    bench_index_cmd.add_argument("--k", type=int, default=10)
+    bench_index_cmd.add_argument("--space", help="Comma-separated distance spaces (l2,cosine,ip).")
+    bench_index_cmd.add_argument("--m", help="Comma-separated M values (graph degree).")
+    bench_index_cmd.add_argument("--construction-ef", help="Comma-separated construction_ef values.")
+    bench_index_cmd.add_argument("--search-ef", help="Comma-separated search_ef values.")
+    bench_index_cmd.add_argument("--output", help="Write results to a JSON file.")
+    bench_index_cmd.set_defaults(func=_cmd_bench_index)
+
     args = parser.parse_args()
     return int(args.func(args))
 
@@ -14,17 +14,67 @@ DEFAULTS: dict[str, Any] = {
     },
     "chroma": {
         "collection": "ragopslab",
+        "compact_metadata": False,
+        "index": {
+            "space": "l2",
+            "M": 16,
+            "construction_ef": 100,
+            "search_ef": 100,
+            "batch_size": 100,
+            "sync_threshold": 1000,
+        },
     },
     "models": {
         "embedding_model": "nomic-embed-text",
         "chat_model": "llama3.1:8b",
+        "embedding_batch_size": 32,
+        "embedding_concurrency": 4,
+        "embedding_max_retries": 3,
+        "embedding_retry_backoff": 0.5,
     },
     "chunking": {
         "chunk_size": 1000,
         "chunk_overlap": 200,
+        "strategy": "recursive",
     },
     "files": {
-        "extensions": ["txt", "md", "pdf", "csv", "json"],
+        "extensions": ["txt", "md", "pdf", "csv", "json", "jsonl", "ndjson"],
+        "csv_rows_per_doc": 1,
+        "csv_max_chars": 0,
+        "json_fields": [],
+        "json_flatten": False,
+        "pdf_workers": 1,
+        "pdf_cache_dir": "storage/pdf_cache",
+        "pdf_cache_max_mb": 256,
+        "ignore": [".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", ".tox"],
+    },
+    "ingest": {
+        "workers": 1,
+        "batch_size": 256,
+        "queue_size": 4,
+        "dedup": False,
+        "watch_interval": 2.0,
+        "watch_debounce": 1.0,
+        "plan_sample_per_type": 5,
+        "plan_embed_sample": 64,
+    },
+    "embedding_cache": {
+        "enabled": True,
+        "dir": "storage/embedding_cache",
+        "max_mb": 512,
+        "dtype": "float32",
+    },
+    "query_cache": {
+        "enabled": True,
+        "max_entries": 1024,
+        "dir": "storage/query_cache",
+        "max_disk_entries": 100000,
+        "answers": True,
+        "answer_threshold": 0.97,
+    },
+    "serve": {
+        "host": "127.0.0.1",
+        "port": 8765,
     },
     "list": {
         "limit": 5,
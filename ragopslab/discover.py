@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from fnmatch import fnmatch
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+IGNORE_FILE = ".ragignore"
+
+# Directories that never hold documents worth indexing.
+DEFAULT_IGNORE = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", ".tox")
+
+
+def read_ignore_file(path: Path) -> list[str]:
+    """Glob patterns from a ``.ragignore`` file: one per line, ``#`` starts a comment."""
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def _ignored(name: str, rel_path: str, is_dir: bool, patterns: Iterable[str]) -> bool:
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip("/")
+        if "/" in pattern:
+            if fnmatch(rel_path, pattern.lstrip("/")):
+                return True
+        elif fnmatch(name, pattern):
+            return True
+    return False
+
+
+def iter_files(
+    data_dir: Path,
+    extensions: Iterable[str],
+    ignore: Iterable[str] = DEFAULT_IGNORE,
+) -> Iterator[Path]:
+    """Yield matching files under ``data_dir`` as they are found.
+
+    Uses ``os.scandir`` so directory entries are classified without a ``stat``
+    per file, and filters by extension before anything else. Ignored directories
+    are pruned without being entered. Patterns come from ``ignore`` plus every
+    ``.ragignore`` on the way down (relative to the directory that holds it);
+    a pattern containing ``/`` matches the path, otherwise the entry name, and a
+    trailing ``/`` restricts it to directories. The walk is depth-first with
+    each directory's entries in name order, so the output is deterministic; it
+    is not the order of sorted full paths (``a/z.txt`` comes before ``a.txt``).
+    """
+    exts = {ext.lower().lstrip(".") for ext in extensions}
+    base_patterns = list(ignore)
+
+    def _walk(directory: str, rel_dir: str, inherited: list[tuple[str, str]]) -> Iterator[Path]:
+        local = read_ignore_file(Path(directory) / IGNORE_FILE)
+        # (pattern, directory it is relative to) so nested .ragignore files stay scoped.
+        scoped = inherited + [(pattern, rel_dir) for pattern in local]
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError:
+            return
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if not is_dir and os.path.splitext(entry.name)[1].lower().lstrip(".") not in exts:
+                continue
+            if _ignored(entry.name, rel_path, is_dir, base_patterns) or any(
+                _ignored(entry.name, _relative(rel_path, root), is_dir, [pattern])
+                for pattern, root in scoped
+            ):
+                continue
+            if is_dir:
+                yield from _walk(entry.path, rel_path, scoped)
+            elif entry.is_file():
+                yield Path(entry.path)
+
+    yield from _walk(str(data_dir), "", [])
+
+
+def _relative(rel_path: str, root: str) -> str:
+    return rel_path[len(root) + 1 :] if root else rel_path
+
+
+def is_included(
+    path: Path,
+    data_dir: Path,
+    extensions: Iterable[str],
+    ignore: Iterable[str] = DEFAULT_IGNORE,
+) -> bool:
+    """True if :func:`iter_files` would yield ``path`` (used for single changed files)."""
+    exts = {ext.lower().lstrip(".") for ext in extensions}
+    if path.suffix.lower().lstrip(".") not in exts:
+        return False
+    try:
+        parts = path.relative_to(data_dir).parts
+    except ValueError:
+        return False
+    base_patterns = list(ignore)
+    scoped: list[tuple[str, str]] = []
+    rel_dir = ""
+    directory = data_dir
+    for depth, name in enumerate(parts):
+        scoped += [(pattern, rel_dir) for pattern in read_ignore_file(directory / IGNORE_FILE)]
+        rel_path = f"{rel_dir}/{name}" if rel_dir else name
+        is_dir = depth < len(parts) - 1
+        if _ignored(name, rel_path, is_dir, base_patterns) or any(
+            _ignored(name, _relative(rel_path, root), is_dir, [pattern]) for pattern, root in scoped
+        ):
+            return False
+        rel_dir = rel_path
+        directory = directory / name
+    return True
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import hashlib
+from pathlib import Path
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterator
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS entries ("
+    " key TEXT PRIMARY KEY,"
+    " slot INTEGER NOT NULL UNIQUE,"
+    " last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)",
+]
+
+# Slots are added to the vector file in steps of this size.
+_GROW_SLOTS = 1024
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _safe_name(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk cache of embedding vectors for one model.
+
+    Layout under ``cache_dir/<model>/``: ``index.sqlite3`` maps the hash of the
+    normalized text to a slot, ``vectors.bin`` is a memory-mapped array of
+    fixed-size slots. When the vector file would exceed ``max_mb`` the least
+    recently used entries are evicted and their slots reused.
+
+    Several processes may share a cache: every lookup and write holds a SQLite
+    write lock (``BEGIN IMMEDIATE``) from reading the slot map until the
+    vectors are read or written, so a slot is never handed out twice or reused
+    under a reader, and the vector file is re-mapped when another process grew it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        model: str,
+        max_mb: float = 512,
+        dtype: str = "float32",
+    ) -> None:
+        self.root = cache_dir / _safe_name(model)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self.dtype = np.dtype(dtype)
+        self.dim = 0
+        self._load_meta()
+        self._vectors_path = self.root / "vectors.bin"
+        self._vectors: np.memmap | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self) -> int:
+        if not self.dim:
+            return 0
+        return max(1, self.max_bytes // (self.dim * self.dtype.itemsize))
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        keys = [text_key(text) for text in texts]
+        found: dict[str, int] = {}
+        with self._lock, self._write_lock():
+            for start in range(0, len(keys), 500):
+                part = keys[start : start + 500]
+                placeholders = ",".join("?" for _ in part)
+                found.update(
+                    self._conn.execute(
+                        f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", part
+                    ).fetchall()
+                )
+            if found and not self.dim:
+                # Another process stored the first vectors after this one opened the cache.
+                self._load_meta()
+            vectors = self._open_vectors(max(found.values()) + 1) if found else None
+            results: list[list[float] | None] = []
+            for key in keys:
+                slot = found.get(key)
+                if slot is None or vectors is None or slot >= vectors.shape[0]:
+                    results.append(None)
+                else:
+                    results.append(vectors[slot].astype(np.float32).tolist())
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        self.hits += len([r for r in results if r is not None])
+        self.misses += len([r for r in results if r is None])
+        return results
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]) -> None:
+        if not texts:
+            return
+        with self._lock, self._write_lock():
+            if not self.dim:
+                self._load_meta()
+            if not self.dim:
+                self.dim = len(vectors[0])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("dim", str(self.dim)), ("dtype", self.dtype.name)],
+                )
+            pending: dict[str, list[float]] = {}
+            for text, vector in zip(texts, vectors):
+                if len(vector) == self.dim:
+                    pending[text_key(text)] = vector
+            existing = {
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT key FROM entries WHERE key IN ({','.join('?' for _ in pending)})",
+                    list(pending),
+                ).fetchall()
+            } if pending else set()
+            for key in existing:
+                pending.pop(key)
+            # Never cache more than fits; keep the tail of an oversized batch.
+            items = list(pending.items())[-self.capacity :] if pending else []
+            if not items:
+                return
+            slots = self._allocate(len(items))
+            array = self._open_vectors(max(slots) + 1, grow=True)
+            now = time.time()
+            for slot, (_, vector) in zip(slots, items):
+                array[slot] = np.asarray(vector, dtype=self.dtype)
+            array.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                [(key, slot, now) for slot, (key, _) in zip(slots, items)],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._conn.close()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """One transaction holding the database write lock (commits unless an error is raised)."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def _load_meta(self) -> None:
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if "dtype" in meta:
+            self.dtype = np.dtype(meta["dtype"])
+        self.dim = int(meta["dim"]) if "dim" in meta else 0
+
+    def _allocate(self, count: int) -> list[int]:
+        """Return ``count`` free slots, evicting least recently used entries if full.
+
+        Must run inside :meth:`_write_lock`, together with the writes to the slots.
+        """
+        used = self._conn.execute("SELECT COUNT(*), MAX(slot) FROM entries").fetchone()
+        total, top = int(used[0]), (-1 if used[1] is None else int(used[1]))
+        slots: list[int] = []
+        if total == top + 1:
+            # Dense layout: hand out slots past the current end first.
+            fresh = min(count, self.capacity - (top + 1))
+            slots.extend(range(top + 1, top + 1 + max(0, fresh)))
+        else:
+            taken = {row[0] for row in self._conn.execute("SELECT slot FROM entries")}
+            for slot in range(min(self.capacity, top + 1 + count)):
+                if len(slots) == count:
+                    break
+                if slot not in taken:
+                    slots.append(slot)
+        if len(slots) < count:
+            victims = self._conn.execute(
+                "SELECT key, slot FROM entries ORDER BY last_used ASC LIMIT ?",
+                (count - len(slots),),
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM entries WHERE key = ?", [(row[0],) for row in victims]
+            )
+            slots.extend(row[1] for row in victims)
+        return slots
+
+    def _open_vectors(self, min_slots: int = 0, grow: bool = False) -> np.memmap:
+        """Map at least ``min_slots`` slots, re-mapping if another process grew the file.
+
+        Only with ``grow`` is the file extended; otherwise the mapping may stay shorter.
+        """
+        if self._vectors is not None and self._vectors.shape[0] >= min_slots:
+            return self._vectors
+        row_bytes = self.dim * self.dtype.itemsize
+        current = self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        if self._vectors is not None and self._vectors.shape[0] != current:
+            self._vectors = None
+        if grow and min_slots > current:
+            target = min(self.capacity, max(min_slots, current + _GROW_SLOTS))
+            with self._vectors_path.open("ab") as handle:
+                handle.truncate(target * row_bytes)
+            current = target
+            self._vectors = None
+        if self._vectors is None:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r+", shape=(current, self.dim)
+            )
+        return self._vectors
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an :class:`EmbeddingCache`."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache) -> None:
+        self.inner = inner
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        cached = self.cache.get_many(texts)
+        missing = [idx for idx, vector in enumerate(cached) if vector is None]
+        if missing:
+            computed = self.inner.embed_documents([texts[idx] for idx in missing])
+            self.cache.put_many([texts[idx] for idx in missing], computed)
+            for idx, vector in zip(missing, computed):
+                cached[idx] = vector
+        return cached  # type: ignore[return-value]
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self.cache.get_many([text])[0]
+        if cached is not None:
+            return cached
+        vector = self.inner.embed_query(text)
+        self.cache.put_many([text], [vector])
+        return vector
+
+    def close(self) -> None:
+        close = getattr(self.inner, "close", None)
+        if close is not None:
+            close()
+        self.cache.close()
+
+
+def with_embedding_cache(
+    inner: Embeddings,
+    model: str,
+    cache_dir: Path | None,
+    max_mb: float = 512,
+    dtype: str = "float32",
+) -> Embeddings:
+    """Wrap ``inner`` with a persistent cache, or return it unchanged when disabled."""
+    if cache_dir is None:
+        return inner
+    return CachedEmbeddings(inner, EmbeddingCache(cache_dir, model, max_mb=max_mb, dtype=dtype))
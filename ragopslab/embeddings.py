@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Callable, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+
+T = TypeVar("T")
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that batches requests and keeps several in flight.
+
+    ``embed_documents`` splits its input into ``batch_size`` slices and sends up
+    to ``concurrency`` of them at once; every call is retried with exponential
+    backoff. Output order always matches input order.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        batch_size: int = 32,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self.inner = inner
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) <= 1 or self.concurrency == 1:
+            results = [self._with_retry(self.inner.embed_documents, batch) for batch in batches]
+        else:
+            executor = self._pool()
+            results = list(
+                executor.map(
+                    lambda batch: self._with_retry(self.inner.embed_documents, batch), batches
+                )
+            )
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._with_retry(self.inner.embed_query, text)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="ragopslab-embed"
+                )
+            return self._executor
+
+    def _with_retry(self, func: Callable[[T], list], payload: T) -> list:
+        attempt = 0
+        while True:
+            try:
+                return func(payload)
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * (2**attempt))
+                attempt += 1
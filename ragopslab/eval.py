@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Any
 
 from ragopslab.chat import answer_question
+from ragopslab.session import RagSession
 
 
 @dataclass
@@ -37,30 +38,58 @@ def _expectation_met(answer: str, expected: str | list[str] | None) -> bool:
 
 def run_eval(
     eval_file: Path,
-    persist_dir: Path,
-    collection_name: str,
-    embedding_model: str,
-    chat_model: str,
-    k: int,
+    persist_dir: Path | None = None,
+    collection_name: str | None = None,
+    embedding_model: str | None = None,
+    chat_model: str | None = None,
+    k: int = 4,
     filters: dict[str, Any] | None = None,
     search_type: str = "similarity",
     mmr_fetch_k: int | None = None,
+    embedding_cache_dir: Path | None = None,
+    embedding_cache_max_mb: float = 512,
+    embedding_cache_dtype: str = "float32",
+    session: RagSession | None = None,
 ) -> dict[str, Any]:
     cases = _load_cases(eval_file)
+    # One set of clients for every case; built lazily, so an empty file costs nothing.
+    owned = session is None
+    if owned:
+        session = RagSession(
+            persist_dir=persist_dir,
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            chat_model=chat_model,
+            embedding_cache_dir=embedding_cache_dir,
+            embedding_cache_max_mb=embedding_cache_max_mb,
+            embedding_cache_dtype=embedding_cache_dtype,
+        )
+    try:
+        return _run_cases(cases, session, k, filters, search_type, mmr_fetch_k)
+    finally:
+        if owned:
+            session.close()
+
+
+def _run_cases(
+    cases: list[EvalCase],
+    session: RagSession,
+    k: int,
+    filters: dict[str, Any] | None,
+    search_type: str,
+    mmr_fetch_k: int | None,
+) -> dict[str, Any]:
     results: list[dict[str, Any]] = []
     passed = 0
 
     for case in cases:
         result = answer_question(
             query=case.question,
-            persist_dir=persist_dir,
-            collection_name=collection_name,
-            embedding_model=embedding_model,
-            chat_model=chat_model,
             k=k,
             filters=filters,
             search_type=search_type,
             mmr_fetch_k=mmr_fetch_k,
+            session=session,
         )
         ok = _expectation_met(result.answer, case.expected)
         if ok:
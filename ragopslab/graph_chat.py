@@ -2,14 +2,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, TypedDict
+from typing import Any, Callable, TypedDict
 import textwrap
 from datetime import datetime
 import json
 
-from langchain_chroma import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama import ChatOllama, OllamaEmbeddings
+from langchain_core.runnables import RunnableConfig
+
+from ragopslab.manifest import compact_filters, rehydrate_metadata
+from ragopslab.query_cache import CacheStats
+from ragopslab.session import RagSession
 from langgraph.graph import END, StateGraph
 
 
@@ -23,6 +25,12 @@ class GraphState(TypedDict, total=False):
     citations: list[dict[str, Any]]
     answer: str
     response_metadata: dict[str, Any] | None
+    filter: dict[str, Any] | None
+    search_type: str
+    fetch_k: int | None
+    retry_on_no_answer: bool
+    cached: bool
+    timing: dict[str, Any] | None
 
 
 @dataclass
@@ -34,6 +42,9 @@ class GraphChatResult:
     response_metadata: dict[str, Any] | None = None
     context: str | None = None
     trace_log: list[dict[str, Any]] | None = None
+    cache: dict[str, Any] | None = None
+    cached: bool = False
+    timing: dict[str, Any] | None = None
 
 
 def _build_context(docs: list) -> tuple[str, list[dict[str, Any]]]:
@@ -53,142 +64,226 @@ def _build_context(docs: list) -> tuple[str, list[dict[str, Any]]]:
     return "\n\n".join(context_lines), citations
 
 
+def _runtime(config: RunnableConfig) -> dict[str, Any]:
+    return config["configurable"]
+
+
+def _retrieve(state: GraphState, config: RunnableConfig) -> GraphState:
+    runtime = _runtime(config)
+    log = runtime["log"]
+    log(f"[graph] retrieve: k={state['k']}")
+    docs = runtime["session"].retrieve(
+        state["query"],
+        state["k"],
+        state.get("filter"),
+        state.get("search_type", "similarity"),
+        state.get("fetch_k"),
+        stats=runtime["cache_stats"],
+    )
+    catalog = runtime.get("catalog")
+    if catalog is not None:
+        rehydrate_metadata(catalog, [doc.metadata for doc in docs])
+    if not docs:
+        log("[graph] retrieve: no documents returned")
+        return {"docs": [], "context": "", "citations": []}
+    context, citations = _build_context(docs)
+    log(
+        f"[graph] retrieve: docs={len(docs)} context_chars={len(context)}",
+        {"docs": len(docs), "context_chars": len(context)},
+    )
+    for idx, doc in enumerate(docs, start=1):
+        metadata = doc.metadata or {}
+        source = metadata.get("source", "")
+        page = metadata.get("page", "")
+        preview = textwrap.shorten(
+            doc.page_content.replace("\n", " "),
+            width=runtime.get("trace_preview_width", 120),
+            placeholder="…",
+        )
+        log(f"[graph] doc {idx}: page={page} source={source}")
+        log(f"[graph] doc {idx} preview: {preview}")
+    return {"docs": docs, "context": context, "citations": citations}
+
+
+def _answer(state: GraphState, config: RunnableConfig) -> GraphState:
+    runtime = _runtime(config)
+    runtime["log"]("[graph] answer: generating response")
+    on_event = runtime.get("on_event")
+    if not state.get("context"):
+        if on_event is not None:
+            on_event({"event": "token", "text": "No relevant documents found."})
+        return {"answer": "No relevant documents found.", "response_metadata": {}, "cached": False}
+
+    def _emit_token(text: str) -> None:
+        on_event({"event": "token", "text": text})
+
+    on_token = _emit_token if on_event is not None else None
+    generation = runtime["session"].generate(
+        state["query"],
+        state["docs"],
+        state["context"],
+        stats=runtime["cache_stats"],
+        on_token=on_token,
+    )
+    if generation.cached:
+        runtime["log"]("[graph] answer: served from answer cache")
+    return {
+        "answer": generation.answer,
+        "response_metadata": generation.response_metadata,
+        "cached": generation.cached,
+        "timing": generation.timing(),
+    }
+
+
+def _assess(state: GraphState, config: RunnableConfig) -> str:
+    log = _runtime(config)["log"]
+    if not state.get("retry_on_no_answer", True):
+        return "end"
+    answer_text = (state.get("answer") or "").lower()
+    no_answer = (
+        "no relevant documents" in answer_text
+        or "don't know" in answer_text
+        or "do not know" in answer_text
+        or "not stated" in answer_text
+        or "not in the context" in answer_text
+    )
+    if no_answer and state["k"] < state["k_max"]:
+        log("[graph] assess: no answer, retrying with higher k")
+        return "retry"
+    log("[graph] assess: done (no retry)")
+    return "end"
+
+
+def _retry(state: GraphState, config: RunnableConfig) -> GraphState:
+    next_k = min(state["k"] * 2, state["k_max"])
+    runtime = _runtime(config)
+    runtime["log"](f"[graph] retry: k {state['k']} -> {next_k}")
+    if runtime.get("on_event") is not None:
+        # A streamed answer is superseded by the one that follows.
+        runtime["on_event"]({"event": "retry", "k": next_k})
+    return {"k": next_k, "attempts": state.get("attempts", 0) + 1}
+
+
+_ANSWER_GRAPH = None
+
+
+def answer_graph():
+    """The compiled retrieve → answer → assess/retry graph, built once per process.
+
+    Nodes take everything request-specific from the state and from
+    ``config["configurable"]`` (``session``, ``catalog``, ``log``,
+    ``cache_stats``, ``on_event``), so one compiled graph serves every query.
+    """
+    global _ANSWER_GRAPH
+    if _ANSWER_GRAPH is None:
+        graph = StateGraph(GraphState)
+        graph.add_node("retrieve", _retrieve)
+        graph.add_node("answer", _answer)
+        graph.add_node("retry", _retry)
+        graph.set_entry_point("retrieve")
+        graph.add_edge("retrieve", "answer")
+        graph.add_conditional_edges("answer", _assess, {"retry": "retry", "end": END})
+        graph.add_edge("retry", "retrieve")
+        _ANSWER_GRAPH = graph.compile()
+    return _ANSWER_GRAPH
+
+
 def answer_question_graph(
     query: str,
-    persist_dir: Path,
-    collection_name: str,
-    embedding_model: str,
-    chat_model: str,
-    k_default: int,
-    k_max: int,
-    retry_on_no_answer: bool,
+    persist_dir: Path | None = None,
+    collection_name: str | None = None,
+    embedding_model: str | None = None,
+    chat_model: str | None = None,
+    k_default: int = 4,
+    k_max: int = 12,
+    retry_on_no_answer: bool = True,
     trace: bool = False,
     trace_preview_width: int = 120,
     trace_output: Path | None = None,
     filters: dict[str, Any] | None = None,
     search_type: str = "similarity",
     mmr_fetch_k: int | None = None,
+    embedding_cache_dir: Path | None = None,
+    embedding_cache_max_mb: float = 512,
+    embedding_cache_dtype: str = "float32",
+    session: RagSession | None = None,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
 ) -> GraphChatResult:
-    embeddings = OllamaEmbeddings(model=embedding_model)
-    vectorstore = Chroma(
-        collection_name=collection_name,
-        persist_directory=str(persist_dir),
-        embedding_function=embeddings,
-    )
-    search_kwargs: dict[str, Any] = {"k": k_default}
-    if filters:
-        search_kwargs["filter"] = filters
-    if search_type == "mmr":
-        if mmr_fetch_k:
-            search_kwargs["fetch_k"] = mmr_fetch_k
-        retriever = vectorstore.as_retriever(search_type="mmr", search_kwargs=search_kwargs)
-    else:
-        retriever = vectorstore.as_retriever(search_kwargs=search_kwargs)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a helpful assistant. Use only the provided context. "
-                "If the answer is not in the context, say you don't know. "
-                "Cite sources with [#] matching the context numbers.",
-            ),
-            ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer:"),
-        ]
-    )
-    llm = ChatOllama(model=chat_model)
-    chain = prompt | llm
+    """Answer ``query`` with the adaptive graph.
+
+    See :func:`ragopslab.chat.answer_question` for ``session`` and
+    ``on_event``; each attempt is streamed, and a ``{"event": "retry", "k":
+    ...}`` event marks the start of the next one.
+    """
+    if session is None:
+        with RagSession(
+            persist_dir=persist_dir,
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            chat_model=chat_model,
+            embedding_cache_dir=embedding_cache_dir,
+            embedding_cache_max_mb=embedding_cache_max_mb,
+            embedding_cache_dtype=embedding_cache_dtype,
+        ) as owned:
+            return answer_question_graph(
+                query,
+                k_default=k_default,
+                k_max=k_max,
+                retry_on_no_answer=retry_on_no_answer,
+                trace=trace,
+                trace_preview_width=trace_preview_width,
+                trace_output=trace_output,
+                filters=filters,
+                search_type=search_type,
+                mmr_fetch_k=mmr_fetch_k,
+                session=owned,
+                on_event=on_event,
+            )
+
+    catalog = session.open_catalog()
+    if filters and catalog is not None:
+        filters = compact_filters(catalog, filters)
 
     trace_log: list[dict[str, Any]] = []
+    stats = CacheStats()
 
-    def _record(event: str, details: dict[str, Any] | None = None) -> None:
+    def _log(message: str, details: dict[str, Any] | None = None) -> None:
         trace_log.append(
             {
                 "timestamp": datetime.utcnow().isoformat() + "Z",
-                "event": event,
+                "event": message,
                 "details": details or {},
             }
         )
-
-    def _log(message: str, details: dict[str, Any] | None = None) -> None:
-        _record(message, details)
         if trace:
             print(message)
 
-    def retrieve(state: GraphState) -> GraphState:
-        _log(f"[graph] retrieve: k={state['k']}")
-        k = state["k"]
-        retriever.search_kwargs["k"] = k
-        docs = retriever.invoke(state["query"])
-        if not docs:
-            _log("[graph] retrieve: no documents returned")
-            return {"docs": [], "context": "", "citations": []}
-        context, citations = _build_context(docs)
-        _log(
-            f"[graph] retrieve: docs={len(docs)} context_chars={len(context)}",
-            {"docs": len(docs), "context_chars": len(context)},
-        )
-        for idx, doc in enumerate(docs, start=1):
-            metadata = doc.metadata or {}
-            source = metadata.get("source", "")
-            page = metadata.get("page", "")
-            preview = textwrap.shorten(
-                doc.page_content.replace("\n", " "),
-                width=trace_preview_width,
-                placeholder="…",
-            )
-            _log(f"[graph] doc {idx}: page={page} source={source}")
-            _log(f"[graph] doc {idx} preview: {preview}")
-        return {"docs": docs, "context": context, "citations": citations}
-
-    def answer(state: GraphState) -> GraphState:
-        _log("[graph] answer: generating response")
-        if not state.get("context"):
-            return {"answer": "No relevant documents found.", "response_metadata": {}}
-        response = chain.invoke({"context": state["context"], "question": state["query"]})
-        metadata = getattr(response, "response_metadata", {}) or {}
-        return {"answer": response.content, "response_metadata": metadata}
-
-    def assess(state: GraphState) -> str:
-        if not retry_on_no_answer:
-            return "end"
-        answer_text = (state.get("answer") or "").lower()
-        no_answer = (
-            "no relevant documents" in answer_text
-            or "don't know" in answer_text
-            or "do not know" in answer_text
-            or "not stated" in answer_text
-            or "not in the context" in answer_text
+    try:
+        final_state = answer_graph().invoke(
+            {
+                "query": query,
+                "k": k_default,
+                "k_max": k_max,
+                "attempts": 0,
+                "filter": filters or None,
+                "search_type": search_type,
+                "fetch_k": mmr_fetch_k,
+                "retry_on_no_answer": retry_on_no_answer,
+            },
+            config={
+                "configurable": {
+                    "session": session,
+                    "catalog": catalog,
+                    "log": _log,
+                    "cache_stats": stats,
+                    "on_event": on_event,
+                    "trace_preview_width": trace_preview_width,
+                }
+            },
         )
-        if no_answer and state["k"] < state["k_max"]:
-            _log("[graph] assess: no answer, retrying with higher k")
-            return "retry"
-        _log("[graph] assess: done (no retry)")
-        return "end"
-
-    def retry(state: GraphState) -> GraphState:
-        next_k = min(state["k"] * 2, state["k_max"])
-        _log(f"[graph] retry: k {state['k']} -> {next_k}")
-        return {"k": next_k, "attempts": state.get("attempts", 0) + 1}
-
-    graph = StateGraph(GraphState)
-    graph.add_node("retrieve", retrieve)
-    graph.add_node("answer", answer)
-    graph.add_node("retry", retry)
-    graph.set_entry_point("retrieve")
-    graph.add_edge("retrieve", "answer")
-    graph.add_conditional_edges("answer", assess, {"retry": "retry", "end": END})
-    graph.add_edge("retry", "retrieve")
-
-    app = graph.compile()
-    final_state = app.invoke(
-        {
-            "query": query,
-            "k": k_default,
-            "k_max": k_max,
-            "attempts": 0,
-        }
-    )
+    finally:
+        if catalog is not None:
+            catalog.close()
 
     if trace_output:
         trace_output.parent.mkdir(parents=True, exist_ok=True)
@@ -208,4 +303,7 @@ def answer_question_graph(
         response_metadata=final_state.get("response_metadata"),
         context=final_state.get("context", ""),
         trace_log=trace_log if trace_log else None,
+        cache=stats.to_dict() if session.query_cache is not None else None,
+        cached=final_state.get("cached", False),
+        timing=final_state.get("timing"),
     )
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from chromadb.api.models.Collection import Collection
+
+
+SPACES = ("l2", "cosine", "ip")
+
+# ``chroma.index`` keys -> Chroma's HNSW configuration keys.
+HNSW_KEYS = {
+    "space": "space",
+    "M": "max_neighbors",
+    "construction_ef": "ef_construction",
+    "search_ef": "ef_search",
+    "batch_size": "batch_size",
+    "sync_threshold": "sync_threshold",
+}
+# Fixed once the graph is built; the rest can be changed on a live collection.
+BUILD_KEYS = ("space", "M", "construction_ef")
+
+
+def _normalize(index: Mapping[str, Any] | None) -> dict[str, Any]:
+    settings: dict[str, Any] = {}
+    for key, value in (index or {}).items():
+        if key not in HNSW_KEYS:
+            raise ValueError(f"Unknown index setting: {key} (expected one of {', '.join(HNSW_KEYS)})")
+        if value is None:
+            continue
+        if key == "space":
+            if value not in SPACES:
+                raise ValueError(f"Unknown distance space: {value} (expected one of {', '.join(SPACES)})")
+            settings[key] = value
+        else:
+            settings[key] = int(value)
+            if settings[key] <= 0:
+                raise ValueError(f"Index setting {key} must be positive.")
+    return settings
+
+
+def hnsw_configuration(index: Mapping[str, Any] | None) -> dict[str, Any]:
+    """Chroma HNSW configuration for the ``chroma.index`` settings (unset keys are left out)."""
+    return {HNSW_KEYS[key]: value for key, value in _normalize(index).items()}
+
+
+def index_settings(collection: Collection) -> dict[str, Any]:
+    """The collection's HNSW settings, keyed like ``chroma.index``."""
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    return {key: hnsw[name] for key, name in HNSW_KEYS.items() if hnsw.get(name) is not None}
+
+
+def apply_index_settings(collection: Collection, index: Mapping[str, Any] | None) -> list[str]:
+    """Bring an existing collection's tunable settings in line with ``index``.
+
+    Search-time settings are updated in place. Returns the build-time settings
+    that differ, which only take effect on a new collection (``--rebuild``).
+    """
+    wanted = _normalize(index)
+    current = index_settings(collection)
+    updates = {
+        HNSW_KEYS[key]: value
+        for key, value in wanted.items()
+        # Chroma doesn't report every setting back (batch_size); leave those alone.
+        if key not in BUILD_KEYS and key in current and current[key] != value
+    }
+    if updates:
+        collection.modify(configuration={"hnsw": updates})
+    return [key for key in BUILD_KEYS if key in wanted and current.get(key, wanted[key]) != wanted[key]]
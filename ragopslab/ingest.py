@@ -1,18 +1,46 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime
+import hashlib
 import logging
+from multiprocessing import Manager
+import os
 from pathlib import Path
+import queue
 import shutil
-from typing import Iterable, Set
+import threading
+import time
+import tracemalloc
+from typing import Any, Iterable, Iterator, Set
 import csv
 import json
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_core.documents import Document
-from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
+
+from ragopslab.chunking import STRATEGIES, make_splitter
+from ragopslab.discover import DEFAULT_IGNORE, is_included, iter_files
+from ragopslab.embedding_cache import text_key, with_embedding_cache
+from ragopslab.embeddings import BatchedEmbeddings
+from ragopslab.index import apply_index_settings, hnsw_configuration
+from ragopslab.metrics import peak_rss_mb, percentile
+from ragopslab.manifest import (
+    SOURCE_METADATA_KEYS,
+    PENDING,
+    ManifestEntry,
+    SourceManifest,
+    hash_file,
+    resolve_collection,
+    source_metadata,
+)
+from ragopslab.pdf import iter_pdf_pages, shutdown_page_pool
 
 
 SUPPORTED_EXTENSIONS = {
@@ -21,6 +49,8 @@ SUPPORTED_EXTENSIONS = {
     ".pdf": "pdf",
     ".csv": "csv",
     ".json": "json",
+    ".jsonl": "json",
+    ".ndjson": "json",
 }
 
 # Silence noisy PDF parsing warnings from pypdf (e.g., xref offset issues).
@@ -35,115 +65,748 @@ class IngestStats:
     chunks_created: int
     skipped: int
     duplicates: int
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    chunks_skipped: int = 0
+    failed: int = 0
+    chunks_deduplicated: int = 0
+    # Wall time spent walking data_dir (overlaps with loading, which starts at once).
+    discover_seconds: float = 0.0
+    # Sources left half-written by an interrupted run and rolled back.
+    rolled_back: int = 0
+    # Stage timings. Load/split are summed over files (and worker processes), so
+    # with --workers they can exceed the wall time; embed/write run on the writer
+    # thread, overlapped with loading.
+    total_seconds: float = 0.0
+    load_seconds: float = 0.0
+    split_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    bytes_read: int = 0
+    # Latency of one embed call per written batch, in milliseconds.
+    embed_latency_p50_ms: float = 0.0
+    embed_latency_p95_ms: float = 0.0
+    embed_latency_p99_ms: float = 0.0
+    peak_rss_mb: float = 0.0
+    peak_worker_rss_mb: float = 0.0
+    # Only measured when ingest runs with trace_memory (tracemalloc slows Python down).
+    tracemalloc_peak_mb: float = 0.0
 
+    @property
+    def files_per_second(self) -> float:
+        return self.files_loaded / self.total_seconds if self.total_seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks_created / self.total_seconds if self.total_seconds else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["files_per_second"] = self.files_per_second
+        data["chunks_per_second"] = self.chunks_per_second
+        return data
+
+
+@dataclass
+class LoadResult:
+    """Counters of one loaded file; final once its chunk batches are consumed."""
+
+    docs_loaded: int = 0
+    error: str | None = None
+    load_seconds: float = 0.0
+    split_seconds: float = 0.0
+
+
+def _gather_files(
+    data_dir: Path, extensions: Iterable[str], ignore: Iterable[str] = DEFAULT_IGNORE
+) -> list[Path]:
+    return list(iter_files(data_dir, extensions, ignore))
+
+
+@dataclass
+class LoaderOptions:
+    """Per-format loader settings (picklable so worker processes can use them)."""
+
+    # CSV rows packed into one document; 0 means no row limit (use csv_max_chars).
+    csv_rows_per_doc: int = 1
+    # Upper bound on characters per packed CSV document; 0 disables the limit.
+    csv_max_chars: int = 0
+    # Dotted field paths kept from each JSON record; empty keeps the whole record.
+    json_fields: tuple[str, ...] = ()
+    # Render JSON records as ``dotted.key: value`` lines instead of JSON text.
+    json_flatten: bool = False
+    # Processes used to extract pages of a single PDF.
+    pdf_workers: int = 1
+    # Directory of the extracted-page cache; None disables it.
+    pdf_cache_dir: str | None = None
+    # Size limit of the page cache (least recently used files are evicted); 0 = no limit.
+    pdf_cache_max_mb: float = 256
+
+
+_MISSING = object()
+
+
+def _lookup(value: Any, path: list[str]) -> Any:
+    for part in path:
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[tuple[str, Any]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, list):
+        for idx, item in enumerate(value):
+            yield from _flatten(item, f"{prefix}.{idx}" if prefix else str(idx))
+    else:
+        yield prefix, value
+
+
+def _json_content(record: Any, options: LoaderOptions) -> str:
+    if options.json_fields and isinstance(record, dict):
+        selected = {}
+        for field in options.json_fields:
+            value = _lookup(record, field.split("."))
+            if value is not _MISSING:
+                selected[field] = value
+        record = selected
+    if options.json_flatten:
+        return "\n".join(
+            f"{key}: {'' if value is None else value}" for key, value in _flatten(record)
+        )
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _json_document(path: Path, record: Any, record_id: int, options: LoaderOptions) -> Document:
+    source_type = path.suffix.lower().lstrip(".")
+    return Document(
+        page_content=_json_content(record, options),
+        metadata={
+            "source": str(path),
+            "file_name": path.name,
+            "file_ext": source_type,
+            "source_type": source_type,
+            "record_id": record_id,
+        },
+    )
+
+
+_JSON_SPACE = " \t\r\n"
+# Characters a number can continue with; a number cut at a block boundary is re-read.
+_JSON_NUMBER_TAIL = set("0123456789.eE+-")
+
+
+def _iter_json_array(handle: Any, block_size: int = 1 << 16) -> Iterator[Any]:
+    """Incrementally decode the items of a top-level JSON array from ``handle``.
+
+    Only the current item (plus one read block) is held in memory, so arbitrarily
+    large exports can be streamed. ``handle`` must be positioned at the ``[``.
+    An item counts as decoded only once the delimiter after it has been read,
+    and items must be separated by exactly one comma.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def _fill() -> None:
+        nonlocal buffer, pos, eof
+        more = handle.read(block_size)
+        if not more:
+            eof = True
+        buffer = buffer[pos:] + more
+        pos = 0
+
+    def _peek() -> str:
+        """Next non-whitespace character ('' at the end of input), without consuming it."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _JSON_SPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                return ""
+            _fill()
+
+    def _decode() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ValueError(f"Invalid JSON array: {exc}") from exc
+                _fill()
+                continue
+            tail = buffer[end:]
+            if tail[:1] and tail[0] in _JSON_SPACE + ",]":
+                pos = end
+                return item
+            if not eof and set(tail) <= _JSON_NUMBER_TAIL:
+                # The block ended inside the item (e.g. after "2." of "2.5"); read on.
+                _fill()
+                continue
+            raise ValueError(f"Invalid JSON array: unexpected {tail[:1]!r} after an item.")
+
+    if _peek() != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    if _peek() == "]":
+        return
+    while True:
+        if _peek() in ("", ",", "]"):
+            raise ValueError("Invalid JSON array: expected a value.")
+        yield _decode()
+        delimiter = _peek()
+        if delimiter == "]":
+            return
+        if delimiter != ",":
+            raise ValueError(
+                "Unterminated JSON array." if not delimiter else "Invalid JSON array: expected ','."
+            )
+        pos += 1
+
+
+def _iter_json(path: Path, options: LoaderOptions) -> Iterator[Document]:
+    with path.open(encoding="utf-8") as handle:
+        head = handle.read(1)
+        while head and head.isspace():
+            head = handle.read(1)
+        if head == "[":
+            handle.seek(0)
+            for idx, item in enumerate(_iter_json_array(handle), start=1):
+                yield _json_document(path, item, idx, options)
+            return
+        data = json.loads(head + handle.read())
+    yield _json_document(path, data, 1, options)
+
+
+def _iter_json_lines(path: Path, options: LoaderOptions) -> Iterator[Document]:
+    with path.open(encoding="utf-8") as handle:
+        record_id = 0
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"Invalid JSON on line {line_no}: {exc.msg}") from exc
+            record_id += 1
+            yield _json_document(path, record, record_id, options)
 
-def _gather_files(data_dir: Path, extensions: Iterable[str]) -> list[Path]:
-    exts = {ext.lower().lstrip(".") for ext in extensions}
-    paths = []
-    for path in data_dir.rglob("*"):
-        if not path.is_file():
-            continue
-        if path.suffix.lower().lstrip(".") in exts:
-            paths.append(path)
-    return sorted(paths)
 
+def _csv_document(path: Path, rows: list[str], first_row: int, last_row: int) -> Document:
+    metadata: dict[str, Any] = {
+        "source": str(path),
+        "file_name": path.name,
+        "file_ext": "csv",
+        "source_type": "csv",
+        "row_id": first_row,
+    }
+    if last_row != first_row:
+        metadata["row_end"] = last_row
+    return Document(page_content="\n\n".join(rows), metadata=metadata)
 
-def _load_file(path: Path) -> list:
+
+def _iter_csv(path: Path, rows_per_doc: int, max_chars: int) -> Iterator[Document]:
+    """Stream CSV rows as documents, packing consecutive rows when configured."""
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        rows: list[str] = []
+        size = 0
+        first_row = 1
+        for idx, row in enumerate(reader, start=1):
+            content = "\n".join(f"{k}: {v}" for k, v in row.items())
+            full = rows_per_doc > 0 and len(rows) >= rows_per_doc
+            too_big = max_chars > 0 and size + len(content) > max_chars
+            if rows and (full or too_big):
+                yield _csv_document(path, rows, first_row, idx - 1)
+                rows, size, first_row = [], 0, idx
+            rows.append(content)
+            size += len(content) + 2
+        if rows:
+            yield _csv_document(path, rows, first_row, first_row + len(rows) - 1)
+
+
+def _load_file(path: Path, options: LoaderOptions | None = None) -> list:
+    return list(_iter_file(path, options))
+
+
+def _iter_file(
+    path: Path,
+    options: LoaderOptions | None = None,
+    file_hash: str | None = None,
+) -> Iterator[Document]:
+    options = options or LoaderOptions()
     suffix = path.suffix.lower()
     source_type = suffix.lstrip(".")
     if suffix in {".txt", ".md"}:
         loader = TextLoader(str(path), autodetect_encoding=True)
-        docs = loader.load()
+        docs = loader.lazy_load()
+    elif suffix == ".pdf" and (options.pdf_workers > 1 or options.pdf_cache_dir):
+        cache_dir = Path(options.pdf_cache_dir) if options.pdf_cache_dir else None
+        if cache_dir is not None and file_hash is None:
+            file_hash = hash_file(path)
+        docs = iter_pdf_pages(
+            path,
+            workers=options.pdf_workers,
+            cache_dir=cache_dir,
+            file_hash=file_hash,
+            cache_max_mb=options.pdf_cache_max_mb,
+        )
     elif suffix == ".pdf":
         loader = PyPDFLoader(str(path))
-        docs = loader.load()
+        docs = loader.lazy_load()
     elif suffix == ".csv":
-        docs = []
-        with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for idx, row in enumerate(reader, start=1):
-                content = "\n".join(f"{k}: {v}" for k, v in row.items())
-                docs.append(
-                    Document(
-                        page_content=content,
-                        metadata={
-                            "source": str(path),
-                            "file_name": path.name,
-                            "file_ext": source_type,
-                            "source_type": source_type,
-                            "row_id": idx,
-                        },
-                    )
-                )
+        docs = _iter_csv(path, options.csv_rows_per_doc, options.csv_max_chars)
     elif suffix == ".json":
-        docs = []
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            for idx, item in enumerate(data, start=1):
-                content = json.dumps(item, ensure_ascii=True)
-                docs.append(
-                    Document(
-                        page_content=content,
-                        metadata={
-                            "source": str(path),
-                            "file_name": path.name,
-                            "file_ext": source_type,
-                            "source_type": source_type,
-                            "record_id": idx,
-                        },
-                    )
-                )
-        else:
-            content = json.dumps(data, ensure_ascii=True)
-            docs.append(
-                Document(
-                    page_content=content,
-                    metadata={
-                        "source": str(path),
-                        "file_name": path.name,
-                        "file_ext": source_type,
-                        "source_type": source_type,
-                        "record_id": 1,
-                    },
-                )
-            )
+        docs = _iter_json(path, options)
+    elif suffix in {".jsonl", ".ndjson"}:
+        docs = _iter_json_lines(path, options)
     else:
-        return []
+        return
     for doc in docs:
         doc.metadata.setdefault("source", str(path))
         doc.metadata.setdefault("file_name", path.name)
         doc.metadata.setdefault("file_ext", suffix.lstrip("."))
         doc.metadata.setdefault("source_type", source_type)
-    return docs
+        yield doc
 
 
-def _existing_sources(persist_dir: Path, collection_name: str) -> Set[str]:
-    if not persist_dir.exists():
-        return set()
+def split_batches(
+    path: Path,
+    chunk_size: int,
+    chunk_overlap: int,
+    result: LoadResult,
+    options: LoaderOptions | None = None,
+    file_hash: str | None = None,
+    chunking_strategy: str = "recursive",
+    batch_size: int = 256,
+) -> Iterator[list[Document]]:
+    """Load and chunk one file, yielding chunks in batches of up to ``batch_size``.
 
-    client = chromadb.PersistentClient(path=str(persist_dir))
+    Documents are split as they stream out of the loader, so no more than a
+    batch (plus the chunks of one document) is held at a time. Counters land in
+    ``result``; errors are captured there too so one bad file can't abort a run
+    (batches yielded before the error stay yielded).
+    """
+    batch_size = max(1, batch_size)
     try:
-        collection = client.get_collection(name=collection_name)
-    except Exception:
-        return set()
+        splitter = make_splitter(chunking_strategy, chunk_size, chunk_overlap)
+        batch: list[Document] = []
+        docs = _iter_file(path, options, file_hash)
+        while True:
+            started = time.perf_counter()
+            doc = next(docs, None)
+            loaded = time.perf_counter()
+            result.load_seconds += loaded - started
+            if doc is None:
+                break
+            result.docs_loaded += 1
+            batch.extend(splitter.split_documents([doc]))
+            result.split_seconds += time.perf_counter() - loaded
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                del batch[:batch_size]
+        if batch:
+            yield batch
+    except Exception as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
 
-    total = collection.count()
-    if total == 0:
-        return set()
 
-    sources: Set[str] = set()
+def _split_to_queue(
+    out: Any,
+    stop: Any,
+    path: Path,
+    chunk_size: int,
+    chunk_overlap: int,
+    options: LoaderOptions | None,
+    file_hash: str | None,
+    chunking_strategy: str,
+    batch_size: int,
+) -> None:
+    """Worker side of :func:`_load_files`: chunk batches, then the final LoadResult."""
+    result = LoadResult()
+    try:
+        for batch in split_batches(
+            path, chunk_size, chunk_overlap, result, options, file_hash, chunking_strategy, batch_size
+        ):
+            if stop.is_set():
+                break
+            out.put(batch)
+    finally:
+        out.put(result)
+
+
+def _receive(out: Any, future: Future[None], result: LoadResult) -> Iterator[list[Document]]:
+    """Chunk batches a worker sends through ``out``, copying its counters into ``result``."""
+    while True:
+        try:
+            item = out.get(timeout=0.1)
+        except queue.Empty:
+            # A worker that died never sends its LoadResult.
+            if future.done() and future.exception() is not None:
+                exc = future.exception()
+                result.error = f"{type(exc).__name__}: {exc}"
+                return
+            continue
+        if isinstance(item, LoadResult):
+            result.docs_loaded = item.docs_loaded
+            result.error = item.error
+            result.load_seconds = item.load_seconds
+            result.split_seconds = item.split_seconds
+            return
+        yield item
+
+
+@dataclass
+class _FileTask:
+    path: Path
+    stat: os.stat_result
+    digest: str
+    previous: ManifestEntry | None
+
+
+def _load_files(
+    tasks: Iterable[_FileTask],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int,
+    max_pending: int,
+    options: LoaderOptions | None = None,
+    chunking_strategy: str = "recursive",
+    batch_size: int = 256,
+) -> Iterator[tuple[_FileTask, LoadResult, Iterator[list[Document]]]]:
+    """Load and split files in input order, in a process pool when workers > 1.
+
+    Each file comes with an iterator of its chunk batches, which must be consumed
+    before the next file is requested; its :class:`LoadResult` is final after
+    that. Workers hand batches over through queues of ``max_pending`` batches and
+    at most ``max_pending`` files are in flight, so neither many files nor one
+    large file pile up ahead of the embed/write stage.
+    """
+    if workers <= 1:
+        for task in tasks:
+            result = LoadResult()
+            yield task, result, split_batches(
+                task.path,
+                chunk_size,
+                chunk_overlap,
+                result,
+                options,
+                task.digest,
+                chunking_strategy,
+                batch_size,
+            )
+        return
+    if options is not None and options.pdf_workers > 1:
+        # Files are already spread over processes; don't nest a page-level pool.
+        options = replace(options, pdf_workers=1)
+    with Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+        stop = manager.Event()
+        in_flight: deque[tuple[_FileTask, Future[None], Any]] = deque()
+
+        def _next() -> Iterator[tuple[_FileTask, LoadResult, Iterator[list[Document]]]]:
+            task, future, out = in_flight[0]
+            result = LoadResult()
+            batches = _receive(out, future, result)
+            yield task, result, batches
+            # Drain whatever the caller left so the worker can finish.
+            for _ in batches:
+                pass
+            in_flight.popleft()
+
+        try:
+            for task in tasks:
+                out = manager.Queue(maxsize=max(1, max_pending))
+                future = executor.submit(
+                    _split_to_queue,
+                    out,
+                    stop,
+                    task.path,
+                    chunk_size,
+                    chunk_overlap,
+                    options,
+                    task.digest,
+                    chunking_strategy,
+                    batch_size,
+                )
+                in_flight.append((task, future, out))
+                if len(in_flight) >= max(max_pending, workers):
+                    yield from _next()
+            while in_flight:
+                yield from _next()
+        finally:
+            # Stopped early: cancel queued files and unblock the running ones.
+            stop.set()
+            for _, future, out in in_flight:
+                if not future.cancel():
+                    for _ in _receive(out, future, LoadResult()):
+                        pass
+
+
+class _BatchWriter:
+    """Embeds and writes chunk batches on a background thread.
+
+    Batches are handed over through a bounded queue, so loading blocks once
+    ``queue_size`` batches are waiting instead of buffering the whole corpus.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        embeddings: Embeddings,
+        queue_size: int,
+        dedup: bool = False,
+    ) -> None:
+        self._collection = collection
+        self._embeddings = embeddings
+        self._dedup = dedup
+        self._queue: queue.Queue[tuple[list[Document], list[str]] | None] = queue.Queue(
+            maxsize=max(1, queue_size)
+        )
+        self._error: BaseException | None = None
+        # Number of submitted chunks that are durably stored, in submission order.
+        self.written = 0
+        self.skipped = 0
+        # Content-addressed chunks already stored under another source (dedup mode).
+        self.shared: dict[str, Set[str | int]] = {}
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+        self.embed_latencies: list[float] = []
+        # Length of the vectors written (0 until the first batch is embedded).
+        self.dimension = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, chunks: list[Document], ids: list[str]) -> None:
+        self._raise_if_failed()
+        self._queue.put((chunks, ids))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            chunks, ids = item
+            try:
+                # Ids are deterministic, so chunks already in the collection (from
+                # an earlier or interrupted run) are skipped instead of re-embedded.
+                include = ["metadatas"] if self._dedup else []
+                started = time.perf_counter()
+                stored = self._collection.get(ids=ids, include=include)
+                self.write_seconds += time.perf_counter() - started
+                present = set(stored.get("ids", []) or [])
+                if self._dedup:
+                    self._record_shared(chunks, ids, stored)
+                new_chunks = [c for c, i in zip(chunks, ids) if i not in present]
+                new_ids = [i for i in ids if i not in present]
+                if new_chunks:
+                    started = time.perf_counter()
+                    vectors = self._embeddings.embed_documents(
+                        [chunk.page_content for chunk in new_chunks]
+                    )
+                    embedded = time.perf_counter()
+                    self.embed_seconds += embedded - started
+                    self.embed_latencies.append(embedded - started)
+                    if vectors:
+                        self.dimension = len(vectors[0])
+                    self._collection.upsert(
+                        ids=new_ids,
+                        embeddings=vectors,
+                        documents=[chunk.page_content for chunk in new_chunks],
+                        metadatas=[chunk.metadata for chunk in new_chunks],
+                    )
+                    self.write_seconds += time.perf_counter() - embedded
+            except BaseException as exc:
+                self._error = exc
+                continue
+            self.skipped += len(ids) - len(new_ids)
+            self.written += len(ids)
+
+    def _record_shared(self, chunks: list[Document], ids: list[str], stored: dict) -> None:
+        by_id = {chunk_id: chunk for chunk_id, chunk in zip(ids, chunks)}
+        for chunk_id, metadata in zip(stored.get("ids", []) or [], stored.get("metadatas", []) or []):
+            source = _owner(by_id[chunk_id].metadata)
+            metadata = metadata or {}
+            if source is None or source == _owner(metadata) or source in _duplicate_sources(metadata):
+                continue
+            self.shared.setdefault(chunk_id, set()).add(source)
+
+
+def _backfill_manifest(collection: Collection, manifest: SourceManifest) -> None:
+    """Record sources indexed before the catalog existed; scans the collection once."""
+    total = collection.count()
+    known = manifest.entries()
+    scanned: dict[str, list[str]] = {}
     batch_size = 1000
     for offset in range(0, total, batch_size):
-        result = collection.get(
-            include=["metadatas"], limit=batch_size, offset=offset
-        )
-        for metadata in result.get("metadatas", []) or []:
-            if not metadata:
+        result = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        for chunk_id, metadata in zip(result.get("ids", []), result.get("metadatas", []) or []):
+            source = (metadata or {}).get("source")
+            if source and source not in known:
+                scanned.setdefault(source, []).append(chunk_id)
+    for source, ids in scanned.items():
+        # Unknown size/hash: the next --sync treats these sources as changed.
+        manifest.upsert(ManifestEntry(source=source, size=-1, mtime=-1.0, sha256="", chunk_ids=ids))
+    manifest.mark_complete()
+
+
+def _chunk_id(chunk: Document, content_addressed: bool = False) -> str:
+    """Stable id from source, loader locator, chunk offset and content hash.
+
+    With ``content_addressed`` the id depends only on the whitespace-normalized
+    text, so identical chunks from different sources collapse to one vector.
+    """
+    if content_addressed:
+        return text_key(chunk.page_content)[:32]
+    metadata = chunk.metadata or {}
+    locator = ""
+    for key in ("page", "row_id", "record_id"):
+        if key in metadata:
+            locator = f"{key}={metadata[key]}"
+            break
+    content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+    parts = [
+        str(metadata.get("source", "")),
+        locator,
+        str(metadata.get("start_index", "")),
+        content_hash,
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _owner(metadata: dict[str, Any]) -> str | int | None:
+    """A chunk's owning source: its path, or its integer source id in compact mode."""
+    return metadata.get("source_id", metadata.get("source"))
+
+
+def _owner_metadata(owner: str | int, manifest: SourceManifest) -> dict[str, Any]:
+    if isinstance(owner, int):
+        metadata = source_metadata(manifest.resolve([owner]).get(owner, ""))
+        return _compact_metadata(metadata, owner)
+    return source_metadata(owner)
+
+
+def _compact_metadata(metadata: dict[str, Any], source_id: int) -> dict[str, Any]:
+    compact = {key: value for key, value in metadata.items() if key not in SOURCE_METADATA_KEYS}
+    compact["source_id"] = source_id
+    return compact
+
+
+def _duplicate_sources(metadata: dict[str, Any]) -> list[str]:
+    raw = metadata.get("duplicate_sources")
+    return json.loads(raw) if raw else []
+
+
+def _set_duplicate_sources(metadata: dict[str, Any], sources: list[str]) -> None:
+    if sources:
+        metadata["duplicate_sources"] = json.dumps(sources, ensure_ascii=False)
+        metadata["duplicate_count"] = len(sources)
+    else:
+        # Chroma merges metadata on update; None removes the key.
+        metadata["duplicate_sources"] = None
+        metadata["duplicate_count"] = None
+
+
+def _add_duplicate_sources(collection: Collection, shared: dict[str, Set[str | int]]) -> None:
+    """Record extra originating sources on chunks that were stored only once."""
+    ids = sorted(shared)
+    for start in range(0, len(ids), 500):
+        result = collection.get(ids=ids[start : start + 500], include=["metadatas"])
+        update_ids: list[str] = []
+        update_metadatas: list[dict[str, Any]] = []
+        for chunk_id, metadata in zip(result.get("ids", []), result.get("metadatas", [])):
+            metadata = dict(metadata or {})
+            sources = _duplicate_sources(metadata)
+            extra = sorted(shared[chunk_id] - set(sources) - {_owner(metadata)})
+            if not extra:
+                continue
+            _set_duplicate_sources(metadata, sources + extra)
+            update_ids.append(chunk_id)
+            update_metadatas.append(metadata)
+        if update_ids:
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+
+
+def _release_chunks(
+    collection: Collection, ids: list[str], source: str | int, manifest: SourceManifest
+) -> None:
+    """Drop ``source``'s claim on chunks, deleting those no other source shares."""
+    if not ids:
+        return
+    result = collection.get(ids=ids, include=["metadatas"])
+    delete_ids: list[str] = []
+    update_ids: list[str] = []
+    update_metadatas: list[dict[str, Any]] = []
+    for chunk_id, metadata in zip(result.get("ids", []), result.get("metadatas", [])):
+        metadata = dict(metadata or {})
+        sources = _duplicate_sources(metadata)
+        owner = _owner(metadata)
+        if owner is None or owner == source:
+            if not sources:
+                delete_ids.append(chunk_id)
                 continue
-            source = metadata.get("source")
-            if source:
-                sources.add(source)
-    return sources
+            # Promote the next originating source to be the chunk's primary one.
+            metadata.update(_owner_metadata(sources[0], manifest))
+            sources = sources[1:]
+        elif source in sources:
+            sources.remove(source)
+        else:
+            continue
+        _set_duplicate_sources(metadata, sources)
+        update_ids.append(chunk_id)
+        update_metadatas.append(metadata)
+    if delete_ids:
+        collection.delete(ids=delete_ids)
+    if update_ids:
+        collection.update(ids=update_ids, metadatas=update_metadatas)
+
+
+def make_ingest_embeddings(
+    embedding_model: str,
+    embedding_batch_size: int = 32,
+    embedding_concurrency: int = 4,
+    embedding_max_retries: int = 3,
+    embedding_retry_backoff: float = 0.5,
+    embedding_cache_dir: Path | None = None,
+    embedding_cache_max_mb: float = 512,
+    embedding_cache_dtype: str = "float32",
+) -> Embeddings:
+    """Batched, retrying (and optionally cached) embedder used for ingest."""
+    return with_embedding_cache(
+        BatchedEmbeddings(
+            OllamaEmbeddings(model=embedding_model),
+            batch_size=embedding_batch_size,
+            concurrency=embedding_concurrency,
+            max_retries=embedding_max_retries,
+            retry_backoff=embedding_retry_backoff,
+        ),
+        model=embedding_model,
+        cache_dir=embedding_cache_dir,
+        max_mb=embedding_cache_max_mb,
+        dtype=embedding_cache_dtype,
+    )
 
 
 def ingest_directory(
@@ -155,59 +818,505 @@ def ingest_directory(
     chunk_overlap: int,
     extensions: Iterable[str],
     reset: bool = False,
+    sync: bool = False,
+    workers: int = 1,
+    batch_size: int = 256,
+    queue_size: int = 4,
+    embedding_batch_size: int = 32,
+    embedding_concurrency: int = 4,
+    embedding_max_retries: int = 3,
+    embedding_retry_backoff: float = 0.5,
+    embedding_cache_dir: Path | None = None,
+    embedding_cache_max_mb: float = 512,
+    embedding_cache_dtype: str = "float32",
+    dedup: bool = False,
+    loader_options: LoaderOptions | None = None,
+    compact_metadata: bool = False,
+    ignore: Iterable[str] = DEFAULT_IGNORE,
+    chunking_strategy: str = "recursive",
+    trace_memory: bool = False,
+    index: dict[str, Any] | None = None,
+    paths: Iterable[Path] | None = None,
+    client: ClientAPI | None = None,
+    embeddings: Embeddings | None = None,
 ) -> IngestStats:
+    """Index ``data_dir`` into the collection.
+
+    ``paths`` limits the run to those files (typically the ones a watcher saw
+    change): with ``sync``, listed files that no longer exist are removed and
+    nothing outside the list is touched. ``index`` holds the ``chroma.index``
+    HNSW settings used when the collection is created. ``client`` and ``embeddings`` let a
+    long-running caller reuse warm instances; a passed-in embedder is not closed.
+    """
+    run_started = time.perf_counter()
     data_dir = data_dir.resolve()
     persist_dir = persist_dir.resolve()
 
     if not data_dir.exists() or not data_dir.is_dir():
         raise FileNotFoundError(f"Data directory not found: {data_dir}")
+    if chunking_strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy: {chunking_strategy}")
+    hnsw = hnsw_configuration(index)
 
     if reset and persist_dir.exists():
         shutil.rmtree(persist_dir)
 
     persist_dir.mkdir(parents=True, exist_ok=True)
+    collection_name = resolve_collection(persist_dir, collection_name)
 
-    paths = _gather_files(data_dir, extensions)
-    if not paths:
-        raise ValueError("No files found for the given extensions.")
+    if client is None:
+        client = chromadb.PersistentClient(path=str(persist_dir))
+    # No server-side embedding function: vectors always come from ``embeddings``.
+    collection = client.get_or_create_collection(
+        name=collection_name,
+        embedding_function=None,
+        configuration={"hnsw": hnsw} if hnsw else None,
+    )
+    # An existing collection keeps the settings it was created with.
+    stale_settings = apply_index_settings(collection, index)
+    if stale_settings:
+        print(
+            f"Index settings {', '.join(stale_settings)} differ from collection "
+            f"'{collection_name}'; run ingest --rebuild to apply them."
+        )
+    manifest = SourceManifest(persist_dir, collection_name)
+    # Everything below may fail part way (Ollama down, Chroma errors); the catalog
+    # and an embedder created here are released either way.
+    owns_embeddings = embeddings is None
+    writer: _BatchWriter | None = None
+    rolled_back = 0
+    added = 0
+    updated = 0
+    removed_sources: list[str] = []
+    try:
+        if not manifest.is_complete():
+            _backfill_manifest(collection, manifest)
+        # Catalog rows only (no chunk ids): O(number of sources).
+        known = manifest.entries()
+        if not known and collection.count() == 0:
+            manifest.set_compact_metadata(compact_metadata)
+        elif manifest.compact_metadata != compact_metadata:
+            stored_mode = manifest.compact_metadata
+            raise ValueError(
+                f"Collection '{collection_name}' was built with compact_metadata={stored_mode}; "
+                "re-ingest with --reset to change it."
+            )
+        stored_model, _ = manifest.embedding
+        if stored_model and stored_model != embedding_model:
+            raise ValueError(
+                f"Collection '{collection_name}' was embedded with '{stored_model}'; "
+                "use ingest --rebuild to switch embedding models."
+            )
 
-    existing_sources = set() if reset else _existing_sources(persist_dir, collection_name)
+        def _owner_of(source: str) -> str | int:
+            return manifest.source_id(source) if compact_metadata else source
 
-    docs = []
-    skipped = 0
-    duplicates = 0
-    for path in paths:
-        if str(path) in existing_sources:
-            print(f"Duplicate: {path}")
-            duplicates += 1
-            continue
-        loaded = _load_file(path)
-        if not loaded:
-            skipped += 1
-            continue
-        docs.extend(loaded)
+        def _roll_back(entry: ManifestEntry) -> None:
+            leftover = sorted(set(entry.pending_ids) - set(entry.chunk_ids))
+            _release_chunks(collection, leftover, _owner_of(entry.source), manifest)
+            if entry.status == PENDING:
+                manifest.remove(entry.source)
+            else:
+                manifest.finish(entry.source)
 
-    if not docs:
-        raise ValueError("No new documents loaded. Check duplicates or file types.")
+        # Roll back sources an earlier run left half-written; they are redone below.
+        for entry in manifest.unfinished():
+            _roll_back(entry)
+            rolled_back += 1
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-    chunks = splitter.split_documents(docs)
+        duplicates = 0
+        unchanged = 0
+        # Paths stream straight from the walker into loading; no full listing up front.
+        seen: Set[str] = set()
+        discover_seconds = 0.0
+        extensions = list(extensions)
+        scope: Set[str] | None = None
+        if paths is not None:
+            candidates = sorted({path.resolve() for path in paths})
+            scope = {str(path) for path in candidates}
 
-    embeddings = OllamaEmbeddings(model=embedding_model)
-    vectorstore = Chroma(
-        collection_name=collection_name,
-        persist_directory=str(persist_dir),
-        embedding_function=embeddings,
-    )
-    vectorstore.add_documents(chunks)
-
-    return IngestStats(
-        files_seen=len(paths),
-        files_loaded=len(paths) - skipped,
-        docs_loaded=len(docs),
-        chunks_created=len(chunks),
-        skipped=skipped,
-        duplicates=duplicates,
+        def _discover() -> Iterator[Path]:
+            nonlocal discover_seconds
+            if paths is None:
+                walker = iter_files(data_dir, extensions, ignore)
+            else:
+                walker = (
+                    path
+                    for path in candidates
+                    if path.is_file() and is_included(path, data_dir, extensions, ignore)
+                )
+            while True:
+                started = time.perf_counter()
+                path = next(walker, None)
+                discover_seconds += time.perf_counter() - started
+                if path is None:
+                    return
+                seen.add(str(path))
+                yield path
+
+        def _tasks() -> Iterator[_FileTask]:
+            nonlocal duplicates, unchanged
+            # Files are hashed a few ahead on threads (reads and hashlib release the
+            # GIL), so hashing overlaps loading and embedding instead of stalling them.
+            lookahead = max(2, workers)
+            hashing: deque[tuple[Path, os.stat_result, ManifestEntry | None, Future[str]]] = deque()
+
+            def _hashed() -> _FileTask | None:
+                nonlocal unchanged
+                path, stat, previous, future = hashing.popleft()
+                digest = future.result()
+                source = str(path)
+                if previous is not None and previous.sha256 == digest:
+                    manifest.touch(source, stat.st_mtime)
+                    unchanged += 1
+                    return None
+                if previous is not None:
+                    previous = manifest.get(source)
+                return _FileTask(path=path, stat=stat, digest=digest, previous=previous)
+
+            with ThreadPoolExecutor(lookahead, thread_name_prefix="ragopslab-hash") as hasher:
+                for path in _discover():
+                    source = str(path)
+                    stat = path.stat()
+                    previous = known.get(source)
+                    if sync:
+                        if (
+                            previous is not None
+                            and previous.size == stat.st_size
+                            and previous.mtime == stat.st_mtime
+                        ):
+                            unchanged += 1
+                            continue
+                    elif source in known:
+                        print(f"Duplicate: {path}")
+                        duplicates += 1
+                        continue
+                    hashing.append((path, stat, previous, hasher.submit(hash_file, path)))
+                    if len(hashing) > lookahead and (task := _hashed()) is not None:
+                        yield task
+                while hashing:
+                    if (task := _hashed()) is not None:
+                        yield task
+
+        if embeddings is None:
+            embeddings = make_ingest_embeddings(
+                embedding_model,
+                embedding_batch_size=embedding_batch_size,
+                embedding_concurrency=embedding_concurrency,
+                embedding_max_retries=embedding_max_retries,
+                embedding_retry_backoff=embedding_retry_backoff,
+                embedding_cache_dir=embedding_cache_dir,
+                embedding_cache_max_mb=embedding_cache_max_mb,
+                embedding_cache_dtype=embedding_cache_dtype,
+            )
+        tracing = trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        writer = _BatchWriter(collection, embeddings, queue_size=queue_size, dedup=dedup)
+
+        batch_chunks: list[Document] = []
+        batch_ids: list[str] = []
+        produced = 0
+        enqueued = 0
+        # Dedup mode: every chunk id queued this run, and extra sources seen for it.
+        run_ids: dict[str, str | int] = {}
+        shared: dict[str, Set[str | int]] = {}
+        deduplicated = 0
+        # Sources that failed after some of their chunks were queued; rolled back at the end.
+        failed_sources: list[str] = []
+        # (end position in the chunk stream, manifest entry, chunk ids it replaces, owner);
+        # an entry is committed once the writer has stored everything up to its end.
+        uncommitted: deque[tuple[int, ManifestEntry, list[str], str | int]] = deque()
+
+        def _commit_written() -> None:
+            while uncommitted and uncommitted[0][0] <= writer.written:
+                _, entry, old_ids, owner = uncommitted.popleft()
+                stale = sorted(set(old_ids) - set(entry.chunk_ids))
+                # Commit first (keeping the stale ids pending), so a crash while
+                # releasing them is finished by the next run's recovery.
+                manifest.upsert(entry, stale_ids=stale)
+                if stale:
+                    _release_chunks(collection, stale, owner, manifest)
+                    manifest.finish(entry.source)
+
+        docs_loaded = 0
+        files_loaded = 0
+        skipped = 0
+        failed = 0
+        load_seconds = split_seconds = 0.0
+        bytes_read = 0
+        try:
+            loaded_files = _load_files(
+                _tasks(),
+                chunk_size,
+                chunk_overlap,
+                workers,
+                max_pending=queue_size,
+                options=loader_options,
+                chunking_strategy=chunking_strategy,
+                batch_size=batch_size,
+            )
+            for task, result, batches in loaded_files:
+                source = str(task.path)
+                owner = _owner_of(source)
+                old_ids = list(task.previous.chunk_ids) if task.previous is not None else []
+                ids: list[str] = []
+                seen_ids: Set[str] = set()
+                began = False
+                for chunks in batches:
+                    fresh: list[tuple[Document, str]] = []
+                    for chunk in chunks:
+                        chunk_id = _chunk_id(chunk, content_addressed=dedup)
+                        if chunk_id in seen_ids:
+                            deduplicated += int(dedup)
+                            continue
+                        seen_ids.add(chunk_id)
+                        ids.append(chunk_id)
+                        fresh.append((chunk, chunk_id))
+                    # Checkpoint each batch before any of its chunks can reach the collection.
+                    if not began:
+                        manifest.begin(source, task.stat.st_size, task.stat.st_mtime)
+                        began = True
+                    manifest.add_pending(source, [chunk_id for _, chunk_id in fresh])
+                    for chunk, chunk_id in fresh:
+                        if dedup:
+                            first_owner = run_ids.setdefault(chunk_id, owner)
+                            if first_owner != owner:
+                                shared.setdefault(chunk_id, set()).add(owner)
+                                deduplicated += 1
+                                continue
+                        if compact_metadata:
+                            chunk.metadata = _compact_metadata(chunk.metadata, owner)
+                        batch_chunks.append(chunk)
+                        batch_ids.append(chunk_id)
+                        enqueued += 1
+                        if len(batch_ids) >= batch_size:
+                            writer.put(batch_chunks, batch_ids)
+                            batch_chunks, batch_ids = [], []
+                load_seconds += result.load_seconds
+                split_seconds += result.split_seconds
+                bytes_read += task.stat.st_size
+                if result.error is not None:
+                    print(f"Failed: {task.path} ({result.error})")
+                    failed += 1
+                    if began:
+                        failed_sources.append(source)
+                        # Later sources must store these chunks themselves.
+                        for chunk_id in ids:
+                            if run_ids.get(chunk_id) == owner:
+                                del run_ids[chunk_id]
+                    continue
+                if not result.docs_loaded and task.previous is None:
+                    skipped += 1
+                    continue
+                # A known source that now loads nothing is an update to zero chunks,
+                # so its old chunks are released below like any other stale ids.
+                docs_loaded += result.docs_loaded
+                files_loaded += int(result.docs_loaded > 0)
+                produced += len(ids)
+                entry = ManifestEntry(
+                    source=source,
+                    size=task.stat.st_size,
+                    mtime=task.stat.st_mtime,
+                    sha256=task.digest,
+                    chunk_ids=ids,
+                )
+                uncommitted.append((enqueued, entry, old_ids, owner))
+                if task.previous is None:
+                    added += 1
+                else:
+                    updated += 1
+                _commit_written()
+            if batch_ids:
+                writer.put(batch_chunks, batch_ids)
+        finally:
+            try:
+                writer.close()
+            finally:
+                # Loading, embedding and writing are done: that is the memory-heavy part.
+                tracemalloc_peak = (
+                    tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+                )
+                if tracing:
+                    tracemalloc.stop()
+                # Sources whose chunks were all stored before a failure stay committed.
+                _commit_written()
+
+        if dedup:
+            for chunk_id, sources in writer.shared.items():
+                shared.setdefault(chunk_id, set()).update(sources)
+            deduplicated += sum(len(sources) for sources in writer.shared.values())
+            _add_duplicate_sources(collection, shared)
+        # Every chunk queued for a failed source is written by now; take them back out.
+        for source in failed_sources:
+            entry = manifest.get(source)
+            if entry is not None:
+                _roll_back(entry)
+
+        if not seen and not sync:
+            raise ValueError("No files found for the given extensions.")
+        if not produced and not sync:
+            raise ValueError("No new documents loaded. Check duplicates or file types.")
+        if sync:
+            removed_sources.extend(
+                source
+                for source in known
+                if source not in seen and (scope is None or source in scope)
+            )
+        for source in removed_sources:
+            entry = manifest.get(source)
+            if entry is not None:
+                _release_chunks(collection, entry.chunk_ids, _owner_of(source), manifest)
+            manifest.remove(source)
+
+        latencies_ms = [seconds * 1000 for seconds in writer.embed_latencies]
+        return IngestStats(
+            files_seen=len(seen),
+            files_loaded=files_loaded,
+            docs_loaded=docs_loaded,
+            chunks_created=produced,
+            skipped=skipped,
+            duplicates=duplicates,
+            added=added,
+            updated=updated,
+            removed=len(removed_sources),
+            unchanged=unchanged,
+            chunks_skipped=writer.skipped,
+            failed=failed,
+            chunks_deduplicated=deduplicated,
+            discover_seconds=discover_seconds,
+            rolled_back=rolled_back,
+            total_seconds=time.perf_counter() - run_started,
+            load_seconds=load_seconds,
+            split_seconds=split_seconds,
+            embed_seconds=writer.embed_seconds,
+            write_seconds=writer.write_seconds,
+            bytes_read=bytes_read,
+            embed_latency_p50_ms=percentile(latencies_ms, 50),
+            embed_latency_p95_ms=percentile(latencies_ms, 95),
+            embed_latency_p99_ms=percentile(latencies_ms, 99),
+            peak_rss_mb=peak_rss_mb(),
+            peak_worker_rss_mb=peak_rss_mb(children=True),
+            tracemalloc_peak_mb=tracemalloc_peak / (1024 * 1024),
+        )
+    finally:
+        try:
+            if owns_embeddings and embeddings is not None:
+                embeddings.close()
+            shutdown_page_pool()
+        finally:
+            try:
+                # Readers embed queries with the model the collection was built with.
+                if writer is not None and writer.dimension:
+                    manifest.set_embedding(embedding_model, writer.dimension)
+                # Readers cache retrievals per collection version.
+                written = writer.written if writer is not None else 0
+                if rolled_back or written or added or updated or removed_sources:
+                    manifest.bump_version()
+            finally:
+                manifest.close()
+
+
+@dataclass
+class RebuildResult:
+    stats: IngestStats
+    collection: str
+    previous: str
+    # Generations older than ``previous`` deleted by this rebuild.
+    dropped: list[str] = field(default_factory=list)
+
+
+def _drop_collection(client: ClientAPI, persist_dir: Path, name: str) -> None:
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    manifest = SourceManifest(persist_dir, name)
+    try:
+        manifest.drop()
+    finally:
+        manifest.close()
+
+
+def _generation(alias: str, name: str) -> str | None:
+    """Sort key of a collection built for ``alias`` ('' for the original), else None."""
+    if name == alias:
+        return ""
+    prefix = f"{alias}__"
+    return name[len(prefix) :] if name.startswith(prefix) else None
+
+
+def _validate_collection(client: ClientAPI, persist_dir: Path, name: str) -> None:
+    """Refuse to serve a rebuilt collection that is empty, inconsistent or unqueryable."""
+    collection = client.get_collection(name)
+    count = collection.count()
+    if count == 0:
+        raise ValueError("Rebuilt collection is empty.")
+    manifest = SourceManifest(persist_dir, name)
+    try:
+        if manifest.unfinished():
+            raise ValueError("Rebuilt collection has unfinished sources.")
+        catalogued = sum(entry.chunk_count for entry in manifest.sources())
+    finally:
+        manifest.close()
+    if count > catalogued:
+        raise ValueError(
+            f"Rebuilt collection has {count} chunks but the catalog lists {catalogued}."
+        )
+    probe = collection.get(limit=1, include=["embeddings"])
+    hits = collection.query(query_embeddings=probe["embeddings"], n_results=1)
+    if not hits.get("ids") or not hits["ids"][0]:
+        raise ValueError("Rebuilt collection did not answer a probe query.")
+
+
+def rebuild_collection(
+    data_dir: Path,
+    persist_dir: Path,
+    collection_name: str,
+    **ingest_kwargs: Any,
+) -> RebuildResult:
+    """Re-index into a shadow collection, then flip the ``collection_name`` alias to it.
+
+    Readers resolve the alias on every query, so they keep using the current
+    collection until the new one has been fully built and validated. The
+    previous collection is kept after the flip, so readers that resolved the
+    alias just before it can finish their queries; it is deleted by the next
+    rebuild. On failure the shadow is deleted and the alias is left alone. ``ingest_kwargs`` are passed to
+    :func:`ingest_directory`; a different ``embedding_model`` is recorded for the
+    shadow, and readers switch to it together with the alias.
+    """
+    persist_dir = persist_dir.resolve()
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    previous = resolve_collection(persist_dir, collection_name)
+    shadow = f"{collection_name}__{datetime.utcnow():%Y%m%d%H%M%S%f}"
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    try:
+        stats = ingest_directory(
+            data_dir=data_dir,
+            persist_dir=persist_dir,
+            collection_name=shadow,
+            client=client,
+            **ingest_kwargs,
+        )
+        _validate_collection(client, persist_dir, shadow)
+    except BaseException:
+        _drop_collection(client, persist_dir, shadow)
+        raise
+
+    manifest = SourceManifest(persist_dir, shadow)
+    try:
+        manifest.set_alias(collection_name)
+    finally:
+        manifest.close()
+    # Drop generations retired by an earlier rebuild; nothing resolves to them any more.
+    cutoff = _generation(collection_name, previous) or ""
+    dropped = sorted(
+        collection.name
+        for collection in client.list_collections()
+        if collection.name not in (previous, shadow)
+        and (generation := _generation(collection_name, collection.name)) is not None
+        and generation < cutoff
     )
+    for name in dropped:
+        _drop_collection(client, persist_dir, name)
+    return RebuildResult(stats=stats, collection=shadow, previous=previous, dropped=dropped)
@@ -6,6 +6,13 @@ from typing import Any
 
 import chromadb
 
+from ragopslab.manifest import (
+    SourceManifest,
+    open_compact_catalog,
+    rehydrate_metadata,
+    resolve_collection,
+)
+
 
 @dataclass
 class CollectionSummary:
@@ -34,6 +41,7 @@ def summarize_collection(
     persist_dir = persist_dir.resolve()
     if not persist_dir.exists():
         raise FileNotFoundError(f"Persist directory not found: {persist_dir}")
+    collection_name = resolve_collection(persist_dir, collection_name)
 
     client = chromadb.PersistentClient(path=str(persist_dir))
     collection = client.get_or_create_collection(name=collection_name)
@@ -57,6 +65,12 @@ def summarize_collection(
     metadatas = sample.get("metadatas", []) or []
     documents = sample.get("documents", []) or []
     embeddings = sample.get("embeddings") if include_embeddings else None
+    catalog = open_compact_catalog(persist_dir, collection_name)
+    if catalog is not None:
+        try:
+            rehydrate_metadata(catalog, metadatas)
+        finally:
+            catalog.close()
 
     if page is not None:
         filtered_ids: list[str] = []
@@ -104,7 +118,27 @@ def list_sources(
     persist_dir = persist_dir.resolve()
     if not persist_dir.exists():
         raise FileNotFoundError(f"Persist directory not found: {persist_dir}")
-
+    collection_name = resolve_collection(persist_dir, collection_name)
+
+    manifest = SourceManifest.open_existing(persist_dir, collection_name)
+    if manifest is not None:
+        try:
+            entries = manifest.sources(source_type=source_type, file_name=file_name)
+        finally:
+            manifest.close()
+        summaries = [
+            SourceSummary(
+                source_type=entry.source_type,
+                file_name=entry.file_name,
+                source=entry.source,
+                count=entry.chunk_count,
+            )
+            for entry in entries
+        ]
+        summaries.sort(key=lambda s: (s.source_type, s.file_name, s.source))
+        return summaries
+
+    # No catalog (collection not written by ``ingest``): tally chunk metadata.
     client = chromadb.PersistentClient(path=str(persist_dir))
     collection = client.get_or_create_collection(name=collection_name)
     count = collection.count()
@@ -0,0 +1,588 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import uuid
+from typing import Any, Iterable
+
+
+MANIFEST_FILE = "ragopslab_manifest.sqlite3"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sources (
+        collection TEXT NOT NULL,
+        source TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        sha256 TEXT NOT NULL,
+        chunk_ids TEXT NOT NULL,
+        ingested_at TEXT NOT NULL,
+        PRIMARY KEY (collection, source)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS collections (
+        name TEXT PRIMARY KEY,
+        complete INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS aliases (
+        name TEXT PRIMARY KEY,
+        target TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS source_ids (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        collection TEXT NOT NULL,
+        source TEXT NOT NULL,
+        UNIQUE (collection, source)
+    )
+    """,
+    # Checkpointed chunk ids of sources being written, one row per id so each
+    # batch is recorded without rewriting the source row.
+    """
+    CREATE TABLE IF NOT EXISTS pending_chunks (
+        collection TEXT NOT NULL,
+        source TEXT NOT NULL,
+        chunk_id TEXT NOT NULL,
+        PRIMARY KEY (collection, source, chunk_id)
+    )
+    """,
+]
+
+# Columns added after the first release of the manifest: table -> (name, SQL definition).
+_ADDED_COLUMNS = {
+    "sources": [
+        ("file_name", "TEXT NOT NULL DEFAULT ''"),
+        ("source_type", "TEXT NOT NULL DEFAULT ''"),
+        ("chunk_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("status", "TEXT NOT NULL DEFAULT 'complete'"),
+        ("pending_ids", "TEXT NOT NULL DEFAULT '[]'"),
+    ],
+    "collections": [
+        ("compact_metadata", "INTEGER NOT NULL DEFAULT 0"),
+        ("version", "TEXT NOT NULL DEFAULT ''"),
+        ("embedding_model", "TEXT NOT NULL DEFAULT ''"),
+        ("embedding_dim", "INTEGER NOT NULL DEFAULT 0"),
+    ],
+}
+
+# Per-source strings that compact metadata mode keeps out of chunk metadata. The
+# short, low-cardinality ``source_type``/``file_ext`` stay on chunks so filters on
+# them need no catalog lookup.
+SOURCE_METADATA_KEYS = ("source", "file_name")
+
+# Most source ids a compact ``source``/``file_name`` filter may expand to.
+MAX_FILTER_SOURCE_IDS = 1000
+
+_COLUMNS = (
+    "source, size, mtime, sha256, ingested_at, file_name, source_type, chunk_count, status"
+)
+
+# Checkpoint states of a source row:
+# - complete: chunk_ids are all written and nothing else is in flight.
+# - pending:  first ingest of the source started; nothing is committed yet.
+# - updating: a new version is being written; chunk_ids still describe the old one.
+COMPLETE, PENDING, UPDATING = "complete", "pending", "updating"
+
+
+@dataclass
+class ManifestEntry:
+    source: str
+    size: int
+    mtime: float
+    sha256: str
+    chunk_ids: list[str] = field(default_factory=list)
+    ingested_at: str = ""
+    file_name: str = ""
+    source_type: str = ""
+    chunk_count: int = 0
+    status: str = COMPLETE
+    # Chunk ids that may be in the collection without belonging to ``chunk_ids``.
+    pending_ids: list[str] = field(default_factory=list)
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    """Per-source catalog of what was ingested into a collection.
+
+    Stored as a small SQLite file next to the Chroma data so ``--reset`` (which
+    removes the persist directory) also clears it. Each source row is written in
+    its own transaction, so the catalog never disagrees with itself about a
+    source's hash, chunk ids and chunk count.
+
+    Rows double as checkpoints: :meth:`begin` opens one and :meth:`add_pending`
+    records each batch of chunk ids before any of them reach the collection;
+    :meth:`upsert` marks the source complete once they have. A run that dies in between leaves the row in
+    :meth:`unfinished`, so the next run can roll those chunks back.
+    """
+
+    def __init__(self, persist_dir: Path, collection_name: str) -> None:
+        self.collection_name = collection_name
+        self.path = persist_dir / MANIFEST_FILE
+        # Readers may resolve source ids from a worker thread (LangGraph nodes).
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            missing = [(name, sql) for name, sql in columns if name not in existing]
+            for name, definition in missing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            if missing and table == "sources":
+                self._backfill_columns()
+        self._conn.commit()
+
+    @classmethod
+    def open_existing(cls, persist_dir: Path, collection_name: str) -> SourceManifest | None:
+        """Open the catalog only if it already exists and covers the collection."""
+        if not (persist_dir / MANIFEST_FILE).exists():
+            return None
+        manifest = cls(persist_dir, collection_name)
+        if not manifest.is_complete():
+            manifest.close()
+            return None
+        return manifest
+
+    def is_complete(self) -> bool:
+        """True once every source in the collection is known to the catalog."""
+        row = self._conn.execute(
+            "SELECT complete FROM collections WHERE name = ?", (self.collection_name,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def mark_complete(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO collections (name, complete) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET complete = 1",
+                (self.collection_name,),
+            )
+
+    @property
+    def compact_metadata(self) -> bool:
+        """True if chunks carry a ``source_id`` instead of the per-source strings."""
+        row = self._conn.execute(
+            "SELECT compact_metadata FROM collections WHERE name = ?", (self.collection_name,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def set_compact_metadata(self, enabled: bool) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO collections (name, compact_metadata) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET compact_metadata = excluded.compact_metadata",
+                (self.collection_name, int(enabled)),
+            )
+
+    @property
+    def version(self) -> str:
+        """Token that changes whenever an ingest changes the collection ('' if never set)."""
+        row = self._conn.execute(
+            "SELECT version FROM collections WHERE name = ?", (self.collection_name,)
+        ).fetchone()
+        return row[0] if row else ""
+
+    def bump_version(self) -> str:
+        """Give the collection a new version, invalidating anything cached against the old one."""
+        # Random rather than a counter: ``--reset`` deletes the catalog, and a
+        # restarted counter would collide with versions cached before it.
+        version = uuid.uuid4().hex
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO collections (name, version) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET version = excluded.version",
+                (self.collection_name, version),
+            )
+        return version
+
+    @property
+    def embedding(self) -> tuple[str, int]:
+        """(model, dimension) of the collection's vectors; ('', 0) until an ingest stored some."""
+        row = self._conn.execute(
+            "SELECT embedding_model, embedding_dim FROM collections WHERE name = ?",
+            (self.collection_name,),
+        ).fetchone()
+        return (row[0], int(row[1])) if row else ("", 0)
+
+    def set_embedding(self, model: str, dimension: int) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO collections (name, embedding_model, embedding_dim) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET embedding_model = excluded.embedding_model, "
+                "embedding_dim = excluded.embedding_dim",
+                (self.collection_name, model, dimension),
+            )
+
+    def source_id(self, source: str) -> int:
+        """Stable integer id for ``source``, allocated on first use."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO source_ids (collection, source) VALUES (?, ?)",
+                (self.collection_name, source),
+            )
+            row = self._conn.execute(
+                "SELECT id FROM source_ids WHERE collection = ? AND source = ?",
+                (self.collection_name, source),
+            ).fetchone()
+        return int(row[0])
+
+    def source_ids(
+        self,
+        source_type: str | None = None,
+        file_name: str | None = None,
+        source: str | None = None,
+    ) -> list[int]:
+        """Ids of catalogued sources matching all of the given fields."""
+        query = (
+            "SELECT i.id FROM source_ids i JOIN sources s "
+            "ON s.collection = i.collection AND s.source = i.source WHERE i.collection = ?"
+        )
+        params: list[str] = [self.collection_name]
+        for column, value in (
+            ("source_type", source_type),
+            ("file_name", file_name),
+            ("source", source),
+        ):
+            if value:
+                query += f" AND s.{column} = ?"
+                params.append(value)
+        return [int(row[0]) for row in self._conn.execute(query + " ORDER BY i.id", params)]
+
+    def resolve(self, ids: Iterable[int]) -> dict[int, str]:
+        """Map source ids back to source paths."""
+        wanted = sorted({int(value) for value in ids})
+        resolved: dict[int, str] = {}
+        for start in range(0, len(wanted), 500):
+            part = wanted[start : start + 500]
+            placeholders = ",".join("?" for _ in part)
+            resolved.update(
+                self._conn.execute(
+                    f"SELECT id, source FROM source_ids WHERE collection = ? AND id IN ({placeholders})",
+                    [self.collection_name, *part],
+                ).fetchall()
+            )
+        return resolved
+
+    def entries(self) -> dict[str, ManifestEntry]:
+        """All committed sources of the collection, without chunk ids (see :meth:`get`)."""
+        rows = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM sources WHERE collection = ? AND status != ?",
+            (self.collection_name, PENDING),
+        ).fetchall()
+        return {row[0]: _row_to_entry(row) for row in rows}
+
+    def sources(
+        self, source_type: str | None = None, file_name: str | None = None
+    ) -> list[ManifestEntry]:
+        query = f"SELECT {_COLUMNS} FROM sources WHERE collection = ? AND status != ?"
+        params: list[str] = [self.collection_name, PENDING]
+        if source_type:
+            query += " AND source_type = ?"
+            params.append(source_type)
+        if file_name:
+            query += " AND file_name = ?"
+            params.append(file_name)
+        rows = self._conn.execute(query + " ORDER BY source", params).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def get(self, source: str) -> ManifestEntry | None:
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS}, chunk_ids, pending_ids FROM sources "
+            "WHERE collection = ? AND source = ?",
+            (self.collection_name, source),
+        ).fetchone()
+        if not row:
+            return None
+        entry = _row_to_entry(row)
+        entry.chunk_ids = json.loads(row[-2])
+        entry.pending_ids = json.loads(row[-1]) + [
+            chunk_id
+            for (chunk_id,) in self._conn.execute(
+                "SELECT chunk_id FROM pending_chunks WHERE collection = ? AND source = ?",
+                (self.collection_name, source),
+            )
+        ]
+        return entry
+
+    def unfinished(self) -> list[ManifestEntry]:
+        """Sources whose last write was interrupted (with chunk and pending ids)."""
+        rows = self._conn.execute(
+            "SELECT source FROM sources WHERE collection = ? AND (status != ? OR pending_ids != '[]' "
+            "OR source IN (SELECT source FROM pending_chunks WHERE collection = ?))",
+            (self.collection_name, COMPLETE, self.collection_name),
+        ).fetchall()
+        return [entry for (source,) in rows if (entry := self.get(source)) is not None]
+
+    def begin(self, source: str, size: int, mtime: float) -> None:
+        """Checkpoint: chunks of ``source`` are about to be written (see :meth:`add_pending`)."""
+        path = Path(source)
+        with self._conn:
+            self._clear_pending(source)
+            updated = self._conn.execute(
+                "UPDATE sources SET status = ?, pending_ids = '[]' WHERE collection = ? AND source = ?",
+                (UPDATING, self.collection_name, source),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO sources "
+                    "(collection, source, size, mtime, sha256, chunk_ids, ingested_at, "
+                    "file_name, source_type, chunk_count, status, pending_ids) "
+                    "VALUES (?, ?, ?, ?, '', '[]', '', ?, ?, 0, ?, '[]')",
+                    (
+                        self.collection_name,
+                        source,
+                        size,
+                        mtime,
+                        path.name,
+                        path.suffix.lower().lstrip("."),
+                        PENDING,
+                    ),
+                )
+
+    def add_pending(self, source: str, chunk_ids: Iterable[str]) -> None:
+        """Checkpoint: ``chunk_ids`` of ``source`` (opened with :meth:`begin`) are about to be written."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pending_chunks (collection, source, chunk_id) VALUES (?, ?, ?)",
+                [(self.collection_name, source, chunk_id) for chunk_id in chunk_ids],
+            )
+
+    def finish(self, source: str) -> None:
+        """Checkpoint: nothing of ``source`` is in flight any more."""
+        with self._conn:
+            self._clear_pending(source)
+            self._conn.execute(
+                "UPDATE sources SET status = ?, pending_ids = '[]' WHERE collection = ? AND source = ?",
+                (COMPLETE, self.collection_name, source),
+            )
+
+    def upsert(self, entry: ManifestEntry, stale_ids: list[str] | None = None) -> None:
+        """Commit ``entry`` as complete; ``stale_ids`` stay pending until :meth:`finish`."""
+        ingested_at = entry.ingested_at or datetime.utcnow().isoformat() + "Z"
+        path = Path(entry.source)
+        with self._conn:
+            self._clear_pending(entry.source)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources "
+                "(collection, source, size, mtime, sha256, chunk_ids, ingested_at, "
+                "file_name, source_type, chunk_count, status, pending_ids) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.collection_name,
+                    entry.source,
+                    entry.size,
+                    entry.mtime,
+                    entry.sha256,
+                    json.dumps(entry.chunk_ids),
+                    ingested_at,
+                    entry.file_name or path.name,
+                    entry.source_type or path.suffix.lower().lstrip("."),
+                    len(entry.chunk_ids),
+                    COMPLETE,
+                    json.dumps(stale_ids or []),
+                ),
+            )
+
+    def touch(self, source: str, mtime: float) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE sources SET mtime = ? WHERE collection = ? AND source = ?",
+                (mtime, self.collection_name, source),
+            )
+
+    def remove(self, source: str) -> None:
+        with self._conn:
+            self._clear_pending(source)
+            self._conn.execute(
+                "DELETE FROM sources WHERE collection = ? AND source = ?",
+                (self.collection_name, source),
+            )
+
+    def drop(self) -> None:
+        """Forget everything recorded for this collection."""
+        with self._conn:
+            for table, column in (
+                ("sources", "collection"),
+                ("pending_chunks", "collection"),
+                ("source_ids", "collection"),
+                ("collections", "name"),
+            ):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE {column} = ?", (self.collection_name,)
+                )
+
+    def set_alias(self, name: str) -> None:
+        """Point alias ``name`` at this collection (atomic for readers)."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aliases (name, target) VALUES (?, ?)",
+                (name, self.collection_name),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _clear_pending(self, source: str) -> None:
+        self._conn.execute(
+            "DELETE FROM pending_chunks WHERE collection = ? AND source = ?",
+            (self.collection_name, source),
+        )
+
+    def _backfill_columns(self) -> None:
+        rows = self._conn.execute("SELECT collection, source, chunk_ids FROM sources").fetchall()
+        self._conn.executemany(
+            "UPDATE sources SET file_name = ?, source_type = ?, chunk_count = ? "
+            "WHERE collection = ? AND source = ?",
+            [
+                (
+                    Path(source).name,
+                    Path(source).suffix.lower().lstrip("."),
+                    len(json.loads(chunk_ids)),
+                    collection,
+                    source,
+                )
+                for collection, source, chunk_ids in rows
+            ],
+        )
+
+
+def _row_to_entry(row: tuple) -> ManifestEntry:
+    return ManifestEntry(
+        source=row[0],
+        size=int(row[1]),
+        mtime=float(row[2]),
+        sha256=row[3],
+        ingested_at=row[4],
+        file_name=row[5],
+        source_type=row[6],
+        chunk_count=int(row[7]),
+        status=row[8],
+    )
+
+
+def resolve_collection(persist_dir: Path, name: str) -> str:
+    """Physical collection behind ``name``: its alias target, or ``name`` itself."""
+    path = persist_dir / MANIFEST_FILE
+    if not path.exists():
+        return name
+    conn = sqlite3.connect(str(path))
+    try:
+        row = conn.execute("SELECT target FROM aliases WHERE name = ?", (name,)).fetchone()
+    except sqlite3.OperationalError:
+        # Catalog written before aliases existed.
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row else name
+
+
+def collection_version(persist_dir: Path, collection_name: str) -> str:
+    """Version of a physical collection ('' when it has none yet); read-only."""
+    path = persist_dir / MANIFEST_FILE
+    if not path.exists():
+        return ""
+    conn = sqlite3.connect(str(path))
+    try:
+        row = conn.execute(
+            "SELECT version FROM collections WHERE name = ?", (collection_name,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Catalog written before collection versions existed.
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row else ""
+
+
+def collection_embedding(persist_dir: Path, collection_name: str) -> tuple[str, int]:
+    """(model, dimension) a physical collection was embedded with, ('', 0) if unknown; read-only."""
+    path = persist_dir / MANIFEST_FILE
+    if not path.exists():
+        return "", 0
+    conn = sqlite3.connect(str(path))
+    try:
+        row = conn.execute(
+            "SELECT embedding_model, embedding_dim FROM collections WHERE name = ?",
+            (collection_name,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Catalog written before embedding models were recorded.
+        row = None
+    finally:
+        conn.close()
+    return (row[0], int(row[1])) if row else ("", 0)
+
+
+def source_metadata(source: str) -> dict[str, Any]:
+    path = Path(source)
+    suffix = path.suffix.lower().lstrip(".")
+    return {
+        "source": source,
+        "file_name": path.name,
+        "file_ext": suffix,
+        "source_type": suffix,
+    }
+
+
+def open_compact_catalog(persist_dir: Path, collection_name: str) -> SourceManifest | None:
+    """The collection's catalog if it stores compact chunk metadata, else None."""
+    manifest = SourceManifest.open_existing(persist_dir, collection_name)
+    if manifest is not None and not manifest.compact_metadata:
+        manifest.close()
+        return None
+    return manifest
+
+
+def compact_filters(
+    manifest: SourceManifest,
+    filters: dict[str, Any],
+    max_ids: int = MAX_FILTER_SOURCE_IDS,
+) -> dict[str, Any]:
+    """Rewrite ``source``/``file_name`` filters as a ``source_id`` lookup.
+
+    Other filters (``source_type`` included) apply to chunk metadata as they are.
+    A lookup matching more than ``max_ids`` sources is rejected rather than sent
+    to Chroma as a huge ``$in`` list.
+    """
+    remaining = dict(filters)
+    fields = {key: remaining.pop(key) for key in SOURCE_METADATA_KEYS if key in remaining}
+    conditions = [{key: value} for key, value in remaining.items()]
+    if fields:
+        ids = manifest.source_ids(file_name=fields.get("file_name"), source=fields.get("source"))
+        if len(ids) > max_ids:
+            raise ValueError(
+                f"Filter {fields} matches {len(ids)} sources; at most {max_ids} are supported "
+                "on a compact_metadata collection."
+            )
+        # Chroma rejects an empty ``$in``; -1 is never allocated.
+        conditions.append({"source_id": {"$in": ids or [-1]}})
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def rehydrate_metadata(manifest: SourceManifest, metadatas: Iterable[dict[str, Any]]) -> None:
+    """Restore the per-source strings on compact chunk metadata, in place."""
+    metadatas = [metadata for metadata in metadatas if metadata is not None]
+    resolved = manifest.resolve(
+        metadata["source_id"] for metadata in metadatas if "source_id" in metadata
+    )
+    for metadata in metadatas:
+        source = resolved.get(metadata.get("source_id", -1))
+        if source is not None:
+            metadata.update(source_metadata(source))
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        file_hash TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        page_label TEXT NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (file_hash, page)
+    )
+    """,
+    # Size and last use of each cached file, for LRU pruning.
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        file_hash TEXT PRIMARY KEY,
+        bytes INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)",
+]
+
+_PAGE_BYTES = "COALESCE(SUM(LENGTH(CAST(page_label || text AS BLOB))), 0)"
+
+
+class PdfPageCache:
+    """Extracted PDF page text keyed by (file content hash, page number).
+
+    When the stored text exceeds ``max_mb`` (0 = no limit), whole files are
+    evicted, least recently used first.
+    """
+
+    def __init__(self, cache_dir: Path, max_mb: float = 256) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        # Several ingest worker processes may share the cache file.
+        self._conn = sqlite3.connect(str(cache_dir / "pages.sqlite3"), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        # Pages cached before sizes were tracked.
+        self._conn.execute(
+            "INSERT OR IGNORE INTO files (file_hash, bytes, last_used) "
+            f"SELECT file_hash, {_PAGE_BYTES}, 0 FROM pages "
+            "WHERE file_hash NOT IN (SELECT file_hash FROM files) GROUP BY file_hash"
+        )
+        self._conn.commit()
+        # Running size of the cache, adjusted on every put; recounted before evicting.
+        self._total = self._total_bytes()
+
+    def get(self, file_hash: str) -> dict[int, tuple[str, str]]:
+        rows = self._conn.execute(
+            "SELECT page, page_label, text FROM pages WHERE file_hash = ?", (file_hash,)
+        ).fetchall()
+        if rows:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE files SET last_used = ? WHERE file_hash = ?", (time.time(), file_hash)
+                )
+        return {int(row[0]): (row[1], row[2]) for row in rows}
+
+    def put(self, file_hash: str, pages: list[tuple[int, str, str]]) -> None:
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT bytes FROM files WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+            previous = row[0] if row else 0
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page, page_label, text) "
+                "VALUES (?, ?, ?, ?)",
+                [(file_hash, page, label, text) for page, label, text in pages],
+            )
+            # The file's size is that of all its pages, so re-put pages aren't counted twice.
+            (size,) = self._conn.execute(
+                f"SELECT {_PAGE_BYTES} FROM pages WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT INTO files (file_hash, bytes, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT (file_hash) DO UPDATE SET bytes = excluded.bytes, "
+                "last_used = excluded.last_used",
+                (file_hash, size, time.time()),
+            )
+            self._total += size - previous
+            if self.max_bytes > 0 and self._total > self.max_bytes:
+                self._prune(keep=file_hash)
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM files").fetchone()[0]
+
+    def _prune(self, keep: str) -> None:
+        """Evict least recently used files until the cache fits (never ``keep``)."""
+        # Other worker processes may have added or evicted files meanwhile.
+        total = self._total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        victims: list[str] = []
+        for file_hash, size in self._conn.execute(
+            "SELECT file_hash, bytes FROM files WHERE file_hash != ? ORDER BY last_used ASC",
+            (keep,),
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            victims.append(file_hash)
+            total -= size
+        for table in ("pages", "files"):
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE file_hash = ?", [(victim,) for victim in victims]
+            )
+        self._total = total
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_pool_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+
+
+def _page_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for page extraction, reused by every PDF until shut down."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_page_pool() -> None:
+    """Stop the page extraction processes started by :func:`iter_pdf_pages`, if any."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+atexit.register(shutdown_page_pool)
+
+
+def _page_label(reader: PdfReader, page: int) -> str:
+    try:
+        return reader.page_labels[page]
+    except Exception:
+        return str(page + 1)
+
+
+def _page_text(reader: PdfReader, page: int) -> str:
+    # Same extraction as langchain's PyPDFLoader in "page" mode.
+    return (reader.pages[page].extract_text(extraction_mode="plain") or "").strip()
+
+
+def _extract_range(path: str, start: int, end: int) -> list[tuple[int, str, str]]:
+    """Extract pages ``start..end-1``; runs in a worker process."""
+    reader = PdfReader(path)
+    return [(page, _page_label(reader, page), _page_text(reader, page)) for page in range(start, end)]
+
+
+def _ranges(pages: list[int], size: int) -> list[tuple[int, int]]:
+    """Group sorted page numbers into contiguous ranges of at most ``size`` pages."""
+    ranges: list[tuple[int, int]] = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < size:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+def iter_pdf_pages(
+    path: Path,
+    workers: int = 1,
+    cache_dir: Path | None = None,
+    file_hash: str | None = None,
+    cache_max_mb: float = 256,
+) -> Iterator[Document]:
+    """Yield one document per PDF page, in page order.
+
+    Pages are extracted lazily; with ``workers > 1`` contiguous page ranges are
+    extracted in a process pool that is shared by all PDFs (see
+    :func:`shutdown_page_pool`). When ``cache_dir`` and ``file_hash`` are given,
+    previously extracted pages are read from the cache and only missing pages
+    are parsed; the cache is kept under ``cache_max_mb``.
+    """
+    reader = PdfReader(str(path))
+    total_pages = len(reader.pages)
+    cache = PdfPageCache(cache_dir, cache_max_mb) if cache_dir is not None and file_hash else None
+    try:
+        cached = cache.get(file_hash) if cache is not None else {}
+        missing = [page for page in range(total_pages) if page not in cached]
+
+        def _extracted() -> Iterator[tuple[int, str, str]]:
+            if workers <= 1 or len(missing) <= 1:
+                for page in missing:
+                    yield page, _page_label(reader, page), _page_text(reader, page)
+                return
+            size = max(1, len(missing) // (workers * 4))
+            ranges = _ranges(missing, size)
+            starts = [start for start, _ in ranges]
+            ends = [end for _, end in ranges]
+            executor = _page_pool(workers)
+            for pages in executor.map(_extract_range, [str(path)] * len(ranges), starts, ends):
+                yield from pages
+
+        fresh = _extracted()
+        to_cache: list[tuple[int, str, str]] = []
+        for page in range(total_pages):
+            if page in cached:
+                label, text = cached[page]
+            else:
+                extracted_page, label, text = next(fresh)
+                if cache is not None:
+                    to_cache.append((extracted_page, label, text))
+                    if len(to_cache) >= 32:
+                        cache.put(file_hash, to_cache)
+                        to_cache = []
+            yield Document(
+                page_content=text,
+                metadata={
+                    "source": str(path),
+                    "page": page,
+                    "page_label": label,
+                    "total_pages": total_pages,
+                },
+            )
+        if cache is not None and to_cache:
+            cache.put(file_hash, to_cache)
+    finally:
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field, replace
+import json
+from pathlib import Path
+import time
+from typing import Any, Iterable
+
+from langchain_core.embeddings import Embeddings
+
+from ragopslab.discover import DEFAULT_IGNORE, iter_files
+from ragopslab.ingest import LoaderOptions, LoadResult, split_batches
+
+
+# Chroma's default HNSW graph degree; each vector keeps about 2*M neighbour links.
+HNSW_M = 16
+# Used for index size when no embedding was measured (nomic-embed-text).
+DEFAULT_DIMENSION = 768
+
+
+@dataclass
+class TypePlan:
+    source_type: str
+    files: int
+    bytes: int
+    sampled_files: int
+    sampled_bytes: int
+    sampled_chunks: int
+    est_chunks: int
+    est_tokens: int
+
+
+@dataclass
+class IngestPlan:
+    files: int
+    bytes: int
+    types: list[TypePlan] = field(default_factory=list)
+    est_chunks: int = 0
+    est_tokens: int = 0
+    failed_samples: int = 0
+    dimension: int = DEFAULT_DIMENSION
+    # Measured on a sample of chunk texts; None when embedding was skipped or failed.
+    embed_chunks_per_second: float | None = None
+    est_index_mb: float = 0.0
+    est_load_seconds: float = 0.0
+    est_embed_seconds: float | None = None
+    # Loading and embedding overlap, so the slower stage bounds the run.
+    est_wall_seconds: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _sample(paths: list[Path], count: int) -> list[Path]:
+    """Up to ``count`` files spread evenly over the (sorted) list."""
+    if len(paths) <= count:
+        return list(paths)
+    return [paths[idx * len(paths) // count] for idx in range(count)]
+
+
+def _interleave(groups: list[list[str]], count: int) -> list[str]:
+    """Up to ``count`` items taken round-robin from ``groups``, so each is equally represented."""
+    picked: list[str] = []
+    for depth in range(max((len(group) for group in groups), default=0)):
+        for group in groups:
+            if depth < len(group):
+                picked.append(group[depth])
+                if len(picked) == count:
+                    return picked
+    return picked
+
+
+def _scale(value: float, sampled: int, total: int) -> int:
+    return round(value * total / sampled) if sampled else 0
+
+
+def plan_ingest(
+    data_dir: Path,
+    extensions: Iterable[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    ignore: Iterable[str] = DEFAULT_IGNORE,
+    loader_options: LoaderOptions | None = None,
+    chunking_strategy: str = "recursive",
+    workers: int = 1,
+    sample_per_type: int = 5,
+    embeddings: Embeddings | None = None,
+    embed_sample: int = 64,
+) -> IngestPlan:
+    """Estimate what ingesting ``data_dir`` would produce, without writing to Chroma.
+
+    Files are grouped by type and ``sample_per_type`` of each are loaded and
+    split for real; chunk and token counts (about 4 characters per token) are
+    scaled up by bytes. If ``embeddings`` is given, up to ``embed_sample``
+    sampled chunks, spread evenly over the types, are embedded to measure
+    throughput and vector size. The PDF page cache is bypassed so nothing is
+    written and repeated plans measure real extraction time.
+    """
+    data_dir = data_dir.resolve()
+    if not data_dir.exists() or not data_dir.is_dir():
+        raise FileNotFoundError(f"Data directory not found: {data_dir}")
+
+    by_type: dict[str, list[tuple[Path, int]]] = {}
+    for path in iter_files(data_dir, extensions, ignore):
+        source_type = path.suffix.lower().lstrip(".")
+        by_type.setdefault(source_type, []).append((path, path.stat().st_size))
+    if not by_type:
+        raise ValueError("No files found for the given extensions.")
+
+    loader_options = replace(loader_options or LoaderOptions(), pdf_cache_dir=None)
+    plan = IngestPlan(
+        files=sum(len(files) for files in by_type.values()),
+        bytes=sum(size for files in by_type.values() for _, size in files),
+    )
+    sample_texts: dict[str, list[str]] = {}
+    load_seconds_per_byte: list[tuple[float, int]] = []
+    chars_total = 0
+    chunks_total = 0
+    metadata_bytes_total = 0
+    for source_type in sorted(by_type):
+        files = by_type[source_type]
+        sizes = dict(files)
+        sampled = _sample([path for path, _ in files], sample_per_type)
+        sampled_bytes = sampled_chunks = sampled_chars = 0
+        for path in sampled:
+            result = LoadResult()
+            chunks = chars = metadata_bytes = 0
+            file_texts: list[str] = []
+            for batch in split_batches(
+                path,
+                chunk_size,
+                chunk_overlap,
+                result,
+                loader_options,
+                chunking_strategy=chunking_strategy,
+            ):
+                chunks += len(batch)
+                chars += sum(len(chunk.page_content) for chunk in batch)
+                metadata_bytes += sum(len(json.dumps(chunk.metadata)) for chunk in batch)
+                room = embed_sample - len(file_texts)
+                file_texts.extend(chunk.page_content for chunk in batch[:room])
+            if result.error is not None:
+                plan.failed_samples += 1
+                continue
+            sampled_bytes += sizes[path]
+            sampled_chunks += chunks
+            sampled_chars += chars
+            load_seconds_per_byte.append((result.load_seconds + result.split_seconds, sizes[path]))
+            metadata_bytes_total += metadata_bytes
+            sample_texts.setdefault(source_type, []).extend(file_texts)
+        total_bytes = sum(sizes.values())
+        est_chunks = _scale(sampled_chunks, sampled_bytes, total_bytes)
+        est_tokens = _scale(sampled_chars / 4, sampled_bytes, total_bytes)
+        plan.types.append(
+            TypePlan(
+                source_type=source_type,
+                files=len(files),
+                bytes=total_bytes,
+                sampled_files=len(sampled),
+                sampled_bytes=sampled_bytes,
+                sampled_chunks=sampled_chunks,
+                est_chunks=est_chunks,
+                est_tokens=est_tokens,
+            )
+        )
+        plan.est_chunks += est_chunks
+        plan.est_tokens += est_tokens
+        chars_total += sampled_chars
+        chunks_total += sampled_chunks
+
+    sampled_seconds = sum(seconds for seconds, _ in load_seconds_per_byte)
+    sampled_size = sum(size for _, size in load_seconds_per_byte)
+    if sampled_size:
+        plan.est_load_seconds = sampled_seconds * plan.bytes / sampled_size / max(1, workers)
+
+    texts = _interleave([sample_texts[name] for name in sorted(sample_texts)], embed_sample)
+    if embeddings is not None and texts:
+        try:
+            started = time.perf_counter()
+            vectors = embeddings.embed_documents(texts)
+            elapsed = time.perf_counter() - started
+        except Exception as exc:
+            print(f"Embedding throughput not measured ({type(exc).__name__}: {exc})")
+        else:
+            plan.dimension = len(vectors[0]) if vectors else plan.dimension
+            plan.embed_chunks_per_second = len(texts) / elapsed if elapsed else None
+    if plan.embed_chunks_per_second:
+        plan.est_embed_seconds = plan.est_chunks / plan.embed_chunks_per_second
+        plan.est_wall_seconds = max(plan.est_load_seconds, plan.est_embed_seconds)
+
+    if chunks_total:
+        # float32 vector + HNSW links + stored text + metadata, per chunk.
+        per_chunk = (
+            plan.dimension * 4
+            + 2 * HNSW_M * 4
+            + chars_total / chunks_total
+            + metadata_bytes_total / chunks_total
+        )
+        plan.est_index_mb = plan.est_chunks * per_chunk / (1024 * 1024)
+    return plan
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any, Sequence
+
+import numpy as np
+
+from ragopslab.embedding_cache import normalize_text
+
+
+CACHE_FILE = "query_cache.sqlite3"
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS embeddings ("
+    " key TEXT PRIMARY KEY, value BLOB NOT NULL, cost_ms REAL NOT NULL, last_used REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS retrievals ("
+    " key TEXT PRIMARY KEY, value TEXT NOT NULL, cost_ms REAL NOT NULL, last_used REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS answers ("
+    " key TEXT PRIMARY KEY, bucket TEXT NOT NULL, vector BLOB NOT NULL, answer TEXT NOT NULL,"
+    " metadata TEXT NOT NULL, cost_ms REAL NOT NULL, last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)",
+    "CREATE INDEX IF NOT EXISTS retrievals_last_used ON retrievals (last_used)",
+    "CREATE INDEX IF NOT EXISTS answers_bucket ON answers (bucket)",
+    "CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)",
+]
+
+# Phrasings remembered per chunk set; a lookup compares the query against each.
+ANSWERS_PER_BUCKET = 8
+
+# An overflowing disk level is pruned down to this share of ``max_disk_entries``,
+# so the prune runs once per many puts instead of on every one.
+_PRUNE_TO = 0.9
+
+_DISK_TABLES = ("embeddings", "retrievals", "answers")
+
+
+@dataclass
+class CacheStats:
+    embedding_hits: int = 0
+    embedding_misses: int = 0
+    retrieval_hits: int = 0
+    retrieval_misses: int = 0
+    answer_hits: int = 0
+    answer_misses: int = 0
+    # What the hits would have cost, as measured when the entries were computed.
+    saved_ms: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.embedding_hits + self.retrieval_hits + self.answer_hits
+        total = hits + self.embedding_misses + self.retrieval_misses + self.answer_misses
+        return hits / total if total else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        payload = asdict(self)
+        payload["saved_ms"] = round(self.saved_ms, 1)
+        payload["hit_rate"] = round(self.hit_rate, 3)
+        return payload
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def retrieval_key(
+    collection: str,
+    version: str,
+    vector: Sequence[float],
+    k: int,
+    filters: dict[str, Any] | None,
+    search_type: str,
+    fetch_k: int | None,
+) -> str:
+    vector_hash = hashlib.sha256(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+    parts = [collection, version, vector_hash, k, filters or {}, search_type, fetch_k]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def answer_bucket(collection: str, version: str, chat_model: str, ids: Sequence[str]) -> str:
+    parts = [collection, version, chat_model, list(ids)]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    response_metadata: dict[str, Any]
+    cost_ms: float
+    similarity: float
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class _LRU:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, value: Any, cost_ms: float) -> None:
+        self._items[key] = (value, cost_ms)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+
+class QueryCache:
+    """Two-level cache for chat retrieval.
+
+    - query text -> query embedding, per embedding model;
+    - (collection, collection version, embedding, k, filters, search type)
+      -> ranked chunk ids;
+    - (collection, collection version, chat model, ranked chunk ids) -> answers,
+      each with the embedding of the question it answered. A lookup returns
+      the one closest to the new question if its cosine similarity reaches
+      the threshold.
+
+    Each level is an in-memory LRU of ``max_entries``, optionally backed by a
+    SQLite file under ``cache_dir`` (also LRU, ``max_disk_entries`` per level,
+    pruned in batches once a level overflows) so one-shot ``chat`` runs share it. Retrievals are keyed by the collection
+    version that ingest bumps, so a changed collection never serves stale ids.
+    Entries remember how long they took to compute; a hit adds that to
+    ``CacheStats.saved_ms``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        cache_dir: Path | None = None,
+        max_disk_entries: int = 100_000,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._memory = {
+            "embeddings": _LRU(max_entries),
+            "retrievals": _LRU(max_entries),
+            "answers": _LRU(max_entries),
+        }
+        self.max_disk_entries = max_disk_entries
+        self._conn: sqlite3.Connection | None = None
+        # Rows per disk level, counted once at open and kept up to date on puts.
+        self._disk_counts: dict[str, int] = {}
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(cache_dir / CACHE_FILE), check_same_thread=False)
+            with self._conn:
+                for statement in _SCHEMA:
+                    self._conn.execute(statement)
+            for table in _DISK_TABLES:
+                (self._disk_counts[table],) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {table}"
+                ).fetchone()
+
+    def get_embedding(self, model: str, text: str) -> tuple[list[float], float] | None:
+        hit = self._get("embeddings", embedding_key(model, text))
+        if hit is None:
+            return None
+        value, cost_ms = hit
+        if isinstance(value, bytes):
+            value = np.frombuffer(value, dtype=np.float32).tolist()
+        return value, cost_ms
+
+    def put_embedding(self, model: str, text: str, vector: list[float], cost_ms: float) -> None:
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        self._put("embeddings", embedding_key(model, text), list(vector), blob, cost_ms)
+
+    def get_retrieval(self, key: str) -> tuple[list[str], float] | None:
+        hit = self._get("retrievals", key)
+        if hit is None:
+            return None
+        value, cost_ms = hit
+        if isinstance(value, str):
+            value = json.loads(value)
+        return list(value), cost_ms
+
+    def put_retrieval(self, key: str, ids: list[str], cost_ms: float) -> None:
+        self._put("retrievals", key, list(ids), json.dumps(ids), cost_ms)
+
+    def get_answer(self, bucket: str, vector: Sequence[float], threshold: float) -> CachedAnswer | None:
+        query = _unit(vector)
+        with self._lock:
+            hit = self._memory["answers"].get(bucket)
+            entries = hit[0] if hit is not None else []
+            if self._conn is not None and not entries:
+                rows = self._conn.execute(
+                    "SELECT vector, answer, metadata, cost_ms FROM answers WHERE bucket = ? "
+                    "ORDER BY last_used DESC LIMIT ?",
+                    (bucket, ANSWERS_PER_BUCKET),
+                ).fetchall()
+                entries = [
+                    (np.frombuffer(row[0], dtype=np.float32), row[1], json.loads(row[2]), row[3])
+                    for row in rows
+                ]
+                if entries:
+                    self._memory["answers"].put(bucket, entries, 0.0)
+        best: CachedAnswer | None = None
+        for unit, answer, metadata, cost_ms in entries:
+            similarity = float(np.dot(query, unit))
+            if similarity >= threshold and (best is None or similarity > best.similarity):
+                best = CachedAnswer(answer, metadata, cost_ms, similarity)
+        return best
+
+    def put_answer(
+        self,
+        bucket: str,
+        vector: Sequence[float],
+        answer: str,
+        response_metadata: dict[str, Any],
+        cost_ms: float,
+    ) -> None:
+        unit = _unit(vector)
+        with self._lock:
+            hit = self._memory["answers"].get(bucket)
+            entries = [(unit, answer, response_metadata, cost_ms)] + (hit[0] if hit is not None else [])
+            self._memory["answers"].put(bucket, entries[:ANSWERS_PER_BUCKET], 0.0)
+            if self._conn is None:
+                return
+            key = hashlib.sha256(bucket.encode("utf-8") + unit.tobytes()).hexdigest()
+            with self._conn:
+                added = self._is_new("answers", key)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers"
+                    " (key, bucket, vector, answer, metadata, cost_ms, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        bucket,
+                        unit.tobytes(),
+                        answer,
+                        json.dumps(response_metadata, default=str),
+                        cost_ms,
+                        time.time(),
+                    ),
+                )
+                if added:
+                    self._count_added("answers")
+
+    def _get(self, table: str, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            hit = self._memory[table].get(key)
+            if hit is not None or self._conn is None:
+                return hit
+            row = self._conn.execute(
+                f"SELECT value, cost_ms FROM {table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    f"UPDATE {table} SET last_used = ? WHERE key = ?", (time.time(), key)
+                )
+            return row[0], row[1]
+
+    def _put(self, table: str, key: str, value: Any, stored: Any, cost_ms: float) -> None:
+        with self._lock:
+            self._memory[table].put(key, value, cost_ms)
+            if self._conn is None:
+                return
+            with self._conn:
+                added = self._is_new(table, key)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (key, value, cost_ms, last_used) VALUES (?, ?, ?, ?)",
+                    (key, stored, cost_ms, time.time()),
+                )
+                if added:
+                    self._count_added(table)
+
+    def _is_new(self, table: str, key: str) -> bool:
+        return self._conn.execute(f"SELECT 1 FROM {table} WHERE key = ?", (key,)).fetchone() is None
+
+    def _count_added(self, table: str) -> None:
+        """Count a new disk row and prune ``table`` once it is over capacity."""
+        self._disk_counts[table] += 1
+        if self._disk_counts[table] <= self.max_disk_entries:
+            return
+        # Other processes may share the file, so count for real before deleting.
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > self.max_disk_entries:
+            keep = int(self.max_disk_entries * _PRUNE_TO)
+            # Oldest first through the last_used index; rowid avoids a key lookup per row.
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN ("
+                f" SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                (count - keep,),
+            )
+            count = keep
+        self._disk_counts[table] = count
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
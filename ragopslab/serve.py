@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+from chromadb.api.client import SharedSystemClient
+
+from ragopslab.chat import ChatResult, answer_question
+from ragopslab.chat_api import chat_filters, chat_payload, chat_usage
+from ragopslab.graph_chat import GraphChatResult, answer_graph, answer_question_graph
+from ragopslab.manifest import collection_embedding, collection_version, resolve_collection
+from ragopslab.session import RagSession
+
+
+class QueryService:
+    """Warm sessions for answering chat requests in one long-running process.
+
+    Keeps one :class:`RagSession` per (embedding model, chat model), where the
+    embedding model is the one recorded for the current collection, sharing
+    the embedding client between sessions of the same embedding model and the
+    query cache between all of them; the compiled answer graph is shared
+    process-wide. Chroma's HNSW index is held
+    in this process's memory and does not see writes made by other processes,
+    so when the collection version changes (an ingest finished) or the alias
+    points elsewhere (``--rebuild`` ran) the sessions reload it as soon as
+    in-flight requests finish. Catalog writes in the middle of an ingest don't
+    trigger a reload.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        persist_dir: Path | None = None,
+        collection_name: str | None = None,
+    ) -> None:
+        self.config = config
+        self.persist_dir = Path(persist_dir or config["paths"]["persist_dir"]).resolve()
+        self.collection_name = collection_name or config["chroma"]["collection"]
+        self._cond = threading.Condition()
+        self._active = 0
+        self._stamp = self._catalog_stamp()
+        self._lock = threading.Lock()
+        self._sessions: dict[tuple[str, str], RagSession] = {}
+
+    def _catalog_stamp(self) -> tuple[str, str]:
+        target = resolve_collection(self.persist_dir, self.collection_name)
+        return target, collection_version(self.persist_dir, target)
+
+    def _enter(self) -> None:
+        with self._cond:
+            while self._catalog_stamp() != self._stamp:
+                self._cond.wait_for(lambda: self._active == 0)
+                stamp = self._catalog_stamp()
+                if stamp != self._stamp:
+                    self._reload()
+                    self._stamp = stamp
+            self._active += 1
+
+    def _exit(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _reload(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.reload()
+            # Chroma shares one system per path; drop it so the index is read again.
+            SharedSystemClient.clear_system_cache()
+
+    def session(self, embedding_model: str | None = None, chat_model: str | None = None) -> RagSession:
+        # The collection's recorded model wins: its vectors only match queries embedded with it.
+        recorded, _ = collection_embedding(
+            self.persist_dir, resolve_collection(self.persist_dir, self.collection_name)
+        )
+        embedding_model = recorded or embedding_model or self.config["models"]["embedding_model"]
+        chat_model = chat_model or self.config["models"]["chat_model"]
+        with self._lock:
+            key = (embedding_model, chat_model)
+            if key not in self._sessions:
+                first = next(iter(self._sessions.values()), None)
+                shared = next(
+                    (s for (model, _), s in self._sessions.items() if model == embedding_model), None
+                )
+                self._sessions[key] = RagSession.from_config(
+                    self.config,
+                    persist_dir=self.persist_dir,
+                    collection_name=self.collection_name,
+                    embedding_model=embedding_model,
+                    chat_model=chat_model,
+                    embeddings=shared.embeddings if shared is not None else None,
+                    **({"query_cache": first.query_cache} if first is not None else {}),
+                )
+            return self._sessions[key]
+
+    def warm(self) -> None:
+        """Build the default session's clients and load the HNSW index before the first request."""
+        answer_graph()
+        session = self.session()
+        session.chain
+        collection = session.vectorstore._collection
+        probe = collection.get(limit=1, include=["embeddings"])
+        if probe["embeddings"] is not None and len(probe["embeddings"]):
+            collection.query(query_embeddings=probe["embeddings"], n_results=1, include=[])
+
+    def ask(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Answer one request (the ``chat`` options as JSON keys) with the ``chat`` JSON payload."""
+        query = str(request.get("query") or "")
+        if not query:
+            raise ValueError("'query' is required.")
+        config = self.config
+        retrieval = config["retrieval"]
+        chat_model = request.get("chat_model") or config["models"]["chat_model"]
+        embedding_model = request.get("embedding_model") or config["models"]["embedding_model"]
+        k = int(request.get("k") or retrieval["k"])
+        search_type = request.get("search_type") or retrieval.get("search_type", "similarity")
+        mmr_fetch_k = request.get("mmr_fetch_k") or retrieval.get("mmr_fetch_k", None)
+        filters = chat_filters(
+            config, request.get("source_type"), request.get("file_name"), request.get("page")
+        )
+
+        session = self.session(embedding_model, chat_model)
+        self._enter()
+        try:
+            common = dict(
+                query=query,
+                filters=filters,
+                search_type=search_type,
+                mmr_fetch_k=mmr_fetch_k,
+                session=session,
+            )
+            if request.get("graph"):
+                result: ChatResult | GraphChatResult = answer_question_graph(
+                    k_default=int(retrieval.get("k_default", k)),
+                    k_max=int(retrieval.get("k_max", k)),
+                    retry_on_no_answer=retrieval.get("retry_on_no_answer", True),
+                    **common,
+                )
+            else:
+                result = answer_question(k=k, **common)
+        finally:
+            self._exit()
+
+        show_usage = bool(request.get("show_usage", config.get("cost", {}).get("show_usage", False)))
+        usage = chat_usage(config, result, query, chat_model) if show_usage else None
+        return chat_payload(query, result, usage)
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "status": "ok",
+            "collection": resolve_collection(self.persist_dir, self.collection_name),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            # Sessions that borrowed an embedding client or query cache don't close
+            # it; the owner does.
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        SharedSystemClient.clear_system_cache()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients don't pay for a new connection per question.
+    protocol_version = "HTTP/1.1"
+    server: "QueryServer"
+
+    def _send(self, status: int, payload: dict[str, Any], started: float) -> None:
+        body = json.dumps(payload, ensure_ascii=True).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Server-Timing", f"total;dur={(time.perf_counter() - started) * 1000:.1f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        started = time.perf_counter()
+        if self.path == "/health":
+            self._send(200, self.server.service.health(), started)
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"}, started)
+
+    def do_POST(self) -> None:
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self.path != "/chat":
+            self._send(404, {"error": f"Unknown path: {self.path}"}, started)
+            return
+        try:
+            request = json.loads(raw or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object.")
+            payload = self.server.service.ask(request)
+        except ValueError as exc:
+            self._send(400, {"error": str(exc)}, started)
+        except Exception as exc:
+            self._send(500, {"error": f"{type(exc).__name__}: {exc}"}, started)
+        else:
+            self._send(200, payload, started)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: QueryService, verbose: bool = False) -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+        self.verbose = verbose
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable
+
+import chromadb
+from chromadb.api import ClientAPI
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_ollama import ChatOllama, OllamaEmbeddings
+
+from ragopslab.embedding_cache import with_embedding_cache
+from ragopslab.manifest import (
+    SourceManifest,
+    collection_embedding,
+    collection_version,
+    compact_filters,
+    open_compact_catalog,
+    resolve_collection,
+)
+from ragopslab.query_cache import CacheStats, QueryCache, answer_bucket, retrieval_key
+
+
+@dataclass
+class Generation:
+    answer: str
+    response_metadata: dict[str, Any]
+    cached: bool = False
+    streamed: bool = False
+    ttft_ms: float | None = None
+    total_ms: float | None = None
+    completion_tokens: int | None = None
+    decode_tokens_per_s: float | None = None
+
+    def timing(self) -> dict[str, Any]:
+        return {
+            "streamed": self.streamed,
+            "ttft_ms": round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+            "total_ms": round(self.total_ms, 1) if self.total_ms is not None else None,
+            "completion_tokens": self.completion_tokens,
+            "decode_tokens_per_s": (
+                round(self.decode_tokens_per_s, 1) if self.decode_tokens_per_s is not None else None
+            ),
+        }
+
+
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a helpful assistant. Use only the provided context. "
+            "If the answer is not in the context, say you don't know. "
+            "Cite sources with [#] matching the context numbers.",
+        ),
+        ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer:"),
+    ]
+)
+
+
+class RagSession:
+    """The clients behind chat, graph chat and eval, built once and reused.
+
+    Everything is constructed on first use: the Chroma client and vector store,
+    the (cached) embedding client, ``ChatOllama`` and the prompt chain. The
+    collection alias is resolved on every ``vectorstore`` access, so an
+    ``ingest --rebuild`` flip is followed, and queries are embedded with the
+    model the ingest recorded for that collection (``embedding_model`` only for
+    collections from before models were recorded). ``embeddings``, ``llm`` and
+    ``client`` may be passed in to share them between sessions; those are not
+    closed by :meth:`close`, and passed-in ``embeddings`` must match the
+    collection's model. The same goes for ``query_cache``; otherwise one
+    is built when ``query_cache_max_entries`` is set (see :meth:`retrieve`);
+    ``answer_cache_threshold`` turns on its answer level (see :meth:`generate`).
+    """
+
+    def __init__(
+        self,
+        persist_dir: Path,
+        collection_name: str,
+        embedding_model: str,
+        chat_model: str,
+        embedding_cache_dir: Path | None = None,
+        embedding_cache_max_mb: float = 512,
+        embedding_cache_dtype: str = "float32",
+        embeddings: Embeddings | None = None,
+        llm: ChatOllama | None = None,
+        client: ClientAPI | None = None,
+        query_cache: QueryCache | None = None,
+        query_cache_max_entries: int = 0,
+        query_cache_dir: Path | None = None,
+        query_cache_max_disk_entries: int = 100_000,
+        answer_cache_threshold: float | None = None,
+    ) -> None:
+        self.persist_dir = Path(persist_dir)
+        self.collection_name = collection_name
+        self.default_embedding_model = embedding_model
+        self.chat_model = chat_model
+        self.embedding_cache_dir = embedding_cache_dir
+        self.embedding_cache_max_mb = embedding_cache_max_mb
+        self.embedding_cache_dtype = embedding_cache_dtype
+        self._owns_embeddings = embeddings is None
+        self._embeddings = embeddings
+        self._embeddings_model: str | None = None
+        self._llm = llm
+        self._client = client
+        self._owns_query_cache = query_cache is None and query_cache_max_entries > 0
+        if self._owns_query_cache:
+            query_cache = QueryCache(
+                max_entries=query_cache_max_entries,
+                cache_dir=query_cache_dir,
+                max_disk_entries=query_cache_max_disk_entries,
+            )
+        self.query_cache = query_cache
+        self.answer_cache_threshold = answer_cache_threshold
+        self._chain = None
+        self._vectorstore: Chroma | None = None
+        self._vectorstore_collection: str | None = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict[str, Any],
+        persist_dir: Path | None = None,
+        collection_name: str | None = None,
+        embedding_model: str | None = None,
+        chat_model: str | None = None,
+        **kwargs: Any,
+    ) -> RagSession:
+        cache_cfg = config.get("embedding_cache", {}) or {}
+        cache_kwargs: dict[str, Any] = {"embedding_cache_dir": None}
+        if cache_cfg.get("enabled", False):
+            cache_kwargs = {
+                "embedding_cache_dir": Path(cache_cfg.get("dir", "storage/embedding_cache")),
+                "embedding_cache_max_mb": cache_cfg.get("max_mb", 512),
+                "embedding_cache_dtype": cache_cfg.get("dtype", "float32"),
+            }
+        query_cfg = config.get("query_cache", {}) or {}
+        if query_cfg.get("enabled", False) and "query_cache" not in kwargs:
+            cache_kwargs.update(
+                query_cache_max_entries=int(query_cfg.get("max_entries", 1024)),
+                query_cache_dir=Path(query_cfg["dir"]) if query_cfg.get("dir") else None,
+                query_cache_max_disk_entries=int(query_cfg.get("max_disk_entries", 100_000)),
+            )
+        if query_cfg.get("enabled", False) and query_cfg.get("answers", False):
+            cache_kwargs["answer_cache_threshold"] = float(query_cfg.get("answer_threshold", 0.97))
+        return cls(
+            persist_dir=Path(persist_dir or config["paths"]["persist_dir"]),
+            collection_name=collection_name or config["chroma"]["collection"],
+            embedding_model=embedding_model or config["models"]["embedding_model"],
+            chat_model=chat_model or config["models"]["chat_model"],
+            **{**cache_kwargs, **kwargs},
+        )
+
+    @property
+    def collection(self) -> str:
+        """Physical collection currently behind ``collection_name``."""
+        return resolve_collection(self.persist_dir, self.collection_name)
+
+    @property
+    def embedding_model(self) -> str:
+        """Embedding model of the current collection (the configured one if unrecorded)."""
+        model, _ = collection_embedding(self.persist_dir, self.collection)
+        return model or self.default_embedding_model
+
+    @property
+    def embeddings(self) -> Embeddings:
+        model = self.embedding_model
+        with self._lock:
+            if self._owns_embeddings and self._embeddings_model not in (None, model):
+                # The alias now points at a collection built with another model.
+                self._close_embeddings()
+                self._vectorstore = None
+            if self._embeddings is None:
+                self._embeddings = with_embedding_cache(
+                    OllamaEmbeddings(model=model),
+                    model=model,
+                    cache_dir=self.embedding_cache_dir,
+                    max_mb=self.embedding_cache_max_mb,
+                    dtype=self.embedding_cache_dtype,
+                )
+                self._embeddings_model = model
+            return self._embeddings
+
+    @property
+    def vectorstore(self) -> Chroma:
+        collection = self.collection
+        with self._lock:
+            if self._vectorstore is None or self._vectorstore_collection != collection:
+                if self._client is None:
+                    self._client = chromadb.PersistentClient(path=str(self.persist_dir))
+                self._vectorstore = Chroma(
+                    client=self._client,
+                    collection_name=collection,
+                    embedding_function=self.embeddings,
+                )
+                self._vectorstore_collection = collection
+            return self._vectorstore
+
+    @property
+    def llm(self) -> ChatOllama:
+        with self._lock:
+            if self._llm is None:
+                self._llm = ChatOllama(model=self.chat_model)
+            return self._llm
+
+    @property
+    def chain(self):
+        with self._lock:
+            if self._chain is None:
+                self._chain = PROMPT | self.llm
+            return self._chain
+
+    def open_catalog(self) -> SourceManifest | None:
+        """The compact-metadata catalog of the current collection (caller closes it), or None."""
+        return open_compact_catalog(self.persist_dir, self.collection)
+
+    def retrieve(
+        self,
+        query: str,
+        k: int,
+        filters: dict[str, Any] | None = None,
+        search_type: str = "similarity",
+        mmr_fetch_k: int | None = None,
+        catalog: SourceManifest | None = None,
+        stats: CacheStats | None = None,
+    ) -> list[Document]:
+        """The top ``k`` chunks for ``query``, through the query cache when there is one.
+
+        ``filters`` are translated through ``catalog`` for compact collections.
+        Cached chunk ids are keyed by the collection version, so any ingest that
+        changes the collection makes them miss; hits and misses are counted in
+        ``stats``.
+        """
+        if filters and catalog is not None:
+            filters = compact_filters(catalog, filters)
+        filters = filters or None
+        fetch_k = (mmr_fetch_k or 20) if search_type == "mmr" else None
+        vectorstore = self.vectorstore
+        cache = self.query_cache
+        stats = stats if stats is not None else CacheStats()
+
+        vector = self._query_vector(query, stats)
+        key = None
+        if cache is not None:
+            collection = vectorstore._collection.name
+            key = retrieval_key(
+                collection,
+                collection_version(self.persist_dir, collection),
+                vector,
+                k,
+                filters,
+                search_type,
+                fetch_k,
+            )
+            hit = cache.get_retrieval(key)
+            if hit is not None:
+                ids, cost_ms = hit
+                by_id = {doc.id: doc for doc in vectorstore.get_by_ids(ids)} if ids else {}
+                # A chunk gone without a version bump (e.g. deleted by hand): search again.
+                if len(by_id) == len(ids):
+                    stats.retrieval_hits += 1
+                    stats.saved_ms += cost_ms
+                    return [by_id[chunk_id] for chunk_id in ids]
+
+        started = time.perf_counter()
+        if search_type == "mmr":
+            docs = vectorstore.max_marginal_relevance_search_by_vector(
+                vector, k=k, fetch_k=fetch_k, filter=filters
+            )
+        else:
+            docs = vectorstore.similarity_search_by_vector(vector, k=k, filter=filters)
+        if key is not None:
+            stats.retrieval_misses += 1
+            ids = [doc.id for doc in docs]
+            if all(ids):
+                cost_ms = (time.perf_counter() - started) * 1000
+                cache.put_retrieval(key, ids, cost_ms)
+        return docs
+
+    def generate(
+        self,
+        query: str,
+        docs: list[Document],
+        context: str,
+        stats: CacheStats | None = None,
+        on_token: Callable[[str], None] | None = None,
+    ) -> Generation:
+        """Answer ``query`` from ``context``.
+
+        With an answer cache, a question whose embedding is within
+        ``answer_cache_threshold`` cosine similarity of one already answered
+        from the same chunks (same ids, order, collection version and chat
+        model) gets that answer back without calling the model. With
+        ``on_token``, the model's answer is streamed to it as it is decoded
+        (a cached answer arrives as one piece).
+        """
+        started = time.perf_counter()
+        cache = self.query_cache if self.answer_cache_threshold is not None else None
+        stats = stats if stats is not None else CacheStats()
+        ids = [doc.id for doc in docs]
+        bucket = None
+        if cache is not None and all(ids):
+            collection = self.vectorstore._collection.name
+            bucket = answer_bucket(
+                collection, collection_version(self.persist_dir, collection), self.chat_model, ids
+            )
+            vector = self._query_vector(query)
+            hit = cache.get_answer(bucket, vector, self.answer_cache_threshold)
+            if hit is not None:
+                stats.answer_hits += 1
+                stats.saved_ms += hit.cost_ms
+                if on_token is not None:
+                    on_token(hit.answer)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                return Generation(
+                    hit.answer,
+                    hit.response_metadata,
+                    cached=True,
+                    streamed=on_token is not None,
+                    ttft_ms=elapsed_ms,
+                    total_ms=elapsed_ms,
+                    completion_tokens=0,
+                )
+
+        inputs = {"context": context, "question": query}
+        first_token = None
+        chunks = 0
+        if on_token is None:
+            response = self.chain.invoke(inputs)
+        else:
+            response = None
+            for chunk in self.chain.stream(inputs):
+                if chunk.content:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    chunks += 1
+                    on_token(chunk.content)
+                response = chunk if response is None else response + chunk
+        finished = time.perf_counter()
+        answer = response.content if response is not None else ""
+        metadata = dict(getattr(response, "response_metadata", {}) or {})
+        if bucket is not None:
+            stats.answer_misses += 1
+            cache.put_answer(bucket, vector, answer, metadata, (finished - started) * 1000)
+
+        # Prefer Ollama's own decode counters; fall back to what arrived on the stream.
+        tokens = metadata.get("eval_count")
+        eval_ns = metadata.get("eval_duration")
+        tokens_per_s = None
+        if isinstance(tokens, int) and isinstance(eval_ns, int) and eval_ns > 0:
+            tokens_per_s = tokens / (eval_ns / 1e9)
+        elif first_token is not None and chunks > 1 and finished > first_token:
+            tokens = chunks
+            tokens_per_s = (chunks - 1) / (finished - first_token)
+        return Generation(
+            answer,
+            metadata,
+            streamed=on_token is not None,
+            # Without streaming nothing is shown until the whole answer is in.
+            ttft_ms=((first_token or finished) - started) * 1000,
+            total_ms=(finished - started) * 1000,
+            completion_tokens=tokens if isinstance(tokens, int) else None,
+            decode_tokens_per_s=tokens_per_s,
+        )
+
+    def _query_vector(self, query: str, stats: CacheStats | None = None) -> list[float]:
+        cache = self.query_cache
+        stats = stats if stats is not None else CacheStats()
+        collection = self.collection
+        model, dimension = collection_embedding(self.persist_dir, collection)
+        model = model or self.default_embedding_model
+        if cache is not None:
+            hit = cache.get_embedding(model, query)
+            if hit is not None:
+                vector, cost_ms = hit
+                stats.embedding_hits += 1
+                stats.saved_ms += cost_ms
+                return vector
+        started = time.perf_counter()
+        vector = self.embeddings.embed_query(query)
+        if dimension and len(vector) != dimension:
+            raise ValueError(
+                f"Query embedding has {len(vector)} dimensions but collection '{collection}' "
+                f"was built with {dimension} ({model})."
+            )
+        if cache is not None:
+            stats.embedding_misses += 1
+            cost_ms = (time.perf_counter() - started) * 1000
+            cache.put_embedding(model, query, vector, cost_ms)
+        return vector
+
+    def reload(self) -> None:
+        """Drop the Chroma client so the next query loads the index from disk again."""
+        with self._lock:
+            self._vectorstore = None
+            self._vectorstore_collection = None
+            self._client = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owns_embeddings:
+                self._close_embeddings()
+            if self._owns_query_cache and self.query_cache is not None:
+                self.query_cache.close()
+                self.query_cache = None
+            self.reload()
+
+    def _close_embeddings(self) -> None:
+        if self._embeddings is not None:
+            close = getattr(self._embeddings, "close", None)
+            if close is not None:
+                close()
+        self._embeddings = None
+        self._embeddings_model = None
+
+    def __enter__(self) -> RagSession:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
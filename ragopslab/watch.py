@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from ragopslab.discover import DEFAULT_IGNORE, is_included, iter_files
+
+
+Snapshot = dict[str, tuple[int, float]]
+
+
+def snapshot(data_dir: Path, extensions: Iterable[str], ignore: Iterable[str] = DEFAULT_IGNORE) -> Snapshot:
+    """(size, mtime) of every file ingest would pick up."""
+    state: Snapshot = {}
+    for path in iter_files(data_dir, extensions, ignore):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        state[str(path)] = (stat.st_size, stat.st_mtime)
+    return state
+
+
+def changed_paths(before: Snapshot, after: Snapshot) -> set[str]:
+    """Sources added, modified or removed between two snapshots."""
+    changed = {source for source, state in after.items() if before.get(source) != state}
+    changed.update(source for source in before if source not in after)
+    return changed
+
+
+def expand_change(
+    path: Path,
+    data_dir: Path,
+    extensions: Iterable[str],
+    ignore: Iterable[str],
+    known: Callable[[], Iterable[str]] | None = None,
+) -> set[str]:
+    """Sources a changed path stands for.
+
+    Notifications name only the top of a directory that was created, moved,
+    renamed or deleted. An existing directory stands for the files under it;
+    a directory (or a path that no longer exists) also for every ``known``
+    (catalogued) source under it, so files that went away with it are removed.
+    """
+    if path.is_file():
+        return {str(path)} if is_included(path, data_dir, extensions, ignore) else set()
+    changes: set[str] = set()
+    if path.is_dir():
+        changes.update(
+            str(found)
+            for found in iter_files(path, extensions, ignore)
+            if is_included(found, data_dir, extensions, ignore)
+        )
+    else:
+        # Deletions can't be checked against the filesystem; ingest only
+        # removes paths it has catalogued.
+        changes.add(str(path))
+    if known is not None:
+        prefix = str(path) + os.sep
+        changes.update(source for source in known() if source.startswith(prefix))
+    return changes
+
+
+def _poll_changes(
+    data_dir: Path,
+    extensions: list[str],
+    ignore: list[str],
+    interval: float,
+    stop: threading.Event,
+) -> Iterator[set[str]]:
+    current = snapshot(data_dir, extensions, ignore)
+    while not stop.wait(interval):
+        latest = snapshot(data_dir, extensions, ignore)
+        changes = changed_paths(current, latest)
+        current = latest
+        if changes:
+            yield changes
+
+
+def _native_changes(
+    data_dir: Path,
+    extensions: list[str],
+    ignore: list[str],
+    stop: threading.Event,
+    known: Callable[[], Iterable[str]] | None = None,
+) -> Iterator[set[str]]:
+    from watchfiles import watch
+
+    # watchfiles groups a burst of events itself; 50 ms keeps its own delay small
+    # so ``debounce`` below stays the only knob.
+    for events in watch(data_dir, debounce=50, stop_event=stop, yield_on_timeout=False):
+        changes: set[str] = set()
+        for _, raw_path in events:
+            changes.update(expand_change(Path(raw_path), data_dir, extensions, ignore, known))
+        if changes:
+            yield changes
+
+
+def _has_watchfiles() -> bool:
+    try:
+        import watchfiles  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def watch_directory(
+    data_dir: Path,
+    extensions: Iterable[str],
+    apply: Callable[[list[Path]], object],
+    ignore: Iterable[str] = DEFAULT_IGNORE,
+    interval: float = 2.0,
+    debounce: float = 1.0,
+    native: bool = True,
+    stop: threading.Event | None = None,
+    known: Callable[[], Iterable[str]] | None = None,
+) -> None:
+    """Call ``apply`` with batches of changed paths under ``data_dir`` until stopped.
+
+    Uses filesystem notifications (``watchfiles``) when installed and ``native``
+    is set, otherwise polls every ``interval`` seconds. Changes are collected
+    until none arrive for ``debounce`` seconds, so a burst of writes (an rsync,
+    an editor saving via a temp file) becomes one ``apply`` call. When ``apply``
+    returns ``False`` the batch stays pending and is retried after the next
+    debounce period, together with anything that changed meanwhile. ``known``
+    returns the catalogued sources; it lets a renamed or deleted directory be
+    expanded to the files that were under it.
+    """
+    data_dir = data_dir.resolve()
+    extensions = list(extensions)
+    ignore = list(ignore)
+    stop = stop or threading.Event()
+    if native and _has_watchfiles():
+        source = _native_changes(data_dir, extensions, ignore, stop, known)
+    else:
+        source = _poll_changes(data_dir, extensions, ignore, interval, stop)
+
+    pending: set[str] = set()
+    last_change = 0.0
+    lock = threading.Lock()
+    arrived = threading.Event()
+
+    def _collect() -> None:
+        nonlocal last_change
+        for changes in source:
+            with lock:
+                pending.update(changes)
+                last_change = time.monotonic()
+            arrived.set()
+        arrived.set()
+
+    collector = threading.Thread(target=_collect, name="ragopslab-watch", daemon=True)
+    collector.start()
+    while not stop.is_set():
+        arrived.wait(debounce if pending else interval)
+        arrived.clear()
+        with lock:
+            ready = bool(pending) and time.monotonic() - last_change >= debounce
+            batch = [Path(path) for path in sorted(pending)] if ready else []
+            if ready:
+                pending.clear()
+        if batch:
+            if apply(batch) is False:
+                with lock:
+                    pending.update(str(path) for path in batch)
+                    last_change = time.monotonic()
+        elif not collector.is_alive() and not pending:
+            break
+    stop.set()
+    collector.join(timeout=max(interval, 1.0))
@@ -12,6 +12,7 @@ if str(ROOT) not in sys.path:
 
 import chromadb
 import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
 
 from ragopslab.config import load_config
 
@@ -105,3 +106,10 @@ def temp_config(tmp_path: Path, temp_collection: dict[str, Path | str]) -> Path:
         encoding="utf-8",
     )
     return config_path
+
+
+@pytest.fixture()
+def fake_embeddings(monkeypatch: pytest.MonkeyPatch) -> DeterministicFakeEmbedding:
+    embeddings = DeterministicFakeEmbedding(size=8)
+    monkeypatch.setattr("ragopslab.ingest.OllamaEmbeddings", lambda **_: embeddings)
+    return embeddings
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from langchain_core.documents import Document
+
+from ragopslab.bench import bench_chunker, synthetic_text
+from ragopslab.chunking import OffsetTextSplitter
+
+
+def test_offset_splitter_records_exact_spans() -> None:
+    text = synthetic_text(20_000)
+    splitter = OffsetTextSplitter(chunk_size=300, chunk_overlap=60)
+    chunks = splitter.split_documents([Document(page_content=text, metadata={"page": 3})])
+
+    assert chunks
+    for chunk in chunks:
+        start, end = chunk.metadata["start_index"], chunk.metadata["end_index"]
+        assert text[start:end] == chunk.page_content
+        assert 0 < len(chunk.page_content) <= 300
+        assert chunk.metadata["page"] == 3
+        assert not chunk.page_content[0].isspace() and not chunk.page_content[-1].isspace()
+    starts = [chunk.metadata["start_index"] for chunk in chunks]
+    assert starts == sorted(set(starts))
+    # Consecutive chunks overlap (or touch) and together cover all non-blank text.
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.metadata["start_index"] <= previous.metadata["end_index"] + 2
+    assert chunks[-1].metadata["end_index"] == len(text.rstrip())
+
+
+def test_offset_splitter_prefers_paragraph_breaks_and_hard_cuts_long_words() -> None:
+    splitter = OffsetTextSplitter(chunk_size=40, chunk_overlap=0)
+    assert splitter.split_text("first paragraph here\n\nsecond one is here too") == [
+        "first paragraph here",
+        "second one is here too",
+    ]
+    assert splitter.split_text("x" * 100) == ["x" * 40, "x" * 40, "x" * 20]
+
+
+def test_bench_chunker_reports_both_strategies() -> None:
+    results = bench_chunker(synthetic_text(5_000), chunk_size=200, chunk_overlap=20, repeat=1)
+    assert [r.strategy for r in results] == ["recursive", "offsets"]
+    assert all(r.chunks > 0 and r.seconds > 0 for r in results)
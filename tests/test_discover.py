@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from ragopslab.discover import iter_files
+
+
+def test_iter_files_prunes_ignored_and_keeps_sorted_order(tmp_path: Path) -> None:
+    for rel in [
+        "b.txt",
+        "a/z.md",
+        "a/b/c.txt",
+        "a/skip.log",
+        ".git/objects/x.txt",
+        "node_modules/pkg/readme.md",
+        "drafts/wip.txt",
+        "notes/keep.txt",
+        "notes/tmp/scratch.txt",
+        "notes/secret.md",
+    ]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x", encoding="utf-8")
+    (tmp_path / ".ragignore").write_text("# top level\ndrafts/\n", encoding="utf-8")
+    (tmp_path / "notes" / ".ragignore").write_text("tmp/\nsecret.*\n", encoding="utf-8")
+
+    found = [path.relative_to(tmp_path).as_posix() for path in iter_files(tmp_path, ["txt", "md"])]
+
+    assert found == ["a/b/c.txt", "a/z.md", "b.txt", "notes/keep.txt"]
+    expected = sorted(
+        p for p in tmp_path.rglob("*") if p.suffix in {".txt", ".md"}
+        and not {".git", "node_modules", "drafts", "tmp"} & set(p.relative_to(tmp_path).parts)
+        and p.name != "secret.md"
+    )
+    assert [tmp_path / rel for rel in found] == expected
+
+
+def test_is_included_applies_the_same_rules(tmp_path: Path) -> None:
+    from ragopslab.discover import is_included
+
+    (tmp_path / "notes").mkdir()
+    (tmp_path / "notes" / ".ragignore").write_text("tmp/\n", encoding="utf-8")
+    assert is_included(tmp_path / "notes" / "a.txt", tmp_path, ["txt"])
+    assert not is_included(tmp_path / "notes" / "tmp" / "a.txt", tmp_path, ["txt"])
+    assert not is_included(tmp_path / "node_modules" / "a.txt", tmp_path, ["txt"])
+    assert not is_included(tmp_path / "notes" / "a.log", tmp_path, ["txt"])
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from pathlib import Path
+import threading
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from ragopslab.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_cache_persists_and_normalizes_whitespace(tmp_path: Path) -> None:
+    inner = CountingEmbeddings(size=4)
+    embeddings = CachedEmbeddings(inner, EmbeddingCache(tmp_path, "fake-model"))
+    first = embeddings.embed_documents(["alpha beta", "gamma"])
+    embeddings.close()
+
+    reopened = CachedEmbeddings(inner, EmbeddingCache(tmp_path, "fake-model"))
+    second = reopened.embed_documents(["alpha   beta\n", "gamma", "delta"])
+    assert inner.calls == 3
+    assert second[0] == pytest.approx(first[0], rel=1e-6)
+    assert second[1] == pytest.approx(first[1], rel=1e-6)
+    assert reopened.cache.hits == 2
+    reopened.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    # Room for exactly two 4-dim float32 vectors.
+    cache = EmbeddingCache(tmp_path, "fake-model", max_mb=32 / (1024 * 1024))
+    cache.put_many(["a"], [[1.0, 0.0, 0.0, 0.0]])
+    cache.put_many(["b"], [[0.0, 1.0, 0.0, 0.0]])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [[0.0, 0.0, 1.0, 0.0]])
+
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert a == [1.0, 0.0, 0.0, 0.0]
+    assert b is None
+    assert c == [0.0, 0.0, 1.0, 0.0]
+    cache.close()
+
+
+def test_cache_is_shared_safely_between_instances(tmp_path: Path) -> None:
+    # Each instance stands in for another process with its own connection and mapping.
+    reader = EmbeddingCache(tmp_path, "fake-model")
+    writer = EmbeddingCache(tmp_path, "fake-model")
+    writer.put_many(["seed"], [[0.5, 0.5, 0.5, 0.5]])
+    assert reader.get_many(["seed"]) == [[0.5, 0.5, 0.5, 0.5]]
+
+    # The writer grows vectors.bin past the reader's mapping.
+    texts = [f"text {idx}" for idx in range(1500)]
+    writer.put_many(texts, [[float(idx), 0.0, 0.0, 1.0] for idx in range(1500)])
+    assert reader.get_many(["text 1499"]) == [[1499.0, 0.0, 0.0, 1.0]]
+
+    def fill(cache: EmbeddingCache, prefix: str) -> None:
+        for idx in range(20):
+            cache.put_many([f"{prefix} {idx}"], [[float(idx), 0.0, 0.0, float(len(prefix))]])
+
+    threads = [
+        threading.Thread(target=fill, args=(reader, "left")),
+        threading.Thread(target=fill, args=(writer, "right side")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # No slot was handed to both instances.
+    assert reader.get_many([f"left {idx}" for idx in range(20)]) == [
+        [float(idx), 0.0, 0.0, 4.0] for idx in range(20)
+    ]
+    assert reader.get_many([f"right side {idx}" for idx in range(20)]) == [
+        [float(idx), 0.0, 0.0, 10.0] for idx in range(20)
+    ]
+    reader.close()
+    writer.close()
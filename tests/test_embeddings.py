@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from langchain_core.embeddings import Embeddings
+
+from ragopslab.embeddings import BatchedEmbeddings
+
+
+class FlakyEmbeddings(Embeddings):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+        self.failures = 1
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("ollama restarting")
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return [float(len(text))]
+
+
+def test_batched_embeddings_preserve_order_and_retry() -> None:
+    inner = FlakyEmbeddings()
+    embeddings = BatchedEmbeddings(inner, batch_size=2, concurrency=3, retry_backoff=0.0)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    vectors = embeddings.embed_documents(texts)
+    embeddings.close()
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert all(len(batch) <= 2 for batch in inner.calls)
+    assert len(inner.calls) == 4
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import chromadb
+import numpy as np
+import pytest
+
+from ragopslab.bench import bench_index, exact_neighbors, perturbed_queries, synthetic_vectors
+from ragopslab.index import hnsw_configuration, index_settings
+from ragopslab.ingest import ingest_directory
+
+
+def _ingest(data_dir: Path, persist_dir: Path, index: dict) -> None:
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+        index=index,
+    )
+
+
+def test_hnsw_configuration_maps_and_validates_settings() -> None:
+    assert hnsw_configuration({"space": "cosine", "M": 8, "construction_ef": 64, "search_ef": None}) == {
+        "space": "cosine",
+        "max_neighbors": 8,
+        "ef_construction": 64,
+    }
+    with pytest.raises(ValueError):
+        hnsw_configuration({"space": "hamming"})
+    with pytest.raises(ValueError):
+        hnsw_configuration({"ef": 10})
+
+
+def test_ingest_creates_collection_with_index_settings(
+    fake_embeddings: object, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("alpha content", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    _ingest(data_dir, persist_dir, {"space": "cosine", "M": 8, "construction_ef": 64, "search_ef": 20})
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection("test_collection")
+    settings = index_settings(collection)
+    assert (settings["space"], settings["M"], settings["construction_ef"], settings["search_ef"]) == (
+        "cosine",
+        8,
+        64,
+        20,
+    )
+
+    # search_ef is updated in place; M needs a rebuild.
+    _ingest(data_dir, persist_dir, {"space": "cosine", "M": 32, "construction_ef": 64, "search_ef": 50})
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection("test_collection")
+    settings = index_settings(collection)
+    assert (settings["M"], settings["search_ef"]) == (8, 50)
+    assert "--rebuild" in capsys.readouterr().out
+
+
+def test_exact_neighbors_returns_nearest_rows() -> None:
+    vectors = np.array([[0.0, 0.0], [1.0, 0.0], [5.0, 5.0]], dtype=np.float32)
+    queries = np.array([[0.9, 0.1]], dtype=np.float32)
+    assert exact_neighbors(vectors, queries, 2, "l2") == [{0, 1}]
+    assert exact_neighbors(vectors, queries, 1, "cosine") == [{1}]
+
+
+def test_bench_index_sweeps_settings() -> None:
+    vectors = synthetic_vectors(300, 16)
+    queries = perturbed_queries(vectors, 20)
+    results = bench_index(vectors, queries, k=5, m_values=(8, 16), search_efs=(50,))
+    assert [(r.M, r.search_ef) for r in results] == [(8, 50), (16, 50)]
+    for result in results:
+        assert result.recall > 0.9
+        assert result.p95_ms >= result.p50_ms > 0
+        assert result.index_mb > 0
@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import chromadb
+import pytest
+
+from ragopslab.ingest import ingest_directory
+
+
+def _ingest(data_dir: Path, persist_dir: Path, **kwargs: object):
+    return ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        **{"extensions": ["txt"], **kwargs},
+    )
+
+
+def _sources(persist_dir: Path) -> dict[str, int]:
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    collection = client.get_collection("test_collection")
+    tally: dict[str, int] = {}
+    for metadata in collection.get(include=["metadatas"])["metadatas"]:
+        name = metadata["file_name"]
+        tally[name] = tally.get(name, 0) + 1
+    return tally
+
+
+def test_sync_reindexes_changed_and_drops_removed(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "keep.txt").write_text("unchanged content", encoding="utf-8")
+    (data_dir / "edit.txt").write_text("original content", encoding="utf-8")
+    (data_dir / "drop.txt").write_text("soon removed", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    first = _ingest(data_dir, persist_dir, sync=True)
+    assert first.added == 3
+
+    (data_dir / "edit.txt").write_text("edited content, now longer", encoding="utf-8")
+    (data_dir / "drop.txt").unlink()
+    (data_dir / "new.txt").write_text("brand new file", encoding="utf-8")
+
+    second = _ingest(data_dir, persist_dir, sync=True)
+    assert (second.added, second.updated, second.removed, second.unchanged) == (1, 1, 1, 1)
+    assert _sources(persist_dir) == {"keep.txt": 1, "edit.txt": 1, "new.txt": 1}
+
+    third = _ingest(data_dir, persist_dir, sync=True)
+    assert third.unchanged == 3
+    assert third.chunks_created == 0
+
+
+def test_sync_releases_chunks_of_source_that_now_loads_nothing(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "keep.txt").write_text("unchanged content", encoding="utf-8")
+    (data_dir / "rows.csv").write_text("name,value\nalpha,1\nbeta,2\n", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    _ingest(data_dir, persist_dir, sync=True, extensions=["txt", "csv"])
+    assert _sources(persist_dir) == {"keep.txt": 1, "rows.csv": 2}
+
+    # Only the header is left, so the file loads zero documents.
+    (data_dir / "rows.csv").write_text("name,value\n", encoding="utf-8")
+    stats = _ingest(data_dir, persist_dir, sync=True, extensions=["txt", "csv"])
+    assert (stats.updated, stats.skipped, stats.unchanged) == (1, 0, 1)
+    assert _sources(persist_dir) == {"keep.txt": 1}
+
+    again = _ingest(data_dir, persist_dir, sync=True, extensions=["txt", "csv"])
+    assert (again.updated, again.unchanged) == (0, 2)
+
+
+def test_chunk_ids_are_deterministic_and_skip_existing(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("alpha " * 100, encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    first = _ingest(data_dir, persist_dir)
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    ids = sorted(client.get_collection("test_collection").get()["ids"])
+
+    # A second ingest into another store produces the same ids.
+    other = _ingest(data_dir, tmp_path / "other")
+    other_client = chromadb.PersistentClient(path=str(tmp_path / "other"))
+    assert sorted(other_client.get_collection("test_collection").get()["ids"]) == ids
+    assert first.chunks_created == other.chunks_created == len(ids)
+
+    # Appending to the file only re-embeds the chunks whose content changed.
+    (data_dir / "a.txt").write_text("alpha " * 100 + "omega", encoding="utf-8")
+    stats = _ingest(data_dir, persist_dir, sync=True)
+    assert stats.updated == 1
+    assert 0 < stats.chunks_skipped < stats.chunks_created
+    new_ids = client.get_collection("test_collection").get()["ids"]
+    assert len(new_ids) == stats.chunks_created
+    assert len(set(new_ids) & set(ids)) == stats.chunks_skipped
+
+
+def test_parallel_load_isolates_failures(fake_embeddings: object, tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "bad.pdf").write_bytes(b"not a pdf")
+    for idx in range(3):
+        (data_dir / f"doc{idx}.txt").write_text(f"document {idx}", encoding="utf-8")
+
+    stats = ingest_directory(
+        data_dir=data_dir,
+        persist_dir=tmp_path / "chroma",
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt", "pdf"],
+        workers=2,
+    )
+    assert stats.failed == 1
+    assert stats.files_loaded == 3
+    assert _sources(tmp_path / "chroma") == {"doc0.txt": 1, "doc1.txt": 1, "doc2.txt": 1}
+
+
+def test_streaming_ingest_writes_in_small_batches(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for idx in range(5):
+        (data_dir / f"doc{idx}.txt").write_text(f"document {idx} " * 40, encoding="utf-8")
+
+    stats = _ingest(data_dir, tmp_path / "chroma", batch_size=2, queue_size=1, workers=2)
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    assert client.get_collection("test_collection").count() == stats.chunks_created
+    assert stats.files_loaded == 5
+
+    again = _ingest(data_dir, tmp_path / "chroma", sync=True)
+    assert again.unchanged == 5
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_large_file_streams_in_bounded_memory(
+    fake_embeddings: object, tmp_path: Path, workers: int
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    path = data_dir / "big.jsonl"
+    with path.open("w", encoding="utf-8") as handle:
+        for idx in range(300):
+            handle.write(json.dumps({"id": idx, "text": f"record {idx} " + "x" * 20000}) + "\n")
+    file_mb = path.stat().st_size / (1024 * 1024)
+
+    stats = ingest_directory(
+        data_dir=data_dir,
+        persist_dir=tmp_path / "chroma",
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=25000,
+        chunk_overlap=0,
+        extensions=["jsonl"],
+        workers=workers,
+        batch_size=16,
+        trace_memory=True,
+    )
+    assert stats.chunks_created == 300
+    # Holding every chunk of the file at once would take more than the file itself.
+    assert 0 < stats.tracemalloc_peak_mb < file_mb / 2
+
+
+def test_file_failing_midway_rolls_back_queued_batches(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    from ragopslab.manifest import SourceManifest
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "ok.txt").write_text("fine content", encoding="utf-8")
+    lines = [json.dumps({"id": idx, "text": f"record {idx}"}) for idx in range(20)]
+    (data_dir / "broken.jsonl").write_text("\n".join(lines + ["{not json"]), encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    stats = _ingest(data_dir, persist_dir, extensions=["txt", "jsonl"], batch_size=4)
+    assert (stats.failed, stats.added) == (1, 1)
+    assert _sources(persist_dir) == {"ok.txt": 1}
+    manifest = SourceManifest(persist_dir, "test_collection")
+    assert sorted(Path(source).name for source in manifest.entries()) == ["ok.txt"]
+    assert manifest.unfinished() == []
+    manifest.close()
+
+
+def test_failing_writer_still_closes_manifest_and_embeddings(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from ragopslab import ingest
+    from ragopslab.manifest import SourceManifest
+
+    class FailingEmbeddings:
+        closed = False
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            raise RuntimeError("embedding backend down")
+
+        def close(self) -> None:
+            FailingEmbeddings.closed = True
+
+    closed: list[str] = []
+
+    class TrackedManifest(SourceManifest):
+        def close(self) -> None:
+            closed.append(self.collection_name)
+            super().close()
+
+    monkeypatch.setattr(ingest, "make_ingest_embeddings", lambda *_, **__: FailingEmbeddings())
+    monkeypatch.setattr(ingest, "SourceManifest", TrackedManifest)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("some content", encoding="utf-8")
+
+    with pytest.raises(RuntimeError, match="embedding backend down"):
+        _ingest(data_dir, tmp_path / "chroma")
+    assert FailingEmbeddings.closed
+    assert closed == ["test_collection"]
+
+
+def test_files_are_hashed_off_the_main_thread(
+    fake_embeddings: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import threading
+
+    from ragopslab import ingest
+
+    threads: list[str] = []
+    hash_file = ingest.hash_file
+
+    def _hash_file(path: Path) -> str:
+        threads.append(threading.current_thread().name)
+        return hash_file(path)
+
+    monkeypatch.setattr(ingest, "hash_file", _hash_file)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for idx in range(5):
+        (data_dir / f"f{idx}.txt").write_text(f"file {idx}", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    assert _ingest(data_dir, persist_dir, sync=True).added == 5
+    (data_dir / "f2.txt").write_text("file 2, edited", encoding="utf-8")
+    # Same content, new mtime: hashed, found unchanged and only touched.
+    (data_dir / "f3.txt").write_text("file 3", encoding="utf-8")
+    second = _ingest(data_dir, persist_dir, sync=True)
+
+    assert (second.updated, second.unchanged) == (1, 4)
+    assert threads and all(name.startswith("ragopslab-hash") for name in threads)
+
+
+def test_dedup_stores_identical_chunks_once(fake_embeddings: object, tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.csv").write_text("name,role\nAlice,Engineer\nBob,Analyst\n", encoding="utf-8")
+    (data_dir / "b.csv").write_text("name,role\nAlice,Engineer\nCarol,Manager\n", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    def run():
+        return ingest_directory(
+            data_dir=data_dir,
+            persist_dir=persist_dir,
+            collection_name="test_collection",
+            embedding_model="fake",
+            chunk_size=200,
+            chunk_overlap=20,
+            extensions=["csv"],
+            sync=True,
+            dedup=True,
+        )
+
+    stats = run()
+    assert stats.chunks_deduplicated == 1
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection("test_collection")
+    result = collection.get(where={"file_name": "a.csv"}, include=["metadatas", "documents"])
+    shared = [
+        m for m, d in zip(result["metadatas"], result["documents"]) if "Alice" in d
+    ][0]
+    assert shared["duplicate_count"] == 1
+    assert collection.count() == 3
+
+    (data_dir / "a.csv").unlink()
+    run()
+    assert collection.count() == 2
+    alice = collection.get(where_document={"$contains": "Alice"}, include=["metadatas"])
+    assert alice["metadatas"][0]["file_name"] == "b.csv"
+    assert "duplicate_sources" not in alice["metadatas"][0]
+
+
+def test_source_catalog_serves_sources_and_backfills(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    from ragopslab.inspect import list_sources
+    from ragopslab.manifest import MANIFEST_FILE
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("alpha " * 100, encoding="utf-8")
+    (data_dir / "b.txt").write_text("beta", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir)
+
+    sources = list_sources(persist_dir, "test_collection")
+    assert {(s.file_name, s.count) for s in sources} == set(_sources(persist_dir).items())
+    assert [s.file_name for s in list_sources(persist_dir, "test_collection", file_name="b.txt")] == ["b.txt"]
+
+    # Without a catalog the collection is scanned once and duplicates are still detected.
+    (persist_dir / MANIFEST_FILE).unlink()
+    with pytest.raises(ValueError, match="No new documents"):
+        _ingest(data_dir, persist_dir)
+    assert {s.file_name for s in list_sources(persist_dir, "test_collection")} == {"a.txt", "b.txt"}
+
+
+def test_compact_metadata_filters_and_rehydrates(fake_embeddings: object, tmp_path: Path) -> None:
+    from ragopslab.inspect import list_sources, summarize_collection
+    from ragopslab.manifest import compact_filters, open_compact_catalog
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("alpha", encoding="utf-8")
+    (data_dir / "b.txt").write_text("beta", encoding="utf-8")
+    (data_dir / "sub").mkdir()
+    (data_dir / "sub" / "b.txt").write_text("second beta", encoding="utf-8")
+    (data_dir / "c.md").write_text("gamma", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir, compact_metadata=True, extensions=["txt", "md"])
+
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection("test_collection")
+    stored = collection.get(include=["metadatas"])["metadatas"]
+    assert all("source_id" in m and "source" not in m and "file_name" not in m for m in stored)
+    assert sorted(m["source_type"] for m in stored) == ["md", "txt", "txt", "txt"]
+
+    catalog = open_compact_catalog(persist_dir, "test_collection")
+    assert catalog is not None
+    # Source types are filtered on the chunks themselves, not through the catalog.
+    assert compact_filters(catalog, {"source_type": "md"}) == {"source_type": "md"}
+    where = compact_filters(catalog, {"file_name": "b.txt"})
+    assert list(where) == ["source_id"]
+    assert "$and" in compact_filters(catalog, {"file_name": "b.txt", "start_index": 0})
+    with pytest.raises(ValueError, match="matches 2 sources"):
+        compact_filters(catalog, {"file_name": "b.txt"}, max_ids=1)
+    catalog.close()
+    assert sorted(collection.get(where=where)["documents"]) == ["beta", "second beta"]
+    assert collection.get(where={"source_type": "md"})["documents"] == ["gamma"]
+
+    summary = summarize_collection(persist_dir, "test_collection", limit=0)
+    assert sorted(m["file_name"] for m in summary.metadatas) == ["a.txt", "b.txt", "b.txt", "c.md"]
+    assert sorted(s.file_name for s in list_sources(persist_dir, "test_collection")) == [
+        "a.txt",
+        "b.txt",
+        "b.txt",
+        "c.md",
+    ]
+
+    with pytest.raises(ValueError, match="compact_metadata"):
+        _ingest(data_dir, persist_dir)
+
+
+def test_interrupted_ingest_rolls_back_partial_sources(
+    fake_embeddings: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    from ragopslab.manifest import SourceManifest
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("\n\n".join(f"para {i} " * 20 for i in range(6)), encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+
+    calls: list[int] = []
+
+    class _Crashing(DeterministicFakeEmbedding):
+        """Writes the first batch, then fails as if the embedding server died."""
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            calls.append(len(texts))
+            if len(calls) > 1:
+                raise RuntimeError("embedding server went away")
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr("ragopslab.ingest.OllamaEmbeddings", lambda **_: _Crashing(size=8))
+    with pytest.raises(RuntimeError):
+        _ingest(data_dir, persist_dir, batch_size=2, embedding_max_retries=0)
+
+    manifest = SourceManifest(persist_dir, "test_collection")
+    assert [entry.status for entry in manifest.unfinished()] == ["pending"]
+    manifest.close()
+    assert _sources(persist_dir) == {"a.txt": 2}
+
+    monkeypatch.setattr("ragopslab.ingest.OllamaEmbeddings", lambda **_: DeterministicFakeEmbedding(size=8))
+    stats = _ingest(data_dir, persist_dir, batch_size=2)
+    assert stats.rolled_back == 1
+    assert stats.added == 1
+    assert _sources(persist_dir) == {"a.txt": stats.chunks_created}
+    manifest = SourceManifest(persist_dir, "test_collection")
+    assert manifest.unfinished() == []
+    assert manifest.get(str((data_dir / "a.txt").resolve())).chunk_count == stats.chunks_created
+    manifest.close()
+
+
+def test_rebuild_flips_alias_and_keeps_previous_until_next(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    from ragopslab.ingest import rebuild_collection
+    from ragopslab.inspect import list_sources
+    from ragopslab.manifest import resolve_collection
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("alpha", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir)
+    (data_dir / "b.txt").write_text("beta", encoding="utf-8")
+
+    kwargs = dict(
+        embedding_model="fake", chunk_size=200, chunk_overlap=20, extensions=["txt"]
+    )
+    # A reader resolves the alias and holds the collection across the flip.
+    reader = chromadb.PersistentClient(path=str(persist_dir))
+    held = reader.get_collection(resolve_collection(persist_dir.resolve(), "test_collection"))
+    probe = held.get(limit=1, include=["embeddings"])["embeddings"]
+
+    first = rebuild_collection(data_dir, persist_dir, "test_collection", **kwargs)
+    assert first.previous == "test_collection"
+    assert first.dropped == []
+    assert resolve_collection(persist_dir.resolve(), "test_collection") == first.collection
+    assert {s.file_name for s in list_sources(persist_dir, "test_collection")} == {"a.txt", "b.txt"}
+    assert held.query(query_embeddings=probe, n_results=1)["ids"][0]
+
+    second = rebuild_collection(data_dir, persist_dir, "test_collection", **kwargs)
+    assert (second.previous, second.dropped) == (first.collection, ["test_collection"])
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    assert {c.name for c in client.list_collections()} == {first.collection, second.collection}
+
+    # A failed rebuild leaves the served collection untouched.
+    for path in data_dir.iterdir():
+        path.unlink()
+    with pytest.raises(ValueError):
+        rebuild_collection(data_dir, persist_dir, "test_collection", **kwargs)
+    assert resolve_collection(persist_dir.resolve(), "test_collection") == second.collection
+    assert {c.name for c in client.list_collections()} == {first.collection, second.collection}
+
+
+def test_offsets_chunking_strategy_stores_end_index(fake_embeddings: object, tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_text("word " * 200, encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir, chunking_strategy="offsets")
+
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    stored = client.get_collection("test_collection").get(include=["metadatas", "documents"])
+    text = (data_dir / "a.txt").read_text(encoding="utf-8")
+    for metadata, document in zip(stored["metadatas"], stored["documents"]):
+        assert text[metadata["start_index"] : metadata["end_index"]] == document
+
+
+def test_ingest_reports_stage_timings(fake_embeddings: object, tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for idx in range(3):
+        (data_dir / f"{idx}.txt").write_text(f"file {idx} " * 100, encoding="utf-8")
+    stats = _ingest(data_dir, tmp_path / "chroma", batch_size=4, trace_memory=True)
+
+    assert stats.bytes_read == sum(p.stat().st_size for p in data_dir.iterdir())
+    assert stats.total_seconds >= stats.discover_seconds > 0
+    assert stats.load_seconds > 0 and stats.split_seconds > 0
+    assert stats.embed_seconds > 0 and stats.write_seconds > 0
+    assert 0 < stats.embed_latency_p50_ms <= stats.embed_latency_p95_ms <= stats.embed_latency_p99_ms
+    assert stats.peak_rss_mb > 0 and stats.tracemalloc_peak_mb > 0
+    payload = stats.to_dict()
+    assert payload["chunks_per_second"] == stats.chunks_per_second > 0
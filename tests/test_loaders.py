@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import io
 import json
 from pathlib import Path
 
-from ragopslab.ingest import _load_file
+import pytest
+
+from ragopslab.ingest import LoaderOptions, _iter_json_array, _load_file
 
 
 def test_load_csv_and_json(tmp_path: Path) -> None:
@@ -25,3 +28,63 @@ def test_load_csv_and_json(tmp_path: Path) -> None:
     assert len(json_docs) == 2
     assert json_docs[0].metadata["source_type"] == "json"
     assert json_docs[0].metadata["record_id"] == 1
+
+
+def test_load_csv_packs_rows(tmp_path: Path) -> None:
+    csv_path = tmp_path / "rows.csv"
+    rows = "\n".join(f"user{idx},role{idx}" for idx in range(1, 8))
+    csv_path.write_text("name,role\n" + rows + "\n", encoding="utf-8")
+
+    docs = _load_file(csv_path, LoaderOptions(csv_rows_per_doc=3))
+
+    assert len(docs) == 3
+    assert (docs[0].metadata["row_id"], docs[0].metadata["row_end"]) == (1, 3)
+    assert "name: user2" in docs[0].page_content
+    assert docs[2].metadata["row_id"] == 7
+    assert "row_end" not in docs[2].metadata
+
+    capped = _load_file(csv_path, LoaderOptions(csv_rows_per_doc=0, csv_max_chars=60))
+    assert all(len(doc.page_content) <= 60 for doc in capped)
+    assert capped[-1].metadata.get("row_end", capped[-1].metadata["row_id"]) == 7
+
+
+def test_load_json_lines_with_field_selection(tmp_path: Path) -> None:
+    path = tmp_path / "people.jsonl"
+    records = [
+        {"name": "Zoë", "meta": {"team": "core", "id": 7}, "noise": "x" * 50},
+        {"name": "Bob", "meta": {"team": "ops", "id": 8}, "noise": "y" * 50},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n\n", encoding="utf-8")
+
+    docs = _load_file(path, LoaderOptions(json_fields=("name", "meta.team"), json_flatten=True))
+
+    assert [doc.metadata["record_id"] for doc in docs] == [1, 2]
+    assert docs[0].page_content == "name: Zoë\nmeta.team: core"
+    assert "noise" not in docs[1].page_content
+
+
+VALID_ARRAYS = [
+    "[]",
+    " [ ] ",
+    "[1, 2.5]",
+    "[-1.5e10]",
+    '["a]b", {"k": [1, "x,y"]}, null, true, false, -1.5e10]',
+    json.dumps([12345, {"text": "héllo"}, [1, 2], "tail", 6.5]),
+    "[\n  1E+2 ,\n  0.25\n]\n",
+]
+INVALID_ARRAYS = ["[1 2]", "[,1]", "[1,,2]", "[1,]", "[1", "[1,", "[2.x]", "[tru]", "{}"]
+
+
+@pytest.mark.parametrize("payload", VALID_ARRAYS)
+def test_iter_json_array_streams_across_every_block_size(payload: str) -> None:
+    expected = json.loads(payload)
+    for block_size in range(1, len(payload) + 2):
+        items = list(_iter_json_array(io.StringIO(payload), block_size=block_size))
+        assert items == expected, block_size
+
+
+@pytest.mark.parametrize("payload", INVALID_ARRAYS)
+def test_iter_json_array_rejects_malformed_arrays(payload: str) -> None:
+    for block_size in range(1, len(payload) + 2):
+        with pytest.raises(ValueError):
+            list(_iter_json_array(io.StringIO(payload), block_size=block_size))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+import shutil
+
+import pytest
+from langchain_community.document_loaders import PyPDFLoader
+
+from ragopslab.manifest import hash_file
+from ragopslab import pdf
+from ragopslab.pdf import PdfPageCache, iter_pdf_pages
+
+SAMPLE_PDF = next(Path(__file__).resolve().parents[1].glob("data/sample_docs/*.pdf"))
+
+
+def test_paged_pdf_matches_pypdf_loader_and_caches_pages(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    pdf_path = tmp_path / "sample.pdf"
+    shutil.copy(SAMPLE_PDF, pdf_path)
+    file_hash = hash_file(pdf_path)
+    cache_dir = tmp_path / "pdf_cache"
+
+    expected = PyPDFLoader(str(pdf_path)).load()
+    pages = list(iter_pdf_pages(pdf_path, workers=2, cache_dir=cache_dir, file_hash=file_hash))
+
+    assert [doc.page_content for doc in pages] == [doc.page_content for doc in expected]
+    assert [doc.metadata["page"] for doc in pages] == list(range(len(expected)))
+    cache = PdfPageCache(cache_dir)
+    assert len(cache.get(file_hash)) == len(expected)
+    cache.close()
+
+    # A second pass is served from the cache without extracting any page.
+    def fail(*_: object) -> str:
+        raise AssertionError("page was re-extracted")
+
+    monkeypatch.setattr("ragopslab.pdf._page_text", fail)
+    again = list(iter_pdf_pages(pdf_path, cache_dir=cache_dir, file_hash=file_hash))
+    assert [doc.page_content for doc in again] == [doc.page_content for doc in pages]
+
+
+def test_page_cache_evicts_least_recently_used_files(tmp_path: Path) -> None:
+    # Room for two files of 400 bytes of page text each.
+    cache = PdfPageCache(tmp_path, max_mb=900 / (1024 * 1024))
+    page = [(0, "1", "x" * 399)]
+    cache.put("a", page)
+    cache.put("b", page)
+    assert cache.get("a")
+    cache.put("c", page)
+
+    assert cache.get("b") == {}
+    assert cache.get("a") and cache.get("c")
+    cache.close()
+
+    # A file bigger than the whole cache is still kept while it is written.
+    cache = PdfPageCache(tmp_path, max_mb=100 / (1024 * 1024))
+    cache.put("d", page)
+    assert [bool(cache.get(name)) for name in "acd"] == [False, False, True]
+    cache.close()
+
+
+def test_page_cache_counts_re_put_pages_once(tmp_path: Path) -> None:
+    cache = PdfPageCache(tmp_path, max_mb=900 / (1024 * 1024))
+    cache.put("a", [(0, "1", "x" * 399)])
+    cache.put("a", [(0, "1", "x" * 399), (1, "2", "y" * 99)])
+    cache.put("a", [(1, "2", "y" * 99)])
+    cache.put("b", [(0, "1", "z" * 399)])
+
+    # 500 + 400 bytes fit: nothing was evicted by inflated sizes.
+    assert cache._total == cache._total_bytes() == 900
+    assert len(cache.get("a")) == 2 and cache.get("b")
+    cache.close()
+
+
+def test_page_pool_is_shared_between_pdfs(tmp_path: Path) -> None:
+    paths = []
+    for name in ("one.pdf", "two.pdf"):
+        shutil.copy(SAMPLE_PDF, tmp_path / name)
+        paths.append(tmp_path / name)
+    try:
+        first = list(iter_pdf_pages(paths[0], workers=2))
+        pool = pdf._pool
+        second = list(iter_pdf_pages(paths[1], workers=2))
+        assert pool is not None and pdf._pool is pool
+        assert [doc.page_content for doc in first] == [doc.page_content for doc in second]
+    finally:
+        pdf.shutdown_page_pool()
+    assert pdf._pool is None
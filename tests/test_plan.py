@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+import shutil
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from ragopslab.ingest import LoaderOptions, ingest_directory
+from ragopslab.plan import plan_ingest
+
+SAMPLE_PDF = next(Path(__file__).resolve().parents[1].glob("data/sample_docs/*.pdf"))
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    texts: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.texts = list(texts)
+        return super().embed_documents(texts)
+
+
+def test_plan_extrapolates_from_sample_without_writing(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for idx in range(10):
+        (data_dir / f"{idx}.txt").write_text(f"doc{idx} " * 150, encoding="utf-8")
+    (data_dir / "rows.csv").write_text("a,b\n1,2\n3,4\n", encoding="utf-8")
+
+    plan = plan_ingest(
+        data_dir,
+        ["txt", "csv"],
+        chunk_size=200,
+        chunk_overlap=20,
+        sample_per_type=2,
+        embeddings=DeterministicFakeEmbedding(size=16),
+    )
+
+    by_type = {t.source_type: t for t in plan.types}
+    assert (by_type["txt"].files, by_type["txt"].sampled_files) == (10, 2)
+    assert plan.files == 11
+    assert plan.dimension == 16
+    assert plan.embed_chunks_per_second and plan.est_wall_seconds is not None
+    assert plan.est_index_mb > 0
+    assert list(tmp_path.iterdir()) == [data_dir]
+
+    stats = ingest_directory(
+        data_dir=data_dir,
+        persist_dir=tmp_path / "chroma",
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt", "csv"],
+    )
+    assert plan.est_chunks == stats.chunks_created
+
+
+def test_plan_skips_page_cache_and_samples_every_type(tmp_path: Path) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    shutil.copy(SAMPLE_PDF, data_dir / "sample.pdf")
+    rows = "".join(f"row{idx},value{idx}\n" for idx in range(50))
+    (data_dir / "rows.csv").write_text("name,value\n" + rows, encoding="utf-8")
+    (data_dir / "notes.txt").write_text("note " * 300, encoding="utf-8")
+    storage = tmp_path / "storage"
+    embeddings = RecordingEmbeddings(size=8)
+
+    plan_ingest(
+        data_dir,
+        ["pdf", "csv", "txt"],
+        chunk_size=200,
+        chunk_overlap=20,
+        loader_options=LoaderOptions(pdf_cache_dir=str(storage / "pdf_cache")),
+        embeddings=embeddings,
+        embed_sample=6,
+    )
+
+    assert not storage.exists()
+    # Two texts per type rather than six CSV rows.
+    assert len(embeddings.texts) == 6
+    assert sum(text.startswith("name: row") for text in embeddings.texts) == 2
+    assert sum(text.startswith("note") for text in embeddings.texts) == 2
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+import pytest
+
+from ragopslab.chat import answer_question
+from ragopslab.ingest import ingest_directory
+from ragopslab.manifest import collection_version
+from ragopslab.query_cache import CacheStats, QueryCache
+from ragopslab.session import RagSession
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.queries += 1
+        return super().embed_query(text)
+
+
+class PhrasingEmbeddings(DeterministicFakeEmbedding):
+    """Embeds questions that differ only in case and punctuation identically."""
+
+    def embed_query(self, text: str) -> list[float]:
+        return super().embed_query(text.lower().strip(" ?!."))
+
+
+def _ingest(data_dir: Path, persist_dir: Path) -> None:
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+    )
+
+
+@pytest.fixture()
+def corpus(fake_embeddings: DeterministicFakeEmbedding, tmp_path: Path) -> dict[str, Path]:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "alpha.txt").write_text("alpha content", encoding="utf-8")
+    (data_dir / "beta.txt").write_text("beta content", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir)
+    return {"data_dir": data_dir, "persist_dir": persist_dir, "cache_dir": tmp_path / "query_cache"}
+
+
+def _session(corpus: dict[str, Path], embeddings: DeterministicFakeEmbedding, **kwargs) -> RagSession:
+    return RagSession(
+        corpus["persist_dir"],
+        "test_collection",
+        "fake",
+        kwargs.pop("chat_model", "fake-chat"),
+        embeddings=embeddings,
+        query_cache_max_entries=16,
+        query_cache_dir=corpus["cache_dir"],
+        **kwargs,
+    )
+
+
+def test_repeated_query_hits_both_levels(corpus: dict[str, Path]) -> None:
+    embeddings = CountingEmbeddings(size=8)
+    with _session(corpus, embeddings) as session:
+        first = CacheStats()
+        docs = session.retrieve("What is it?", 2, stats=first)
+        second = CacheStats()
+        again = session.retrieve("  What is   it? ", 2, stats=second)
+
+    assert [doc.id for doc in again] == [doc.id for doc in docs]
+    assert [doc.page_content for doc in again] == [doc.page_content for doc in docs]
+    assert (first.embedding_misses, first.retrieval_misses) == (1, 1)
+    assert (second.embedding_hits, second.retrieval_hits) == (1, 1)
+    assert second.to_dict()["hit_rate"] == 1.0
+    assert embeddings.queries == 1
+
+
+def test_disk_tier_is_shared_between_sessions(corpus: dict[str, Path]) -> None:
+    embeddings = CountingEmbeddings(size=8)
+    with _session(corpus, embeddings) as session:
+        session.retrieve("What is it?", 2)
+    stats = CacheStats()
+    with _session(corpus, embeddings) as session:
+        session.retrieve("What is it?", 2, stats=stats)
+    assert (stats.embedding_hits, stats.retrieval_hits) == (1, 1)
+    assert embeddings.queries == 1
+
+
+def test_ingest_change_invalidates_cached_retrievals(corpus: dict[str, Path]) -> None:
+    persist_dir = corpus["persist_dir"]
+    version = collection_version(persist_dir, "test_collection")
+    assert version
+
+    embeddings = CountingEmbeddings(size=8)
+    with _session(corpus, embeddings) as session:
+        session.retrieve("What is it?", 4)
+        # A sync with nothing to do keeps the version and the cached result.
+        _ingest(corpus["data_dir"], persist_dir)
+        assert collection_version(persist_dir, "test_collection") == version
+        (corpus["data_dir"] / "gamma.txt").write_text("gamma content", encoding="utf-8")
+        _ingest(corpus["data_dir"], persist_dir)
+        assert collection_version(persist_dir, "test_collection") != version
+
+        session.reload()
+        stats = CacheStats()
+        docs = session.retrieve("What is it?", 4, stats=stats)
+
+    assert (stats.embedding_hits, stats.retrieval_misses) == (1, 1)
+    assert sorted(doc.metadata["file_name"] for doc in docs) == ["alpha.txt", "beta.txt", "gamma.txt"]
+
+
+def test_near_duplicate_question_is_answered_from_cache(corpus: dict[str, Path]) -> None:
+    embeddings = PhrasingEmbeddings(size=8)
+    llm = FakeListChatModel(responses=["first [1].", "second [1]."])
+    with _session(corpus, embeddings, llm=llm, answer_cache_threshold=0.95) as session:
+        first = answer_question("What is it?", k=2, session=session)
+        again = answer_question("what is it", k=2, session=session)
+
+    assert (first.answer, first.cached) == ("first [1].", False)
+    assert (again.answer, again.cached) == ("first [1].", True)
+    assert again.citations == first.citations
+    assert again.cache["answer_hits"] == 1
+
+    # Another chat model never gets this answer.
+    llm = FakeListChatModel(responses=["other [1]."])
+    with _session(
+        corpus, embeddings, chat_model="other-chat", llm=llm, answer_cache_threshold=0.95
+    ) as session:
+        other = answer_question("What is it?", k=2, session=session)
+    assert (other.answer, other.cached) == ("other [1].", False)
+
+
+def test_disk_tier_prunes_oldest_in_batches_when_over_capacity(tmp_path: Path) -> None:
+    cache = QueryCache(max_entries=1, cache_dir=tmp_path, max_disk_entries=50)
+    deletes: list[str] = []
+    cache._conn.set_trace_callback(
+        lambda sql: deletes.append(sql) if sql.startswith("DELETE") else None
+    )
+    for idx in range(70):
+        cache.put_retrieval(f"key{idx}", [f"id{idx}"], 1.0)
+        # Refreshing an entry neither grows the level nor triggers a prune.
+        cache.put_retrieval(f"key{idx}", [f"id{idx}"], 1.0)
+    cache.close()
+
+    # Each overflow to 51 rows prunes back to 45: four prunes for 70 new keys.
+    assert len(deletes) == 4
+    reopened = QueryCache(max_entries=1, cache_dir=tmp_path, max_disk_entries=50)
+    assert reopened._disk_counts["retrievals"] == 46
+    assert reopened.get_retrieval("key69") is not None
+    assert reopened.get_retrieval("key24") is not None
+    assert reopened.get_retrieval("key23") is None
+    reopened.close()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+import pytest
+
+from ragopslab.config import DEFAULTS, _deep_merge
+from ragopslab.ingest import ingest_directory, rebuild_collection
+from ragopslab.manifest import SourceManifest, collection_embedding
+from ragopslab.serve import QueryServer, QueryService
+from ragopslab.session import RagSession
+
+
+def _ingest(data_dir: Path, persist_dir: Path) -> None:
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+    )
+
+
+def _post(url: str, payload: object) -> dict:
+    request = Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    with urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+@pytest.fixture()
+def server(fake_embeddings: DeterministicFakeEmbedding, monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.setattr("ragopslab.session.OllamaEmbeddings", lambda **_: fake_embeddings)
+    built: list[str] = []
+
+    def fake_chat(model: str) -> FakeListChatModel:
+        built.append(model)
+        return FakeListChatModel(responses=["It is alpha [1]."])
+
+    monkeypatch.setattr("ragopslab.session.ChatOllama", fake_chat)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "alpha.txt").write_text("alpha content", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    _ingest(data_dir, persist_dir)
+
+    config = _deep_merge(
+        DEFAULTS,
+        {
+            "paths": {"persist_dir": str(persist_dir)},
+            "chroma": {"collection": "test_collection"},
+            "embedding_cache": {"enabled": False},
+            "query_cache": {"dir": str(tmp_path / "query_cache")},
+        },
+    )
+    service = QueryService(config)
+    service.warm()
+    httpd = QueryServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield {
+        "url": f"http://127.0.0.1:{httpd.server_port}",
+        "data_dir": data_dir,
+        "persist_dir": persist_dir,
+        "built": built,
+    }
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+
+def test_serve_answers_with_chat_payload_and_reuses_clients(server: dict) -> None:
+    first = _post(server["url"] + "/chat", {"query": "What is it?", "k": 2})
+    assert first["answer"] == "It is alpha [1]."
+    assert [item["file_name"] for item in first["citations"]] == ["alpha.txt"]
+    repeat = _post(server["url"] + "/chat", {"query": "What is it?", "k": 2})
+    assert repeat["usage"]["cache"]["retrieval_hits"] == 1
+
+    graph = _post(server["url"] + "/chat", {"query": "What is it?", "graph": True})
+    assert graph["retrieval"] == {"used_k": 4, "attempts": 0}
+    # One chat client for every request, built at warm-up.
+    assert len(server["built"]) == 1
+
+    with urlopen(server["url"] + "/health", timeout=10) as response:
+        assert json.load(response) == {"status": "ok", "collection": "test_collection"}
+
+
+def test_serve_rejects_bad_requests(server: dict) -> None:
+    with pytest.raises(HTTPError) as missing:
+        _post(server["url"] + "/chat", {"k": 2})
+    assert missing.value.code == 400
+    with pytest.raises(HTTPError) as unknown:
+        _post(server["url"] + "/nope", {"query": "x"})
+    assert unknown.value.code == 404
+
+
+def test_serve_picks_up_a_new_ingest(server: dict, monkeypatch: pytest.MonkeyPatch) -> None:
+    reloads: list[str] = []
+    reload = RagSession.reload
+    monkeypatch.setattr(RagSession, "reload", lambda self: (reloads.append("x"), reload(self)))
+    _post(server["url"] + "/chat", {"query": "What is it?"})
+    # Checkpoints written while an ingest is running leave the version alone.
+    manifest = SourceManifest(server["persist_dir"], "test_collection")
+    manifest.begin(str(server["data_dir"] / "beta.txt"), 12, 0.0)
+    manifest.close()
+    _post(server["url"] + "/chat", {"query": "What is it?"})
+    assert reloads == []
+
+    (server["data_dir"] / "beta.txt").write_text("beta content", encoding="utf-8")
+    _ingest(server["data_dir"], server["persist_dir"])
+
+    payload = _post(server["url"] + "/chat", {"query": "What is it?", "k": 4})
+    assert sorted(item["file_name"] for item in payload["citations"]) == ["alpha.txt", "beta.txt"]
+    assert len(reloads) == 1
+
+
+def test_rebuild_with_another_embedding_model_switches_readers(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    sizes = {"small": 8, "large": 16}
+    monkeypatch.setattr(
+        "ragopslab.ingest.OllamaEmbeddings",
+        lambda model, **_: DeterministicFakeEmbedding(size=sizes[model]),
+    )
+    built: list[str] = []
+
+    def fake_embeddings(model: str) -> DeterministicFakeEmbedding:
+        built.append(model)
+        return DeterministicFakeEmbedding(size=sizes[model])
+
+    monkeypatch.setattr("ragopslab.session.OllamaEmbeddings", fake_embeddings)
+    monkeypatch.setattr(
+        "ragopslab.session.ChatOllama", lambda model: FakeListChatModel(responses=["Alpha [1]."])
+    )
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "alpha.txt").write_text("alpha content", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    common = dict(chunk_size=200, chunk_overlap=20, extensions=["txt"])
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="small",
+        **common,
+    )
+    config = _deep_merge(
+        DEFAULTS,
+        {
+            "paths": {"persist_dir": str(persist_dir)},
+            "chroma": {"collection": "test_collection"},
+            "models": {"embedding_model": "small"},
+            "embedding_cache": {"enabled": False},
+            "query_cache": {"enabled": False},
+        },
+    )
+    service = QueryService(config)
+    try:
+        assert service.ask({"query": "What is it?"})["citations"]
+        rebuilt = rebuild_collection(
+            data_dir, persist_dir, "test_collection", embedding_model="large", **common
+        )
+        assert collection_embedding(persist_dir, rebuilt.collection) == ("large", 16)
+
+        # The config still names the old model; readers follow the collection's.
+        assert service.ask({"query": "What is it?"})["citations"]
+        assert built == ["small", "large"]
+        with RagSession.from_config(config) as session:
+            assert session.embedding_model == "large"
+            assert session.retrieve("What is it?", k=1)
+    finally:
+        service.close()
+
+    with pytest.raises(ValueError, match="--rebuild"):
+        ingest_directory(
+            data_dir=data_dir,
+            persist_dir=persist_dir,
+            collection_name=rebuilt.collection,
+            embedding_model="small",
+            **common,
+        )
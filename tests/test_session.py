@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+import pytest
+
+from ragopslab.chat import answer_question
+from ragopslab.eval import run_eval
+from ragopslab.graph_chat import answer_question_graph
+from ragopslab.ingest import ingest_directory
+from ragopslab.session import RagSession
+
+
+def test_session_builds_clients_once_for_every_call(
+    fake_embeddings: DeterministicFakeEmbedding, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    built: list[str] = []
+
+    def fake_embedder(model: str) -> DeterministicFakeEmbedding:
+        built.append(f"embeddings:{model}")
+        return fake_embeddings
+
+    def fake_chat(model: str) -> FakeListChatModel:
+        built.append(f"chat:{model}")
+        return FakeListChatModel(responses=["Alice is an Engineer [1]."])
+
+    monkeypatch.setattr("ragopslab.session.OllamaEmbeddings", fake_embedder)
+    monkeypatch.setattr("ragopslab.session.ChatOllama", fake_chat)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "team.txt").write_text("Alice is an Engineer.", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+    )
+    eval_file = tmp_path / "eval.json"
+    eval_file.write_text(
+        json.dumps([{"question": "Who?", "expected": "Alice"}, {"question": "Role?", "expected": "Engineer"}]),
+        encoding="utf-8",
+    )
+
+    with RagSession(persist_dir, "test_collection", "fake", "fake-chat") as session:
+        # Nothing is constructed until first use.
+        assert built == []
+        result = run_eval(eval_file=eval_file, k=2, session=session)
+        assert result["summary"]["passed"] == 2
+        assert answer_question("Who?", k=2, session=session).citations[0]["file_name"] == "team.txt"
+        graph = answer_question_graph("Who?", k_default=2, k_max=4, session=session)
+        assert graph.answer == "Alice is an Engineer [1]."
+
+    assert built == ["embeddings:fake", "chat:fake-chat"]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sys
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+import pytest
+
+from ragopslab.chat import answer_question
+from ragopslab.cli import main
+from ragopslab.ingest import ingest_directory
+from ragopslab.session import RagSession
+
+
+@pytest.fixture()
+def persist_dir(fake_embeddings: DeterministicFakeEmbedding, tmp_path: Path) -> Path:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "alpha.txt").write_text("alpha content", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    ingest_directory(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+    )
+    return persist_dir
+
+
+def test_answer_streams_tokens_and_records_timing(
+    fake_embeddings: DeterministicFakeEmbedding, persist_dir: Path
+) -> None:
+    events: list[dict] = []
+    llm = FakeListChatModel(responses=["It is alpha [1]."])
+    with RagSession(
+        persist_dir, "test_collection", "fake", "fake-chat", embeddings=fake_embeddings, llm=llm
+    ) as session:
+        result = answer_question("What is it?", k=2, session=session, on_event=events.append)
+
+    assert len(events) > 1
+    assert "".join(event["text"] for event in events) == result.answer == "It is alpha [1]."
+    assert result.timing["streamed"] is True
+    assert result.timing["ttft_ms"] <= result.timing["total_ms"]
+    assert result.timing["decode_tokens_per_s"] > 0
+
+
+def test_cli_stream_json_emits_ndjson_events(
+    fake_embeddings: DeterministicFakeEmbedding,
+    persist_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setattr("ragopslab.session.OllamaEmbeddings", lambda **_: fake_embeddings)
+    monkeypatch.setattr(
+        "ragopslab.session.ChatOllama", lambda model: FakeListChatModel(responses=["It is alpha [1]."])
+    )
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "\n".join(
+            [
+                "paths:",
+                f"  persist_dir: {persist_dir}",
+                "chroma:",
+                "  collection: test_collection",
+                "embedding_cache:",
+                "  enabled: false",
+                "query_cache:",
+                f"  dir: {tmp_path / 'query_cache'}",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    argv = ["ragopslab", "chat", "--config", str(config_path), "--query", "What is it?"]
+    monkeypatch.setattr(sys, "argv", argv + ["--stream", "--output-format", "json"])
+
+    assert main() == 0
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    tokens = [event["text"] for event in events if event["event"] == "token"]
+    done = events[-1]
+    assert done["event"] == "done"
+    assert "".join(tokens) == done["answer"] == "It is alpha [1]."
+    assert [item["file_name"] for item in done["citations"]] == ["alpha.txt"]
+    assert done["usage"]["timing"]["streamed"] is True
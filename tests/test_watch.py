@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from pathlib import Path
+import threading
+
+import chromadb
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import pytest
+
+from ragopslab import cli
+from ragopslab.ingest import ingest_directory
+from ragopslab.inspect import list_sources
+from ragopslab.watch import expand_change, watch_directory
+
+
+def test_watch_applies_debounced_changes_incrementally(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "keep.txt").write_text("kept as is", encoding="utf-8")
+    (data_dir / "gone.txt").write_text("deleted soon", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    kwargs = dict(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+    )
+    ingest_directory(**kwargs)
+    client = chromadb.PersistentClient(path=str(persist_dir))
+
+    batches: list[list[str]] = []
+    results = []
+    stop = threading.Event()
+
+    def _apply(paths: list[Path]) -> None:
+        batches.append(sorted(path.name for path in paths))
+        results.append(ingest_directory(paths=paths, client=client, **kwargs))
+        stop.set()
+
+    def _change_files() -> None:
+        # A burst of changes inside the debounce window becomes one batch.
+        stop.wait(0.2)
+        (data_dir / "new.txt").write_text("fresh file", encoding="utf-8")
+        (data_dir / "gone.txt").unlink()
+
+    threading.Thread(target=_change_files, daemon=True).start()
+    watch_directory(
+        data_dir, ["txt"], _apply, interval=0.05, debounce=0.3, native=False, stop=stop
+    )
+
+    assert batches == [["gone.txt", "new.txt"]]
+    assert (results[0].added, results[0].removed, results[0].unchanged) == (1, 1, 0)
+    names = {
+        m["file_name"]
+        for m in client.get_collection("test_collection").get(include=["metadatas"])["metadatas"]
+    }
+    assert names == {"keep.txt", "new.txt"}
+
+
+def test_renamed_directory_expands_to_the_files_under_it(
+    fake_embeddings: object, tmp_path: Path
+) -> None:
+    data_dir = (tmp_path / "data").resolve()
+    (data_dir / "sub").mkdir(parents=True)
+    (data_dir / "sub" / "a.txt").write_text("alpha", encoding="utf-8")
+    (data_dir / "sub" / "b.txt").write_text("beta", encoding="utf-8")
+    (data_dir / "other.txt").write_text("other", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    kwargs = dict(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+    )
+    ingest_directory(**kwargs)
+
+    def known() -> list[str]:
+        return [summary.source for summary in list_sources(persist_dir, "test_collection")]
+
+    # Notifications only name the directory on both sides of the rename.
+    (data_dir / "sub").rename(data_dir / "moved")
+    old = expand_change(data_dir / "sub", data_dir, ["txt"], [], known)
+    new = expand_change(data_dir / "moved", data_dir, ["txt"], [], known)
+    assert {Path(path).name for path in old} == {"sub", "a.txt", "b.txt"}
+    assert sorted(Path(path).relative_to(data_dir).as_posix() for path in new) == [
+        "moved/a.txt",
+        "moved/b.txt",
+    ]
+
+    stats = ingest_directory(paths=[Path(path) for path in old | new], **kwargs)
+    assert (stats.added, stats.removed) == (2, 2)
+    assert sorted(Path(source).relative_to(data_dir).as_posix() for source in known()) == [
+        "moved/a.txt",
+        "moved/b.txt",
+        "other.txt",
+    ]
+
+
+def test_watch_ingest_retries_a_batch_that_failed_to_embed(
+    fake_embeddings: DeterministicFakeEmbedding, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "keep.txt").write_text("kept as is", encoding="utf-8")
+    persist_dir = tmp_path / "chroma"
+    kwargs = dict(
+        data_dir=data_dir,
+        persist_dir=persist_dir,
+        collection_name="test_collection",
+        embedding_model="fake",
+        chunk_size=200,
+        chunk_overlap=20,
+        extensions=["txt"],
+        sync=True,
+        ignore=[],
+    )
+    ingest_directory(**kwargs)
+
+    class FlakyEmbeddings:
+        calls = 0
+
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            FlakyEmbeddings.calls += 1
+            if FlakyEmbeddings.calls == 1:
+                raise ConnectionError("ollama restarting")
+            return fake_embeddings.embed_documents(texts)
+
+    outcomes: list[object] = []
+    stop = threading.Event()
+
+    def _watch(data_dir: Path, extensions: list[str], apply, **options: object) -> None:
+        def _apply(paths: list[Path]) -> object:
+            outcomes.append(apply(paths))
+            if outcomes[-1] is not False:
+                stop.set()
+            return outcomes[-1]
+
+        def _add_file() -> None:
+            stop.wait(0.2)
+            (data_dir / "new.txt").write_text("fresh file", encoding="utf-8")
+
+        threading.Thread(target=_add_file, daemon=True).start()
+        options.update(interval=0.05, debounce=0.2, native=False, stop=stop)
+        watch_directory(data_dir, extensions, _apply, **options)
+
+    monkeypatch.setattr(cli, "watch_directory", _watch)
+    monkeypatch.setattr(cli, "make_ingest_embeddings", lambda *_, **__: FlakyEmbeddings())
+    ingest_kwargs = {
+        **kwargs,
+        "embedding_batch_size": 32,
+        "embedding_concurrency": 1,
+        "embedding_max_retries": 0,
+        "embedding_retry_backoff": 0.0,
+        "embedding_cache_dir": None,
+    }
+    config = {"ingest": {"watch_interval": 0.05, "watch_debounce": 0.2}}
+
+    assert cli._watch_ingest(config, ingest_kwargs) == 0
+    assert outcomes == [False, True]
+    assert sorted(summary.file_name for summary in list_sources(persist_dir, "test_collection")) == [
+        "keep.txt",
+        "new.txt",
+    ]